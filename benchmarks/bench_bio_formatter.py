@@ -0,0 +1,81 @@
+"""Bytes allocated per example when reading coordinates from an AtomArrayFeature column.
+
+Compares the default python formatter (which extracts each row to python / numpy
+objects and decodes it to an AtomArray) with the "bio" formatter, which exposes
+fields as views over the memory-mapped Arrow buffers.
+
+Usage: python benchmarks/bench_bio_formatter.py [--num_examples 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from biotite.structure.io.pdb import PDBFile
+
+import bio_datasets  # noqa: F401  (registers the bio formatter)
+from bio_datasets import Dataset, Features
+from bio_datasets.features.atom_array import ProteinAtomArrayFeature
+
+PDB_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "AF-V9HVX0-F1-model_v4.pdb"
+)
+
+
+def measure(ds, fields, num_examples):
+    """Mean bytes allocated and time taken to fetch `fields` of one example."""
+    tracemalloc.start()
+    allocated = 0
+    t0 = time.perf_counter()
+    for ix in range(num_examples):
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        example = ds[ix]["structure"]
+        values = [getattr(example, f) if f == "coord" else example[f] for f in fields]
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - start
+        del example, values
+    elapsed = time.perf_counter() - t0
+    tracemalloc.stop()
+    return allocated / num_examples, elapsed / num_examples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_examples", type=int, default=200)
+    args = parser.parse_args()
+
+    atoms = PDBFile.read(PDB_PATH).get_structure(model=1)
+    feature = ProteinAtomArrayFeature(load_as="biotite", coords_dtype="float32")
+    features = Features({"structure": feature})
+    ds = Dataset.from_dict(
+        {"structure": [atoms] * args.num_examples}, features=features
+    )
+    print(
+        f"{len(atoms)} atoms per example, "
+        f"coords {atoms.coord.astype(np.float32).nbytes} bytes"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ds.save_to_disk(tmpdir)
+        ds = Dataset.load_from_disk(tmpdir)  # memory-mapped
+        results = {
+            "python (decoded AtomArray)": measure(ds, ["coord"], args.num_examples),
+            "bio (coords only)": measure(
+                ds.with_format("bio"), ["coords"], args.num_examples
+            ),
+            "bio (all fields)": measure(
+                ds.with_format("bio"), list(feature._features), args.num_examples
+            ),
+        }
+        for name, (bytes_per_example, seconds) in results.items():
+            print(
+                f"{name:<30} {bytes_per_example / 1e3:10.1f} kB/example "
+                f"{seconds * 1e3:8.3f} ms/example"
+            )
+        del ds
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Time taken to `import bio_datasets` in a fresh interpreter.
+
+Also checks that importing does not load the full CCD (which requires the compact
+component table built by setup_ccd.py to be present in structure/library).
+
+Usage: python benchmarks/bench_import_time.py [--repeats 5] [--max_seconds 3.0]
+Exits with a non-zero status if the median import time exceeds --max_seconds
+or if the CCD was loaded during import.
+"""
+import argparse
+import subprocess
+import sys
+
+import numpy as np
+
+IMPORT_SCRIPT = """
+import sys
+import time
+t0 = time.perf_counter()
+import bio_datasets
+elapsed = time.perf_counter() - t0
+ccd = sys.modules["biotite.structure.info.ccd"]
+print(elapsed, getattr(ccd, "_ccd_block", None) is not None)
+"""
+
+
+def time_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max_seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    from bio_datasets.structure.residue import CCD_COMPONENT_TABLE_PATH
+
+    if not CCD_COMPONENT_TABLE_PATH.exists():
+        print(f"Warning: {CCD_COMPONENT_TABLE_PATH} not found; run setup_ccd.py")
+
+    times, ccd_loaded = zip(*[time_import() for _ in range(args.repeats)])
+    median = float(np.median(times))
+    print(
+        f"import bio_datasets: median {median:.3f}s "
+        f"(min {min(times):.3f}s, max {max(times):.3f}s over {args.repeats} runs)"
+    )
+    print(f"CCD loaded during import: {any(ccd_loaded)}")
+    if any(ccd_loaded) or (args.max_seconds is not None and median > args.max_seconds):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
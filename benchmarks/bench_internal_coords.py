@@ -0,0 +1,105 @@
+"""Parquet size and decoding time of cartesian vs internal coordinate storage.
+
+Encodes the AFDB test structures (repeated --num_copies times) with the afdb
+ProteinAtomArrayFeature preset, storing float16 cartesian coordinates or
+internal coordinates, and reports parquet size and batched decoding time.
+For comparison, parsing the PDB files is timed, as is decoding from
+foldcomp-compressed (fcz) files if foldcomp is installed.
+
+Usage: python benchmarks/bench_internal_coords.py [--num_copies 100] [--repeats 3]
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from biotite.structure.io.pdb import PDBFile
+from datasets import Dataset
+
+from bio_datasets import config as bio_config
+from bio_datasets.features import Features
+from bio_datasets.features.atom_array import ProteinAtomArrayFeature
+from bio_datasets.structure.parsing import load_structure
+
+if bio_config.FOLDCOMP_AVAILABLE:
+    import foldcomp
+
+TESTS_DIR = os.path.join(os.path.dirname(__file__), "..", "tests")
+AFDB_FILES = ["AF-V9HVX0-F1-model_v4.pdb", "AF-Q9R172-F1-model_v4.pdb"]
+
+FEATURE_KWARGS = {
+    "cartesian (float16)": {},
+    "pnerf (uint16)": {"internal_coords_type": "pnerf"},
+    "idealised (uint16)": {"internal_coords_type": "idealised"},
+    "idealised (float16)": {
+        "internal_coords_type": "idealised",
+        "internal_coords_dtype": "float16",
+    },
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_copies", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = [os.path.join(TESTS_DIR, file_name) for file_name in AFDB_FILES]
+    structures = [
+        PDBFile.read(path).get_structure(model=1, extra_fields=["b_factor"])
+        for path in paths
+    ]
+    examples = structures * args.num_copies
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, kwargs in FEATURE_KWARGS.items():
+            feat = ProteinAtomArrayFeature.from_preset(
+                "afdb", load_as="biotite", **kwargs
+            )
+            ds = Dataset.from_dict(
+                {"structure": examples}, features=Features({"structure": feat})
+            )
+            parquet_path = os.path.join(tmpdir, "structures.parquet")
+            ds.to_parquet(parquet_path)
+            column = ds.data.column("structure")
+            decode_ms = (
+                1000
+                * timeit.timeit(lambda: feat.decode_batch(column), number=args.repeats)
+                / args.repeats
+            )
+            print(
+                f"{name}: parquet {os.path.getsize(parquet_path) / 1e6:.2f}MB, "
+                f"decode {len(examples)} examples {decode_ms:.1f}ms"
+            )
+
+        def parse_pdb():
+            for _ in range(args.num_copies):
+                for path in paths:
+                    load_structure(path)
+
+        decode_ms = 1000 * timeit.timeit(parse_pdb, number=args.repeats)
+        print(f"pdb parsing: {len(examples)} examples {decode_ms / args.repeats:.1f}ms")
+
+        if bio_config.FOLDCOMP_AVAILABLE:
+            fcz_paths = []
+            for path in paths:
+                with open(path, "r") as f:
+                    fcz_bytes = foldcomp.compress(os.path.basename(path), f.read())
+                fcz_path = os.path.join(tmpdir, os.path.basename(path) + ".fcz")
+                with open(fcz_path, "wb") as f:
+                    f.write(fcz_bytes)
+                fcz_paths.append(fcz_path)
+
+            def decode_fcz():
+                for _ in range(args.num_copies):
+                    for fcz_path in fcz_paths:
+                        load_structure(fcz_path, format="fcz")
+
+            decode_ms = 1000 * timeit.timeit(decode_fcz, number=args.repeats)
+            print(
+                f"foldcomp (fcz): decode {len(examples)} examples "
+                f"{decode_ms / args.repeats:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Time and peak memory of residue distance / contact featurisation.
+
+Compares dense blocked residue distances with sparse cell-list contacts (heavy-atom
+minimum distance and CA distance) on 1aq1 chain A and a large synthetic complex,
+built by tiling 1aq1 chain A into --num_chains chains on a grid.
+
+Usage: python benchmarks/bench_residue_distances.py [--repeats 5] [--num_chains 16]
+"""
+import argparse
+import os
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from bio_datasets.structure.parsing import load_structure
+from bio_datasets.structure.protein import ProteinChain, ProteinComplex
+
+TESTS_DIR = os.path.join(os.path.dirname(__file__), "..", "tests")
+
+
+def tile_chains(atoms, num_chains, spacing=50.0):
+    chains = []
+    grid_size = int(np.ceil(np.sqrt(num_chains)))
+    for ix in range(num_chains):
+        chain = atoms.copy()
+        chain.chain_id[:] = f"C{ix:03d}"
+        chain.coord += np.array(
+            [spacing * (ix % grid_size), spacing * (ix // grid_size), 0.0],
+            dtype=np.float32,
+        )
+        chains.append(chain)
+    return sum(chains[1:], chains[0])
+
+
+def measure(fn, repeats):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return 1000 * timeit.timeit(fn, number=repeats) / repeats, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--num_chains", type=int, default=16)
+    args = parser.parse_args()
+
+    cdk2 = load_structure(os.path.join(TESTS_DIR, "1aq1.cif"))
+    cdk2 = cdk2[(cdk2.chain_id == "A") & ~cdk2.hetero]
+    proteins = {
+        "1aq1": ProteinChain(cdk2),
+        f"1aq1 x {args.num_chains}": ProteinComplex.from_atoms(
+            tile_chains(cdk2, args.num_chains)
+        ),
+    }
+    for name, protein in proteins.items():
+        benchmarks = {
+            "CA contacts (8A)": lambda: protein.residue_contacts(
+                "CA", 8.0, as_pairs=True
+            ),
+            "heavy-atom contacts (5A)": lambda: protein.residue_contacts(
+                None, 5.0, as_pairs=True
+            ),
+        }
+        if protein.num_residues <= 1000:
+            benchmarks[
+                "dense heavy-atom min distances"
+            ] = lambda: protein.residue_distances(None)
+        for benchmark_name, fn in benchmarks.items():
+            time_ms, peak_mb = measure(fn, args.repeats)
+            print(
+                f"{name} ({protein.num_residues} residues) {benchmark_name}: "
+                f"{time_ms:.1f}ms, peak {peak_mb:.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
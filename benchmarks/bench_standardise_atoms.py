@@ -0,0 +1,74 @@
+"""Time taken to standardise atoms (and construct ProteinChain / ProteinComplex).
+
+Benchmarks Biomolecule.standardise_atoms on 1qys, 1aq1 and a large synthetic
+complex, built by tiling the protein chain of 1aq1 into --num_chains chains with
+shuffled chain ids.
+
+Usage: python benchmarks/bench_standardise_atoms.py [--repeats 20] [--num_chains 40]
+"""
+import argparse
+import os
+import timeit
+
+import numpy as np
+from biotite import structure as bs
+
+from bio_datasets.structure.biomolecule import Biomolecule
+from bio_datasets.structure.parsing import load_structure
+from bio_datasets.structure.protein import (
+    ProteinChain,
+    ProteinComplex,
+    ProteinDictionary,
+)
+
+TESTS_DIR = os.path.join(os.path.dirname(__file__), "..", "tests")
+
+
+def tile_chains(atoms, num_chains, seed=0):
+    chains = []
+    for ix in np.random.default_rng(seed).permutation(num_chains):
+        chain = atoms.copy()
+        chain.chain_id[:] = f"C{ix:03d}"
+        chains.append(chain)
+    return sum(chains[1:], chains[0])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--num_chains", type=int, default=40)
+    args = parser.parse_args()
+
+    residue_dictionary = ProteinDictionary.from_preset("protein")
+    top7 = load_structure(os.path.join(TESTS_DIR, "1qys.pdb"))
+    cdk2 = load_structure(os.path.join(TESTS_DIR, "1aq1.cif"))
+    cdk2 = cdk2[cdk2.chain_id == "A"]
+    structures = {
+        "1qys": top7,
+        "1aq1": cdk2,
+        f"1aq1 x {args.num_chains}": tile_chains(
+            Biomolecule.filter_atoms(cdk2, residue_dictionary), args.num_chains
+        ),
+    }
+    for name, atoms in structures.items():
+        filtered_atoms = Biomolecule.filter_atoms(atoms, residue_dictionary)
+        num_residues = bs.get_residue_count(filtered_atoms)
+        if len(np.unique(atoms.chain_id)) > 1:
+            construct = lambda: ProteinComplex.from_atoms(atoms)  # noqa: E731
+        else:
+            construct = lambda: ProteinChain(atoms)  # noqa: E731
+        standardise_time = timeit.timeit(
+            lambda: Biomolecule.standardise_atoms(filtered_atoms, residue_dictionary),
+            number=args.repeats,
+        )
+        construct()  # warm up (e.g. build the cached preset dictionary)
+        construct_time = timeit.timeit(construct, number=args.repeats)
+        print(
+            f"{name} ({num_residues} residues): "
+            f"standardise_atoms {1000 * standardise_time / args.repeats:.1f}ms, "
+            f"ProteinChain/Complex {1000 * construct_time / args.repeats:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
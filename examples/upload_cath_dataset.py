@@ -6,64 +6,54 @@ c.f.https://github.com/huggingface/datasets/tree/main/templates
 import argparse
 import json
 import tempfile
-from typing import Dict, List, Optional
+from typing import List, Optional
 
 import tqdm
 
 from bio_datasets import Dataset, Features, NamedSplit, Value
 from bio_datasets.features import ProteinAtomArrayFeature
+from bio_datasets.features.atom_array import iter_jsonl
 from bio_datasets.structure.protein import ProteinDictionary
 
 
-def load_coords(
-    jsonl_file: str,
-    disable_tqdm: bool = False,
-    split_ids: Optional[Dict[str, List[str]]] = None,
-):
-    """Split-specific jsonl files should be created by running data_creation_scripts/create_cath_splits.py"""
-    entries_by_split = {split: [] for split in split_ids.keys()}
-    name_to_split = {
-        name: split for split, names in split_ids.items() for name in names
-    }
-    with open(jsonl_file) as f:
-        lines = (
-            f.readlines()
-        )  # get a list rather than iterator to allow tqdm to know progress
-        for line in tqdm.tqdm(lines, disable=disable_tqdm):
-            coords_dict = json.loads(line)
-            if split_ids:
-                split = name_to_split.get(coords_dict["name"], None)
-                if split is None:
-                    # print(f"Skipping {coords_dict['name']} because it's not in the split_ids")
-                    continue
-            else:
-                split = "train"
-            entries_by_split[split].append(coords_dict)
-    return entries_by_split
+def load_coords(jsonl_file: str, split_ids: Optional[List[str]] = None):
+    """Stream coords dicts from the CATH jsonl file, optionally keeping only split_ids.
+
+    Split-specific jsonl files should be created by running data_creation_scripts/create_cath_splits.py
+    """
+    split_ids = set(split_ids) if split_ids is not None else None
+    for coords_dict in iter_jsonl(jsonl_file):
+        if split_ids is None or coords_dict["name"] in split_ids:
+            yield coords_dict
 
 
-def examples_generator(coords: List[Dict], features: Features):
-    for coords_dict in coords:
-        example = coords_dict
+def examples_generator(
+    cath_jsonl_path: str,
+    split_ids: Optional[List[str]] = None,
+    disable_tqdm: bool = False,
+):
+    for coords_dict in tqdm.tqdm(
+        load_coords(cath_jsonl_path, split_ids=split_ids),
+        total=len(split_ids) if split_ids is not None else None,
+        disable=disable_tqdm,
+    ):
         if "N" in coords_dict:
-            coords = {
-                "N": example.pop("N"),
-                "CA": example.pop("CA"),
-                "C": example.pop("C"),
-                "O": example.pop("O"),
+            coords_dict["coords"] = {
+                atom_name: coords_dict.pop(atom_name)
+                for atom_name in ["N", "CA", "C", "O"]
             }
-            coords_dict["coords"] = coords
         chain_id = coords_dict["name"].split(".")[1]
         # a dictionary with this format is one of the formats accepted by AtomArray.encode_example
-        example["backbone"] = {
-            "sequence": coords_dict["seq"],
-            "backbone_coords": coords_dict["coords"],
-            "chain_id": chain_id * len(coords_dict["seq"]),
+        yield {
+            "backbone": {
+                "sequence": coords_dict["seq"],
+                "backbone_coords": coords_dict["coords"],
+                "chain_id": chain_id,
+            },
+            "num_chains": coords_dict["num_chains"],
+            "name": coords_dict["name"],
+            "CATH": coords_dict["CATH"],
         }
-        example["num_chains"] = coords_dict["num_chains"]
-        example["name"] = coords_dict["name"]
-        example["CATH"] = coords_dict["CATH"]
-        yield example
 
 
 def main(
@@ -76,10 +66,9 @@ def main(
         splits = json.load(f)
 
     splits = {k: v for k, v in splits.items() if k in ["train", "validation", "test"]}
-    coords_by_split = load_coords(cath_jsonl_path, split_ids=splits)
-    for split_name, split_coords in coords_by_split.items():
-        print(f"Processing {split_name} split", len(split_coords), "examples")
-        assert len(split_coords) > 0, f"No examples found for split {split_name}"
+    for split_name, split_ids in splits.items():
+        print(f"Processing {split_name} split", len(split_ids), "examples")
+        assert len(split_ids) > 0, f"No examples found for split {split_name}"
         # from_generator calls GeneratorBasedBuilder.download_and_prepare and as_dataset
         features = Features(
             backbone=ProteinAtomArrayFeature(
@@ -93,7 +82,10 @@ def main(
         with tempfile.TemporaryDirectory() as temp_dir:
             ds = Dataset.from_generator(
                 examples_generator,
-                gen_kwargs={"coords": split_coords, "features": features},
+                gen_kwargs={
+                    "cath_jsonl_path": cath_jsonl_path,
+                    "split_ids": split_ids,
+                },
                 features=features,
                 split=NamedSplit(split_name),
                 cache_dir=temp_dir,
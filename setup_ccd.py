@@ -235,7 +235,15 @@ if __name__ == "__main__":
 
     # Save residue dictionary
     # import bio_datasets only after CCD has been created
-    from bio_datasets.structure.residue import ResidueDictionary
+    from bio_datasets.structure.residue import (
+        CCD_COMPONENT_TABLE_PATH,
+        ResidueDictionary,
+        build_ccd_component_table,
+    )
+
+    # Save compact component table (avoids loading the CCD on import)
+    np.savez_compressed(CCD_COMPONENT_TABLE_PATH, **build_ccd_component_table())
+    logging.info(f"Saved CCD component table to {CCD_COMPONENT_TABLE_PATH}")
 
     residue_dictionary = ResidueDictionary.from_ccd()
     residue_dictionary = asdict(residue_dictionary)
@@ -1,8 +1,8 @@
 # flake8: noqa: E402, F401
-import importlib
 import inspect
 import json
 import logging
+import sys
 from pathlib import Path
 from typing import Dict, Optional
 
@@ -33,17 +33,7 @@ from .info import DatasetInfo
 
 
 def override_features():
-
-    SPARK_AVAILABLE = importlib.util.find_spec("pyspark") is not None
     import datasets
-    import datasets.io
-    import datasets.io.abc
-    import datasets.io.csv
-    import datasets.io.generator
-    import datasets.io.json
-    import datasets.io.parquet
-    import datasets.io.sql
-    import datasets.io.text
 
     def cast(self, target_schema, *args, **kwargs):
         """
@@ -125,23 +115,27 @@ def override_features():
     datasets.iterable_dataset.Features = Features
     datasets.builder.Features = Features
     datasets.info.Features = Features
-    datasets.io.abc.Features = Features
-    datasets.io.csv.Features = Features
-    datasets.io.generator.Features = Features
-    datasets.io.json.Features = Features
-    datasets.io.parquet.Features = Features
-    datasets.io.text.Features = Features
-    datasets.io.sql.Features = Features
     datasets.utils.metadata.Features = Features
     datasets.dataset_dict.Features = Features
     datasets.load.Features = Features
     datasets.formatting.formatting.Features = Features
     # datasets.formatting.polars_formatter.Features = BioFeatures
 
-    if SPARK_AVAILABLE:
-        import datasets.io.spark
-
-        datasets.io.spark.Features = Features
+    # datasets.io modules bind `from .. import Features` when they are first imported,
+    # so only those which have already been imported need patching
+    for module_name in [
+        "abc",
+        "csv",
+        "generator",
+        "json",
+        "parquet",
+        "sql",
+        "text",
+        "spark",
+    ]:
+        module = sys.modules.get(f"datasets.io.{module_name}")
+        if module is not None:
+            module.Features = Features
 
 
 override_features()
@@ -154,6 +148,7 @@ from datasets.packaged_modules import _PACKAGED_DATASETS_MODULES, _hash_python_l
 from datasets.splits import *
 
 from .features import *
+from .formatting import BioFormatter
 from .packaged_modules.structurefolder import structurefolder
 from .structure import *
 
@@ -0,0 +1,41 @@
+from typing import Tuple, Union
+
+import numpy as np
+import pyarrow as pa
+
+
+def list_array_to_numpy(
+    array: Union[pa.Array, pa.ChunkedArray], inner_shape: Tuple[int, ...] = ()
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the flat values and offsets of an Arrow list array (e.g. Array1D / Array2D storage).
+
+    Values of primitive numeric type without nulls are returned as read-only views
+    over the Arrow buffers (no copy). Strings and booleans cannot be viewed and are
+    converted.
+
+    Args:
+        array (pa.Array): A (possibly extension-typed) list array, with
+            len(inner_shape) further levels of nested fixed-length lists.
+        inner_shape (Tuple[int, ...]): The shape of each item of the outer lists,
+            e.g. (3,) for coordinates stored as Array2D((None, 3)).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The values, with shape (num_items, *inner_shape),
+            and offsets of length len(array) + 1 (starting at zero) delimiting the
+            items of each row of the array.
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if isinstance(array, pa.ExtensionArray):
+        array = array.storage
+    offsets = array.offsets.to_numpy()
+    offsets = offsets - offsets[0]
+    values = array.flatten()
+    for _ in inner_shape:
+        values = values.flatten()
+    if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+        values = values.to_numpy(zero_copy_only=False).astype(str)
+    else:
+        values = values.to_numpy(zero_copy_only=False)
+    return values.reshape(-1, *inner_shape), offsets
@@ -0,0 +1,122 @@
+"""Batching utilities for dense (residue-level) protein features.
+
+Intended for use with ProteinAtomArrayFeature(load_as="atom37" | "atom14"),
+whose decoded examples are dicts of arrays with a leading residue dimension.
+"""
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pyarrow as pa
+
+
+def _pad_value(dtype: np.dtype):
+    if np.issubdtype(dtype, np.floating):
+        return np.nan
+    elif np.issubdtype(dtype, np.bool_):
+        return False
+    elif np.issubdtype(dtype, np.str_):
+        return ""
+    return 0
+
+
+def collate_dense_proteins(
+    examples: List[Dict[str, np.ndarray]],
+    pad_to_multiple_of: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """Stack residue-level arrays into padded (batch_size, max_length, ...) arrays.
+
+    Float arrays are padded with nan, boolean arrays (e.g. atom masks) with False
+    and integer arrays with 0. A `residue_mask` entry marks non-padding residues.
+
+    Args:
+        examples (List[Dict[str, np.ndarray]]): Decoded examples, each a dict of
+            arrays whose first dimension is the number of residues.
+        pad_to_multiple_of (int, optional): Round the padded length up to a multiple
+            of this value.
+
+    Returns:
+        Dict[str, np.ndarray]: The padded arrays.
+    """
+    lengths = np.array([len(example["restype_index"]) for example in examples])
+    max_length = int(lengths.max()) if len(lengths) else 0
+    if pad_to_multiple_of is not None:
+        max_length = -(-max_length // pad_to_multiple_of) * pad_to_multiple_of
+    batch = {}
+    for key, value in examples[0].items():
+        value = np.asarray(value)
+        padded = np.full(
+            (len(examples), max_length) + value.shape[1:],
+            _pad_value(value.dtype),
+            dtype=value.dtype,
+        )
+        for ix, example in enumerate(examples):
+            padded[ix, : lengths[ix]] = example[key]
+        batch[key] = padded
+    batch["residue_mask"] = np.arange(max_length)[None] < lengths[:, None]
+    return batch
+
+
+def get_num_residues(
+    column: Union[pa.Array, pa.ChunkedArray],
+    residue_field: str = "restype_index",
+) -> np.ndarray:
+    """Number of residues of each example in an Arrow column of encoded atom arrays.
+
+    Reads list offsets only, so no data is decoded: e.g.
+    `get_num_residues(dataset.data.column("structure"))`.
+    """
+    if isinstance(column, pa.ChunkedArray):
+        return np.concatenate(
+            [get_num_residues(chunk, residue_field) for chunk in column.chunks]
+            or [np.zeros(0, dtype=int)]
+        )
+    if isinstance(column, pa.ExtensionArray):
+        column = column.storage
+    residues = column.field(residue_field)
+    if isinstance(residues, pa.ExtensionArray):
+        residues = residues.storage
+    return np.diff(residues.offsets.to_numpy())
+
+
+def length_bucketed_batches(
+    lengths: np.ndarray,
+    batch_size: int,
+    bucket_size_multiplier: int = 100,
+    shuffle: bool = True,
+    drop_last: bool = False,
+    seed: Optional[int] = None,
+) -> List[np.ndarray]:
+    """Group example indices into batches of similar length, to minimise padding.
+
+    Indices are (optionally) shuffled, split into buckets of
+    `batch_size * bucket_size_multiplier` examples, and sorted by length within each
+    bucket before being split into batches. The order of the batches is then shuffled.
+    The result can be used as a batch sampler.
+
+    Args:
+        lengths (np.ndarray): Length (e.g. number of residues) of each example.
+        batch_size (int): Number of examples per batch.
+        bucket_size_multiplier (int): Number of batches per bucket.
+        shuffle (bool): Whether to shuffle examples between buckets and batch order.
+        drop_last (bool): Whether to drop incomplete batches.
+        seed (int, optional): Random seed.
+
+    Returns:
+        List[np.ndarray]: Indices of the examples in each batch.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = np.asarray(lengths)
+    indices = rng.permutation(len(lengths)) if shuffle else np.arange(len(lengths))
+    bucket_size = batch_size * bucket_size_multiplier
+    batches = []
+    for bucket_start in range(0, len(indices), bucket_size):
+        bucket = indices[bucket_start : bucket_start + bucket_size]
+        bucket = bucket[np.argsort(lengths[bucket], kind="stable")]
+        for batch_start in range(0, len(bucket), batch_size):
+            batch = bucket[batch_start : batch_start + batch_size]
+            if drop_last and len(batch) < batch_size:
+                continue
+            batches.append(batch)
+    if shuffle:
+        batches = [batches[ix] for ix in rng.permutation(len(batches))]
+    return batches
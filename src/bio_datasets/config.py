@@ -1,4 +1,28 @@
 import importlib
+import os
 
 FOLDCOMP_AVAILABLE = importlib.util.find_spec("foldcomp") is not None
 FASTPDB_AVAILABLE = importlib.util.find_spec("fastpdb") is not None
+
+# byte budget of the in-memory decoded structure cache (c.f. features.decode_cache)
+DECODE_CACHE_MAX_BYTES = int(
+    os.environ.get("BIO_DATASETS_DECODE_CACHE_MAX_BYTES", 2 * 1024**3)
+)
+
+# location and size cap of the on-disk decoded structure cache (c.f. features.disk_cache)
+DISK_CACHE_DIR = os.environ.get(
+    "BIO_DATASETS_DISK_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "bio_datasets", "decoded"),
+)
+DISK_CACHE_MAX_BYTES = int(
+    os.environ.get("BIO_DATASETS_DISK_CACHE_MAX_BYTES", 20 * 1024**3)
+)
+
+# default parallel decoding of row-wise decoded features (c.f. features.parallel):
+# "thread" or "process", or unset to decode serially
+PARALLEL_DECODE_EXECUTOR = os.environ.get("BIO_DATASETS_PARALLEL_DECODE_EXECUTOR")
+PARALLEL_DECODE_NUM_WORKERS = (
+    int(os.environ["BIO_DATASETS_PARALLEL_DECODE_NUM_WORKERS"])
+    if "BIO_DATASETS_PARALLEL_DECODE_NUM_WORKERS" in os.environ
+    else None
+)
@@ -0,0 +1,282 @@
+"""Bulk conversion of structure file columns to atom array storage.
+
+`convert_structure_dataset` converts a column stored as structure files
+(StructureFeature / ProteinStructureFeature) to arrays (AtomArrayFeature /
+ProteinAtomArrayFeature), writing Arrow shards to a local directory:
+
+    output_dir/
+        conversion.json                  # target features and sharding
+        data-00000-of-00012.arrow
+        errors-00000-of-00012.jsonl      # rows which failed to convert
+        ...
+
+Each shard is converted one row at a time, so at most writer_batch_size encoded
+rows (and a single decoded structure) are held in memory, and shards are
+converted in parallel by num_proc processes. Shards are written to temporary
+files and renamed once complete, so an interrupted conversion can be resumed by
+rerunning it with the same arguments: completed shards are skipped.
+
+Rows which fail to convert are dropped from the output (or raise, with
+skip_errors=False) and recorded, with their row index and error, in the error
+file of their shard. Converted shards can be loaded with `load_converted_dataset`.
+"""
+import dataclasses
+import json
+import logging
+import os
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from datasets import Dataset, concatenate_datasets
+from datasets.arrow_writer import ArrowWriter
+
+from .features import (
+    AtomArrayFeature,
+    Features,
+    ProteinAtomArrayFeature,
+    ProteinStructureFeature,
+    StructureFeature,
+)
+from .info import DatasetInfo
+
+logger = logging.getLogger(__name__)
+
+CONVERSION_FILE = "conversion.json"
+
+ConversionSummary = namedtuple(
+    "ConversionSummary",
+    ["num_shards", "num_resumed_shards", "num_converted", "num_errors"],
+)
+
+
+def default_target_feature(
+    source_feature: StructureFeature, **kwargs
+) -> AtomArrayFeature:
+    """Atom array feature storing the annotations loaded by source_feature.
+
+    Keyword arguments (e.g. coords_dtype) are passed to the feature constructor.
+    Bonds are not stored, as atom array features do not yet support them.
+    """
+    if source_feature.include_bonds:
+        logger.warning(
+            "Atom array features do not support bonds (with_bonds): "
+            "bonds loaded by the source feature (include_bonds) will be dropped"
+        )
+    kwargs = dict(
+        load_as=source_feature.load_as,
+        constructor_kwargs=source_feature.constructor_kwargs,
+        with_occupancy=source_feature.with_occupancy,
+        with_b_factor=source_feature.with_b_factor,
+        with_atom_id=source_feature.with_atom_id,
+        with_charge=source_feature.with_charge,
+        **kwargs,
+    )
+    if isinstance(source_feature, ProteinStructureFeature):
+        return ProteinAtomArrayFeature(**kwargs)
+    return AtomArrayFeature(**kwargs)
+
+
+def _shard_filename(prefix: str, shard_index: int, num_shards: int, ext: str) -> str:
+    return f"{prefix}-{shard_index:05d}-of-{num_shards:05d}.{ext}"
+
+
+def _convert_shard(
+    dataset: Dataset,
+    column: str,
+    source_feature: StructureFeature,
+    features: Features,
+    output_dir: str,
+    shard_index: int,
+    num_shards: int,
+    rows_per_shard: int,
+    writer_batch_size: int,
+    skip_errors: bool,
+):
+    """Convert rows of one shard, returning the number of converted and failed rows."""
+    start = shard_index * rows_per_shard
+    stop = min(start + rows_per_shard, len(dataset))
+    table = dataset.with_format("arrow")[start:stop]
+    # decode to atom arrays; caching would only hold onto structures seen once
+    source_feature = dataclasses.replace(
+        source_feature,
+        load_as="biotite",
+        constructor_kwargs=None,
+        cache_decoded=False,
+        disk_cache=False,
+    )
+    target_feature = features[column]
+    if not target_feature.with_bonds:
+        source_feature = dataclasses.replace(source_feature, include_bonds=False)
+
+    data_path = os.path.join(
+        output_dir, _shard_filename("data", shard_index, num_shards, "arrow")
+    )
+    errors_path = os.path.join(
+        output_dir, _shard_filename("errors", shard_index, num_shards, "jsonl")
+    )
+    num_converted, num_errors = 0, 0
+    with ArrowWriter(
+        features=features, path=data_path + ".tmp", writer_batch_size=writer_batch_size
+    ) as writer, open(errors_path + ".tmp", "w") as errors_file:
+        row_index = start
+        for batch in table.to_batches(max_chunksize=writer_batch_size):
+            for row in batch.to_pylist():
+                try:
+                    if row[column] is not None:
+                        atoms = source_feature.decode_example(row[column])
+                        row[column] = target_feature.encode_example(atoms)
+                except Exception as e:
+                    if not skip_errors:
+                        raise
+                    error = {
+                        "row": row_index,
+                        "error": f"{type(e).__name__}: {e}",
+                        "traceback": traceback.format_exc(),
+                    }
+                    errors_file.write(json.dumps(error) + "\n")
+                    num_errors += 1
+                else:
+                    writer.write(row)
+                    num_converted += 1
+                row_index += 1
+        writer.finalize()
+    os.replace(errors_path + ".tmp", errors_path)
+    # the data file marks the shard as complete
+    os.replace(data_path + ".tmp", data_path)
+    return num_converted, num_errors
+
+
+def _check_conversion_file(output_dir: str, conversion: dict):
+    path = os.path.join(output_dir, CONVERSION_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != conversion:
+            raise ValueError(
+                f"{output_dir} contains a conversion with different arguments, "
+                "which cannot be resumed. Use a new output_dir."
+            )
+    else:
+        with open(path, "w") as f:
+            json.dump(conversion, f, indent=2)
+
+
+def convert_structure_dataset(
+    dataset: Dataset,
+    output_dir: str,
+    column: str = "structure",
+    target_feature: Optional[AtomArrayFeature] = None,
+    num_proc: int = 1,
+    rows_per_shard: int = 1000,
+    writer_batch_size: int = 100,
+    skip_errors: bool = True,
+) -> ConversionSummary:
+    """Convert a structure file column of a dataset to atom array storage.
+
+    Args:
+        dataset (Dataset): Dataset with a StructureFeature column.
+        output_dir (str): Local directory to write shards to. Rerunning with the
+            same arguments resumes an interrupted conversion.
+        column (str): Name of the column to convert.
+        target_feature (AtomArrayFeature, optional): Feature to convert to.
+            Defaults to `default_target_feature(dataset.features[column])`.
+        num_proc (int): Number of processes converting shards in parallel.
+        rows_per_shard (int): Number of (input) rows per output shard.
+        writer_batch_size (int): Number of rows read and written at a time.
+        skip_errors (bool): Whether to drop (and record) rows which fail to
+            convert, rather than raising.
+
+    Returns:
+        ConversionSummary: Number of shards (and of those already complete),
+            and of converted and failed rows in shards converted by this call.
+    """
+    source_feature = dataset.features[column]
+    if not isinstance(source_feature, StructureFeature):
+        raise ValueError(
+            f"Expected column {column} to be a StructureFeature, got {source_feature}"
+        )
+    target_feature = target_feature or default_target_feature(source_feature)
+    features = dataset.features
+    features[column] = target_feature
+
+    num_shards = max(1, -(-len(dataset) // rows_per_shard))
+    os.makedirs(output_dir, exist_ok=True)
+    conversion = {
+        "column": column,
+        "num_rows": len(dataset),
+        "rows_per_shard": rows_per_shard,
+        "num_shards": num_shards,
+        "source_fingerprint": dataset._fingerprint,
+        "features": features.to_dict(),
+    }
+    # round trip, so that it compares equal to a conversion loaded from json
+    _check_conversion_file(output_dir, json.loads(json.dumps(conversion)))
+    pending = [
+        shard_index
+        for shard_index in range(num_shards)
+        if not os.path.exists(
+            os.path.join(
+                output_dir, _shard_filename("data", shard_index, num_shards, "arrow")
+            )
+        )
+    ]
+    shard_kwargs = dict(
+        dataset=dataset,
+        column=column,
+        source_feature=source_feature,
+        features=features,
+        output_dir=output_dir,
+        num_shards=num_shards,
+        rows_per_shard=rows_per_shard,
+        writer_batch_size=writer_batch_size,
+        skip_errors=skip_errors,
+    )
+    if num_proc > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(num_proc, len(pending))) as pool:
+            futures = [
+                pool.submit(_convert_shard, shard_index=shard_index, **shard_kwargs)
+                for shard_index in pending
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [
+            _convert_shard(shard_index=shard_index, **shard_kwargs)
+            for shard_index in pending
+        ]
+    return ConversionSummary(
+        num_shards,
+        num_shards - len(pending),
+        sum(num_converted for num_converted, _ in results),
+        sum(num_errors for _, num_errors in results),
+    )
+
+
+def load_converted_dataset(output_dir: str) -> Dataset:
+    """Load (memory-map) the shards written by `convert_structure_dataset`."""
+    with open(os.path.join(output_dir, CONVERSION_FILE)) as f:
+        conversion = json.load(f)
+    features = Features.from_dict(conversion["features"])
+    shards: List[Dataset] = []
+    for shard_index in range(conversion["num_shards"]):
+        path = os.path.join(
+            output_dir,
+            _shard_filename("data", shard_index, conversion["num_shards"], "arrow"),
+        )
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Shard {path} is missing: the conversion is incomplete"
+            )
+        shards.append(Dataset.from_file(path, info=DatasetInfo(features=features)))
+    return concatenate_datasets(shards)
+
+
+def read_conversion_errors(output_dir: str) -> List[dict]:
+    """Rows which failed to convert, with their row index and error."""
+    errors = []
+    for filename in sorted(os.listdir(output_dir)):
+        if filename.startswith("errors-") and filename.endswith(".jsonl"):
+            with open(os.path.join(output_dir, filename)) as f:
+                errors.extend(json.loads(line) for line in f)
+    return errors
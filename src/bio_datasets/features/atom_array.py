@@ -4,13 +4,15 @@ Features are decoded into biotite atom arrays.
 """
 import functools
 import gzip
+import json
 import logging
 import os
+import string
 import uuid
 from collections import OrderedDict
 from dataclasses import dataclass, field
 from io import BytesIO, StringIO
-from typing import Any, ClassVar, Dict, List, Optional, Union
+from typing import Any, ClassVar, Dict, Iterator, List, Optional, Union
 
 import numpy as np
 import pyarrow as pa
@@ -20,21 +22,20 @@ from biotite.structure.io.pdb import PDBFile
 from biotite.structure.residues import get_residue_starts
 from datasets import Array1D, Array2D, config
 from datasets.download import DownloadConfig
-from datasets.features.features import Value, get_nested_type
+from datasets.features.features import Sequence, Value, get_nested_type
 from datasets.table import array_cast, cast_array_to_feature
 from datasets.utils.file_utils import is_local_path, xopen, xsplitext
 from datasets.utils.py_utils import no_op_if_value_is_null, string_to_dict
 
 from bio_datasets import config as bio_config
+from bio_datasets.arrow_utils import list_array_to_numpy
+from bio_datasets.np_utils import map_categories_to_indices
 from bio_datasets.structure import (
     Biomolecule,
     BiomoleculeChain,
     BiomoleculeComplex,
     parsing,
 )
-from bio_datasets.structure.biomolecule import (
-    create_complete_atom_array_from_restype_index,
-)
 from bio_datasets.structure.protein import (
     ProteinChain,
     ProteinComplex,
@@ -42,15 +43,38 @@ from bio_datasets.structure.protein import (
     ProteinMixin,
 )
 from bio_datasets.structure.protein import constants as protein_constants
-from bio_datasets.structure.residue import ResidueDictionary, get_residue_starts_mask
+from bio_datasets.structure.protein import internal_coords
+from bio_datasets.structure.residue import (
+    ResidueDictionary,
+    create_complete_atom_array_from_restype_index,
+    expand_residue_templates,
+    get_atom_elements,
+    get_component_atoms,
+    get_residue_starts_mask,
+    get_standard_atom_names,
+)
 
 if bio_config.FOLDCOMP_AVAILABLE:
     import foldcomp
 
+from .coords_codec import (
+    DEFAULT_COORDS_RESOLUTION,
+    QUANTISED_COORDS_DTYPES,
+    dequantise_coords,
+    quantise_coords,
+)
+from .decode_cache import content_hash, get_decode_cache
+from .disk_cache import get_disk_cache
 from .features import CustomFeature, register_bio_feature
+from .parallel import timed_stage
 
 logger = logging.getLogger(__name__)
 
+CATEGORICAL_ANNOTATIONS = ["atom_name", "element", "chain_id"]
+DEFAULT_CHAIN_ID_VOCAB = list(
+    string.ascii_uppercase + string.ascii_lowercase + string.digits
+)
+
 extra_annots = [
     "b_factor",
     "occupancy",
@@ -59,55 +83,180 @@ extra_annots = [
 ]
 
 
-def element_from_atom_name(atom_name: np.ndarray, molecule_type: np.ndarray):
-    # TODO: write a vectorised version
-    # I think there is actually ambiguity here - CA can be alpha carbon or Calcium...
-    raise NotImplementedError()
+@functools.lru_cache(maxsize=None)
+def _ccd_atom_elements(res_name: str) -> Dict[str, str]:
+    """Element of each atom name of a CCD component (empty if not in the CCD)."""
+    try:
+        atom_names, elements = get_component_atoms(res_name)
+    except KeyError:
+        return {}
+    return dict(zip(atom_names.tolist(), elements.tolist()))
+
+
+def _element_from_atom_name_only(atom_name: str, res_name: str) -> str:
+    """Fallback for atoms whose residue template doesn't contain them.
+
+    Single-atom residues (i.e. ions, whose atom name matches the residue name,
+    as for calcium CA / CA) take the atom name as element; otherwise, the element
+    is the first letter of the atom name (CA -> alpha carbon), as for PDB atom
+    names of polymer residues.
+    """
+    letters = "".join(c for c in atom_name if c.isalpha()).upper()
+    if letters == res_name.upper() and letters in get_atom_elements():
+        return letters
+    return letters[:1]
+
+
+def element_from_atom_name(
+    atom_name: np.ndarray,
+    res_name: np.ndarray,
+    residue_dictionary: Optional[ResidueDictionary] = None,
+) -> np.ndarray:
+    """Infer elements from (res_name, atom_name) pairs.
+
+    Each distinct pair is looked up once, in the residue dictionary (if provided)
+    or else in the CCD component of the residue; atoms of unknown residues,
+    or atom names missing from their residue template, fall back to
+    `_element_from_atom_name_only`. Results are broadcast back to atoms with a
+    single take.
+    """
+    atom_name = np.asarray(atom_name)
+    res_name = np.asarray(res_name)
+    unique_res_names, res_inverse = np.unique(res_name, return_inverse=True)
+    unique_atom_names, atom_inverse = np.unique(atom_name, return_inverse=True)
+    pair_index, pair_inverse = np.unique(
+        res_inverse.reshape(-1) * len(unique_atom_names) + atom_inverse.reshape(-1),
+        return_inverse=True,
+    )
+    pair_res_index, pair_atom_index = np.divmod(pair_index, len(unique_atom_names))
+    pair_elements = []
+    for res_ix, atom_ix in zip(pair_res_index.tolist(), pair_atom_index.tolist()):
+        pair_res_name = str(unique_res_names[res_ix])
+        pair_atom_name = str(unique_atom_names[atom_ix])
+        element = None
+        if (
+            residue_dictionary is not None
+            and pair_res_name in residue_dictionary.residue_atoms
+            and pair_atom_name in residue_dictionary.residue_atoms[pair_res_name]
+        ):
+            element = residue_dictionary.residue_elements[pair_res_name][
+                residue_dictionary.residue_atoms[pair_res_name].index(pair_atom_name)
+            ]
+        if element is None:
+            element = _ccd_atom_elements(pair_res_name).get(pair_atom_name)
+        if element is None:
+            element = _element_from_atom_name_only(pair_atom_name, pair_res_name)
+        pair_elements.append(element)
+    return np.array(pair_elements, dtype="U2")[pair_inverse].reshape(atom_name.shape)
+
+
+_SEQUENCE_LETTER_SWAPS = {
+    "U": "C",
+    "O": "K",
+    "B": "X",
+    "J": "X",
+    "Z": "X",
+}
+_ATOM37_ELEMENTS = np.array(
+    [atom_name[0] for atom_name in protein_constants.atom_types]
+)  # first letter is the element for all protein heavy atoms
+
+
+def _res_names_from_sequence(sequence: str) -> np.ndarray:
+    # TODO: better support for non-standard amino acids
+    letters, inverse = np.unique(
+        np.array(list(sequence), dtype="U1"), return_inverse=True
+    )
+    res_names = [
+        protein_constants.restype_1to3.get(
+            _SEQUENCE_LETTER_SWAPS.get(letter, letter), protein_constants.unk_restype
+        )
+        for letter in letters.tolist()
+    ]
+    return np.array(res_names, dtype="U5")[inverse.reshape(-1)]
 
 
 def protein_atom_array_from_dict(
     d: Dict, backbone_atoms: Optional[List[str]] = None
 ) -> bs.AtomArray:
+    """Build a protein AtomArray from per-residue arrays.
+
+    `d` contains a `sequence` and either `backbone_coords` (a dict mapping each
+    backbone atom name to (L, 3) coords) or `atom37_coords` (L, 37, 3) and
+    `atom37_mask` (L, 37). Optional per-residue annotations (`chain_id`, `res_id`
+    and those in `extra_annots`) are tiled to atoms; `chain_id` may also be a
+    single chain id, or a string with one character per residue. All annotations
+    are set from arrays, without constructing per-atom objects.
+    """
     backbone_atoms = backbone_atoms or ["N", "CA", "C", "O"]
     sequence = d["sequence"]
-    annots_keys = [k for k in d.keys() if k in extra_annots]
-    swaps = {
-        "U": "C",
-        "O": "K",
-        "B": "X",
-        "J": "X",
-        "Z": "X",
-    }
+    num_residues = len(sequence)
     if "backbone_coords" in d:
         backbone_coords = d["backbone_coords"]
-        assert len(sequence) == len(d["backbone_coords"]["N"])
-        atoms = []
-        for res_ix, aa in enumerate(sequence):
-            # TODO: better support for non-standard amino acids
-            aa = swaps.get(aa, aa)
-            res_name = protein_constants.restype_1to3[aa]
-            for atom_name in backbone_atoms:
-                annots = {}
-                for k in annots_keys:
-                    annots[k] = d[k][res_ix]
-                atom = bs.Atom(
-                    coord=backbone_coords[atom_name][res_ix],
-                    chain_id="A",
-                    res_id=res_ix + 1,
-                    res_name=res_name,
-                    hetero=False,
-                    atom_name=atom_name,
-                    element=atom_name[0],  # for protein backbone atoms this is correct
-                    **annots,
-                )
-                atoms.append(atom)
-        arr = bs.array(atoms)
-        return arr
+        assert num_residues == len(backbone_coords["N"])
+        coords = np.stack(
+            [
+                np.asarray(backbone_coords[atom_name], dtype=np.float32)
+                for atom_name in backbone_atoms
+            ],
+            axis=1,
+        ).reshape(-1, 3)
+        residue_index = np.repeat(np.arange(num_residues), len(backbone_atoms))
+        atom_name = np.tile(np.array(backbone_atoms), num_residues)
+        # for protein backbone atoms this is correct
+        element = np.tile(np.array([name[0] for name in backbone_atoms]), num_residues)
     elif "atom37_coords" in d:
-        raise NotImplementedError("Atom37 not supported yet")
+        atom37_coords = np.asarray(d["atom37_coords"], dtype=np.float32)
+        atom37_mask = np.asarray(d["atom37_mask"], dtype=bool)
+        assert atom37_coords.shape[:2] == (
+            num_residues,
+            len(protein_constants.atom_types),
+        )
+        residue_index, atom37_index = np.nonzero(atom37_mask)
+        coords = atom37_coords[residue_index, atom37_index]
+        atom_name = np.array(protein_constants.atom_types)[atom37_index]
+        element = _ATOM37_ELEMENTS[atom37_index]
     else:
         raise ValueError("No coordinates found")
 
+    atoms = bs.AtomArray(len(coords))
+    atoms.coord = coords
+    chain_id = d.get("chain_id", "A")
+    if isinstance(chain_id, str):
+        # a string with one chain id per residue, or a single chain id
+        if len(chain_id) == num_residues and num_residues > 1:
+            chain_id = list(chain_id)
+        else:
+            chain_id = [chain_id] * num_residues
+    atoms.chain_id = np.asarray(chain_id)[residue_index]
+    if "res_id" in d:
+        atoms.res_id = np.asarray(d["res_id"])[residue_index]
+    else:
+        atoms.res_id = residue_index + 1
+    atoms.res_name = _res_names_from_sequence(sequence)[residue_index]
+    atoms.hetero[:] = False
+    atoms.atom_name = atom_name
+    atoms.element = element
+    for key in extra_annots:
+        if key in d:
+            atoms.set_annotation(key, np.asarray(d[key])[residue_index])
+    return atoms
+
+
+def iter_jsonl(path: Union[str, os.PathLike]) -> Iterator[Dict]:
+    """Lazily parse each line of a (possibly gzipped, possibly remote) JSONL file.
+
+    Only one line is held in memory at a time, so that e.g. dicts accepted by
+    `protein_atom_array_from_dict` can be streamed into `Dataset.from_generator`.
+    """
+    path = str(path)
+    with xopen(path, "rb") as f:
+        if path.endswith(".gz"):
+            f = gzip.open(f, "rt")
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
 
 def encode_biotite_atom_array(
     array: bs.AtomArray, encode_with_foldcomp: bool = False, name: Optional[str] = None
@@ -146,15 +295,16 @@ def load_structure_from_file_dict(
 
     if bytes_ is None:
         assert path is not None, "path is required when bytes is None"
-        return _load_from_path(
-            path,
-            file_type,
-            extra_fields,
-            token_per_repo_id,
-            fill_missing_residues=fill_missing_residues,
-            load_assembly=load_assembly,
-            include_bonds=include_bonds,
-        )
+        with timed_stage(f"{file_type}/parse"):  # includes reading the file
+            return _load_from_path(
+                path,
+                file_type,
+                extra_fields,
+                token_per_repo_id,
+                fill_missing_residues=fill_missing_residues,
+                load_assembly=load_assembly,
+                include_bonds=include_bonds,
+            )
     else:
         return _load_from_bytes(
             bytes_,
@@ -255,23 +405,25 @@ def _load_from_bytes(
     load_assembly: bool = False,
     include_bonds: bool = False,
 ) -> bs.AtomArray:
-    fhandler = _file_handler_from_bytes(bytes_, file_type)
-    if load_assembly:
-        return parsing.load_assembly(
-            fhandler,
-            file_type=file_type.replace(".gz", ""),
-            extra_fields=extra_fields,
-            fill_missing_residues=fill_missing_residues,
-            include_bonds=include_bonds,
-        )
-    else:
-        return parsing.load_structure(
-            fhandler,
-            file_type=file_type.replace(".gz", ""),
-            extra_fields=extra_fields,
-            fill_missing_residues=fill_missing_residues,
-            include_bonds=include_bonds,
-        )
+    with timed_stage(f"{file_type}/decompress"):
+        fhandler = _file_handler_from_bytes(bytes_, file_type)
+    with timed_stage(f"{file_type}/parse"):
+        if load_assembly:
+            return parsing.load_assembly(
+                fhandler,
+                file_type=file_type.replace(".gz", ""),
+                extra_fields=extra_fields,
+                fill_missing_residues=fill_missing_residues,
+                include_bonds=include_bonds,
+            )
+        else:
+            return parsing.load_structure(
+                fhandler,
+                file_type=file_type.replace(".gz", ""),
+                extra_fields=extra_fields,
+                fill_missing_residues=fill_missing_residues,
+                include_bonds=include_bonds,
+            )
 
 
 def _file_handler_from_bytes(bytes_: bytes, file_type: Optional[str]):
@@ -322,6 +474,22 @@ class AtomArrayFeature(CustomFeature):
         - atom_id
         - charge
         - element
+
+    Coordinates are stored as float32 or float16 (coords_dtype), or as int16 / int32
+    fixed-point values at coords_resolution angstroms relative to a per-structure
+    centroid offset, optionally delta encoded along the atoms (see
+    `bio_datasets.features.coords_codec` for the error bound).
+
+    With categorical_annotations, atom_name, element and chain_id are stored as
+    uint8 / uint16 indices into vocabularies, and decoded with a single take. Atom
+    name and element vocabularies default to the residue dictionary's atom_types
+    and element_types; without a residue dictionary, atom_name_vocab and
+    element_vocab default to the atom names of standard CCD components and all CCD
+    elements. chain_id_vocab defaults to single character chain ids. Vocabularies
+    other than the residue dictionary's are stored in the feature metadata.
+    Values outside the vocabulary (e.g. ligand atom names, or multi-character
+    chain ids) are stored with index len(vocab), and their strings in order in a
+    `<name>_other` string field.
     """
 
     residue_dictionary: Optional[Union[ResidueDictionary, Dict]] = None
@@ -335,10 +503,12 @@ class AtomArrayFeature(CustomFeature):
     encode_assembly: bool = False
     load_as: str = "biotite"  # biomolecule or chain or complex or biotite; if chain must be monomer
     constructor_kwargs: Optional[Dict] = None
-    coords_dtype: str = "float32"
+    coords_dtype: str = "float32"  # float32, float16, or int16 / int32 (fixed-point)
+    coords_resolution: float = DEFAULT_COORDS_RESOLUTION  # angstroms, for int dtypes
+    coords_delta_encoding: bool = False  # for int dtypes
     b_factor_is_plddt: bool = False
     b_factor_dtype: str = "float32"
-    with_element: bool = True
+    with_element: bool = True  # if False, inferred from res_name and atom_name
     with_hetero: bool = True  # TODO: can be inferred from res_name I guess...
     with_box: bool = False
     with_bonds: bool = False
@@ -348,6 +518,13 @@ class AtomArrayFeature(CustomFeature):
     with_atom_id: bool = False
     with_charge: bool = False
     with_ins_code: bool = False
+    categorical_annotations: bool = (
+        False  # store atom_name, element, chain_id as indices
+    )
+    atom_name_vocab: Optional[List[str]] = None
+    element_vocab: Optional[List[str]] = None
+    chain_id_vocab: Optional[List[str]] = None
+    cache_decoded: bool = False  # c.f. bio_datasets.features.decode_cache
     # Automatically constructed
     _type: str = field(
         default="AtomArrayFeature", init=False, repr=False
@@ -359,16 +536,20 @@ class AtomArrayFeature(CustomFeature):
             residue_identifier = ("restype_index", Array1D((None,), "uint8"))
         else:
             residue_identifier = ("res_name", Array1D((None,), "string"))
-        features = [
-            ("coords", Array2D((None, 3), self.coords_dtype)),
+        features = [("coords", Array2D((None, 3), self.coords_dtype))]
+        if self.coords_dtype in QUANTISED_COORDS_DTYPES:
+            features.append(("coords_offset", Array1D((3,), "float64")))
+        features += [
             residue_identifier,
             (
                 "chain_id",
-                Array1D((None,), "string"),
+                Array1D((None,), self._annotation_dtype("chain_id")),
             ),  # TODO: could make Value(string) if load_as == "chain"
         ]
         if not self.all_atoms_present:
-            features.append(("atom_name", Array1D((None,), "string")))
+            features.append(
+                ("atom_name", Array1D((None,), self._annotation_dtype("atom_name")))
+            )
             features.append(("residue_starts", Array1D((None,), "uint32")))
         if self.with_res_id:
             features.append(("res_id", Array1D((None,), "uint32")))
@@ -389,7 +570,15 @@ class AtomArrayFeature(CustomFeature):
         if self.with_charge:
             features.append(("charge", Array1D((None,), "int8")))
         if self.with_element:
-            features.append(("element", Array1D((None,), "string")))
+            features.append(
+                ("element", Array1D((None,), self._annotation_dtype("element")))
+            )
+        features += [
+            # n.b. not Array1D: zero-length arrays break slicing columns with None rows
+            (f"{name}_other", Sequence(Value("string")))
+            for name, _ in features
+            if name in self._vocabs
+        ]
         return OrderedDict(
             features
         )  # order may not be important due to Features.recursive_reorder
@@ -401,15 +590,45 @@ class AtomArrayFeature(CustomFeature):
                 self.residue_dictionary is not None
             ), "residue_dictionary is required when all_atoms_present is True"
         self.deserialize()
+        self._vocabs = self._make_vocabs()
         self._features = self._make_features_dict()
-        if not self.with_element and not self.all_atoms_present:
-            # TODO: support element inference
-            raise ValueError("with_element must be True if all_atoms_present is False")
         if self.encode_assembly or self.with_bonds:
             raise NotImplementedError(
                 "Not implemented"
             )  # proper loading, encoding and decoding needed
 
+    def _make_vocabs(self) -> Dict[str, np.ndarray]:
+        """Vocabulary of each categorical annotation (empty if not categorical)."""
+        if not self.categorical_annotations:
+            return {}
+        if self.residue_dictionary is not None:
+            atom_names = self.residue_dictionary.atom_types
+            elements = self.residue_dictionary.element_types
+        else:
+            # stored as dataclass fields, so saved in the feature metadata
+            if self.atom_name_vocab is None:
+                self.atom_name_vocab = get_standard_atom_names()
+            if self.element_vocab is None:
+                self.element_vocab = get_atom_elements()
+            atom_names, elements = self.atom_name_vocab, self.element_vocab
+        if self.chain_id_vocab is None:
+            self.chain_id_vocab = DEFAULT_CHAIN_ID_VOCAB
+        vocabs = {
+            "atom_name": np.array(atom_names),
+            "element": np.array(elements),
+            "chain_id": np.array(self.chain_id_vocab),
+        }
+        for name, vocab in vocabs.items():
+            if len(vocab) > np.iinfo(np.uint16).max:
+                raise ValueError(f"{name} vocabulary too large to index with uint16")
+        return vocabs
+
+    def _annotation_dtype(self, name: str) -> str:
+        if name not in self._vocabs:
+            return "string"
+        # index len(vocab) marks values outside the vocabulary
+        return "uint8" if len(self._vocabs[name]) < 256 else "uint16"
+
     def __call__(self):
         return get_nested_type(self._features)
 
@@ -445,8 +664,8 @@ class AtomArrayFeature(CustomFeature):
 
     def cast_storage(self, array: pa.StructArray) -> pa.StructArray:
         null_mask = array.is_null()
-        if null_mask.sum() == len(null_mask):
-            null_array = pa.array([None] * len(array))
+        null_array = pa.array([None] * len(array))
+        if array.null_count == len(array):
             arrays = [
                 cast_array_to_feature(null_array, subfeature)
                 for _, subfeature in self._features.items()
@@ -513,7 +732,16 @@ class AtomArrayFeature(CustomFeature):
     def _build_atom_array_struct(
         self, value: bs.AtomArray, residue_starts: np.ndarray
     ) -> dict:
-        atom_array_struct = {"coords": value.coord}
+        if self.coords_dtype in QUANTISED_COORDS_DTYPES:
+            coords, coords_offset = quantise_coords(
+                value.coord,
+                resolution=self.coords_resolution,
+                dtype=self.coords_dtype,
+                delta_encoding=self.coords_delta_encoding,
+            )
+            atom_array_struct = {"coords": coords, "coords_offset": coords_offset}
+        else:
+            atom_array_struct = {"coords": value.coord}
         if self.residue_dictionary is not None:
             atom_array_struct[
                 "restype_index"
@@ -527,8 +755,23 @@ class AtomArrayFeature(CustomFeature):
             atom_array_struct["atom_name"] = value.atom_name
         atom_array_struct["chain_id"] = value.chain_id[residue_starts]
         self._add_optional_attributes(atom_array_struct, value, residue_starts)
+        self._encode_categorical(atom_array_struct)
         return atom_array_struct
 
+    def _encode_categorical(self, atom_array_struct: dict):
+        """Replace categorical annotations with vocabulary indices (in place)."""
+        for name, vocab in self._vocabs.items():
+            if name not in atom_array_struct:
+                continue
+            values = atom_array_struct[name]
+            is_known = np.isin(values, vocab)
+            indices = np.full(len(values), len(vocab), dtype=int)
+            indices[is_known] = map_categories_to_indices(
+                values[is_known], vocab.tolist()
+            )
+            atom_array_struct[name] = indices.astype(self._annotation_dtype(name))
+            atom_array_struct[f"{name}_other"] = values[~is_known].astype(str).tolist()
+
     def _add_optional_attributes(
         self, atom_array_struct: dict, value: bs.AtomArray, residue_starts: np.ndarray
     ):
@@ -573,9 +816,87 @@ class AtomArrayFeature(CustomFeature):
         #     load_structure(fhandler, format=file_type, extra_fields=self.extra_fields)
         # )
 
+    @property
+    def _atom_field(self) -> str:
+        """Per-atom field whose presence marks a non-null encoded example."""
+        return "coords"
+
+    def _decode_coords_batch(self, columns, lengths):
+        """Decode stored coordinates into a float "coords" column (in place)."""
+        if self.coords_dtype in QUANTISED_COORDS_DTYPES:
+            columns["coords"] = dequantise_coords(
+                columns["coords"],
+                columns.pop("coords_offset"),
+                lengths["coords"],
+                resolution=self.coords_resolution,
+                delta_encoding=self.coords_delta_encoding,
+            )
+
+    def _decode_categorical_batch(self, columns):
+        """Replace vocabulary indices with categorical annotations (in place)."""
+        for name, vocab in self._vocabs.items():
+            other = columns.pop(f"{name}_other", None)
+            if columns.get(name) is None:
+                continue
+            indices = columns[name]
+            is_other = indices == len(vocab)
+            if not is_other.any():
+                columns[name] = np.take(vocab, indices)
+                continue
+            other = np.asarray(other).astype(str)
+            values = np.take(vocab, np.where(is_other, 0, indices))
+            values = values.astype(np.result_type(values.dtype, other.dtype))
+            values[is_other] = other
+            columns[name] = values
+
+    def _decode_example_columns(self, value: dict) -> dict:
+        """Decode the stored columns of a single example, as a batch of one."""
+        columns = {
+            key: np.asarray(val) if val is not None else val
+            for key, val in value.items()
+        }
+        lengths = {
+            key: np.array([len(val)])
+            for key, val in columns.items()
+            if val is not None and val.ndim > 0
+        }
+        self._decode_categorical_batch(columns)
+        self._decode_coords_batch(columns, lengths)
+        return columns
+
+    def _decode_cache_key(self, value: dict) -> str:
+        if getattr(self, "_decode_options_hash", None) is None:
+            # decoding depends on all (serialised) feature options
+            self._decode_options_hash = content_hash(repr(self))
+        parts = [self._decode_options_hash]
+        for name, subfeature in self._features.items():
+            val = value.get(name)
+            if val is not None:
+                # the same example has the same key whichever formatter produced it
+                is_numeric = (
+                    isinstance(subfeature, (Array1D, Array2D))
+                    and subfeature.dtype != "string"
+                )
+                # (non-array fields are string sequences)
+                val = np.asarray(val, dtype=subfeature.dtype if is_numeric else str)
+            parts += [name, val]
+        return content_hash(*parts)
+
     def _decode_atoms(self, value, token_per_repo_id=None):
-        if not isinstance(value["coords"], (np.ndarray, list)):
+        if not isinstance(value[self._atom_field], (np.ndarray, list)):
             return None
+        if not self.cache_decoded:
+            return self._decode_uncached_atoms(value)
+        cache = get_decode_cache()
+        key = self._decode_cache_key(value)
+        atoms = cache.get(key)
+        if atoms is None:
+            atoms = self._decode_uncached_atoms(value)
+            cache.put(key, atoms)
+        return atoms
+
+    def _decode_uncached_atoms(self, value):
+        value = self._decode_example_columns(value)
 
         num_atoms = len(value["coords"])
         if self.all_atoms_present:
@@ -583,6 +904,12 @@ class AtomArrayFeature(CustomFeature):
         else:
             atoms, residue_index = self._decode_partial_atoms(value, num_atoms)
 
+        if "box" in value:
+            atoms.box = value.pop("box")
+        self._set_atom_annotations(value, atoms, residue_index)
+        return atoms
+
+    def _set_atom_annotations(self, value, atoms, residue_index):
         if self.b_factor_is_plddt and "b_factor" in value:
             atoms.set_annotation("b_factor", value.pop("b_factor")[residue_index])
         atoms.coord = value.pop("coords")
@@ -590,12 +917,11 @@ class AtomArrayFeature(CustomFeature):
             bonds_array = value.pop("bond_edges")
             bond_types = value.pop("bond_types")
             bonds_array = np.concatenate([bonds_array, bond_types[:, None]], axis=1)
-            bonds = bs.BondList(num_atoms, bonds_array)
+            bonds = bs.BondList(len(atoms), bonds_array)
             atoms.bond_list = bonds
 
         for key, val in value.items():
             atoms.set_annotation(key, val)
-        return atoms
 
     def _decode_complete_atoms(self, value):
         restype_index = value.pop("restype_index")
@@ -644,13 +970,221 @@ class AtomArrayFeature(CustomFeature):
         if self.with_element:
             atoms.set_annotation("element", value.pop("element"))
         else:
-            raise ValueError("with_element must be True if all_atoms_present is False")
+            atoms.set_annotation(
+                "element",
+                element_from_atom_name(
+                    atoms.atom_name, atoms.res_name, self.residue_dictionary
+                ),
+            )
+
+    def _flatten_examples(self, examples: List[Optional[dict]]):
+        """Concatenate the fields of a list of encoded examples into flat buffers."""
+        is_valid = np.array(
+            [
+                example is not None
+                and isinstance(example[self._atom_field], (np.ndarray, list))
+                for example in examples
+            ],
+            dtype=bool,
+        )
+        valid_examples = [ex for ex, valid in zip(examples, is_valid) if valid]
+        columns, lengths = {}, {}
+        for name, subfeature in self._features.items():
+            if not valid_examples or valid_examples[0].get(name) is None:
+                continue
+            dtype = str if isinstance(subfeature, Sequence) else None
+            values = [
+                np.asarray(example[name], dtype=dtype) for example in valid_examples
+            ]
+            if isinstance(subfeature, Array2D):
+                values = [v.reshape(-1, subfeature.shape[1]) for v in values]
+            lengths[name] = np.array([len(v) for v in values], dtype=np.int64)
+            columns[name] = np.concatenate(values)
+        return columns, lengths, is_valid
+
+    def _flatten_arrow(self, array: Union[pa.Array, pa.ChunkedArray]):
+        """Read the fields of an Arrow struct column into flat buffers and offsets.
+
+        The list offsets of each field give the per-example lengths, so no
+        per-row conversion to python objects is needed.
+        """
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        if isinstance(array, pa.ExtensionArray):
+            array = array.storage
+        is_valid = array.is_valid().to_numpy(zero_copy_only=False)
+        if not is_valid.all():
+            array = array.filter(array.is_valid())
+        columns, lengths = {}, {}
+        for name, subfeature in self._features.items():
+            if array.type.get_field_index(name) < 0:
+                continue
+            field_array = array.field(name)
+            if len(array) == 0 or field_array.null_count == len(field_array):
+                continue
+            values, offsets = list_array_to_numpy(
+                field_array, getattr(subfeature, "shape", (None,))[1:]
+            )
+            # decoded atom arrays own their data, whereas arrow buffers are read-only
+            columns[name] = values if values.flags.writeable else values.copy()
+            lengths[name] = np.diff(offsets)
+        return columns, lengths, is_valid
+
+    def _decode_complete_atoms_batch(self, columns, lengths):
+        num_residues = lengths["restype_index"]
+        residue_offsets = np.concatenate([[0], np.cumsum(num_residues)])
+        example_index = np.repeat(np.arange(len(num_residues)), num_residues)
+        restype_index = columns.pop("restype_index")
+        chain_id = columns.pop("chain_id").astype(str)
+        # as for single examples, chains are ordered alphabetically within each example
+        residue_order = np.lexsort((chain_id, example_index))
+        chain_id = chain_id[residue_order]
+        chain_starts = np.ones(len(chain_id), dtype=bool)
+        chain_starts[1:] = (chain_id[1:] != chain_id[:-1]) | (
+            example_index[1:] != example_index[:-1]
+        )
+        atoms, _, _ = expand_residue_templates(
+            restype_index[residue_order],
+            residue_dictionary=self.residue_dictionary,
+            chain_id=chain_id,
+            chain_starts=chain_starts,
+            backbone_only=self.backbone_only,
+        )
+        batch_residue_index = atoms.res_index
+        # residue index within each example, as when decoding single examples
+        atoms.res_index = (
+            batch_residue_index - residue_offsets[example_index[batch_residue_index]]
+        )
+        return atoms, residue_order[batch_residue_index]
+
+    def _decode_partial_atoms_batch(self, columns, lengths, atom_offsets):
+        residue_key = (
+            "restype_index" if self.residue_dictionary is not None else "res_name"
+        )
+        num_residues = lengths[residue_key]
+        residue_offsets = np.concatenate([[0], np.cumsum(num_residues)])
+        atoms = bs.AtomArray(atom_offsets[-1])
+        # residue starts are stored relative to each example
+        residue_starts = columns.pop("residue_starts").astype(np.int64) + np.repeat(
+            atom_offsets[:-1], num_residues
+        )
+        residue_index = np.cumsum(get_residue_starts_mask(atoms, residue_starts)) - 1
+        if "res_id" not in columns:
+            # residue numbering restarts for each example
+            columns["res_id"] = (
+                np.arange(residue_offsets[-1])
+                - np.repeat(residue_offsets[:-1], num_residues)
+                + 1
+            )
+        self._set_residue_annotations(columns, atoms, residue_index)
+        return atoms, residue_index
+
+    def _decode_atoms_batch(self, columns, lengths) -> List[bs.AtomArray]:
+        """Decode flattened columns into one atom array per example.
+
+        Residue-level annotations are tiled to atoms once for the whole batch;
+        the returned atom arrays are slices of a single batch-level atom array.
+        """
+        atom_offsets = np.concatenate([[0], np.cumsum(lengths["coords"])])
+        if self.all_atoms_present:
+            atoms, residue_index = self._decode_complete_atoms_batch(columns, lengths)
+        else:
+            atoms, residue_index = self._decode_partial_atoms_batch(
+                columns, lengths, atom_offsets
+            )
+        box = columns.pop("box", None)
+        if "bond_edges" in columns:
+            columns["bond_edges"] = (
+                columns["bond_edges"].astype(np.int64)
+                + np.repeat(atom_offsets[:-1], lengths["bond_edges"])[:, None]
+            )
+        self._set_atom_annotations(columns, atoms, residue_index)
+
+        example_atoms = []
+        for ix, (start, end) in enumerate(zip(atom_offsets[:-1], atom_offsets[1:])):
+            example = atoms[start:end]
+            if box is not None:
+                example.box = box[3 * ix : 3 * (ix + 1)]
+            example_atoms.append(example)
+        return example_atoms
+
+    def decode_batch(self, examples, token_per_repo_id=None):
+        """Decode a column of encoded examples.
+
+        Accepts either a list of encoded examples or an Arrow struct array
+        (e.g. a column of an Arrow table), in which case fields are read directly
+        from the Arrow buffers.
+        """
+        if isinstance(examples, (pa.Array, pa.ChunkedArray)):
+            columns, lengths, is_valid = self._flatten_arrow(examples)
+        else:
+            columns, lengths, is_valid = self._flatten_examples(examples)
+        decoded = [None] * len(is_valid)
+        if is_valid.any():
+            if self._cache_decoded_batches:
+                batch_decoded = [
+                    self._load_as(atoms)
+                    for atoms in self._decode_cached_atoms_batch(columns, lengths)
+                ]
+            else:
+                self._decode_categorical_batch(columns)
+                self._decode_coords_batch(columns, lengths)
+                batch_decoded = self._decode_flattened_batch(columns, lengths)
+            for ix, example in zip(np.flatnonzero(is_valid), batch_decoded):
+                decoded[ix] = example
+        return decoded
+
+    @property
+    def _cache_decoded_batches(self) -> bool:
+        return self.cache_decoded
+
+    def _decode_cached_atoms_batch(self, columns, lengths) -> List[bs.AtomArray]:
+        """Decode the atom arrays of a flattened batch, via the decode cache.
+
+        Each example has the same cache key as when decoded on its own, and only
+        examples missing from the cache are decoded, as a single batch.
+        """
+        cache = get_decode_cache()
+        offsets = {
+            name: np.concatenate([[0], np.cumsum(n)]) for name, n in lengths.items()
+        }
+        keys = [
+            self._decode_cache_key(
+                {
+                    name: values[offsets[name][ix] : offsets[name][ix + 1]]
+                    for name, values in columns.items()
+                }
+            )
+            for ix in range(len(lengths[self._atom_field]))
+        ]
+        atoms_list = [cache.get(key) for key in keys]
+        is_miss = np.array([atoms is None for atoms in atoms_list], dtype=bool)
+        if is_miss.any():
+            columns = {
+                name: values[np.repeat(is_miss, lengths[name])]
+                for name, values in columns.items()
+            }
+            lengths = {name: n[is_miss] for name, n in lengths.items()}
+            self._decode_categorical_batch(columns)
+            self._decode_coords_batch(columns, lengths)
+            miss_atoms = self._decode_atoms_batch(columns, lengths)
+            for ix, atoms in zip(np.flatnonzero(is_miss), miss_atoms):
+                cache.put(keys[ix], atoms)
+                atoms_list[ix] = atoms
+        return atoms_list
+
+    def _decode_flattened_batch(self, columns, lengths) -> List[Any]:
+        return [
+            self._load_as(atoms) for atoms in self._decode_atoms_batch(columns, lengths)
+        ]
 
     def _decode_example(
         self, value: dict, token_per_repo_id=None
     ) -> Union["bs.AtomArray", None]:
         atoms = self._decode_atoms(value, token_per_repo_id=token_per_repo_id)
+        return self._load_as(atoms)
 
+    def _load_as(self, atoms: bs.AtomArray):
         constructor_kwargs = self.constructor_kwargs or {}
         if self.load_as == "biotite":
             return atoms
@@ -658,6 +1192,7 @@ class AtomArrayFeature(CustomFeature):
             residue_dict = self.residue_dictionary or ResidueDictionary.from_ccd_dict()
             return Biomolecule(atoms, residue_dict, **constructor_kwargs)
         elif self.load_as == "chain":
+            residue_dict = self.residue_dictionary or ResidueDictionary.from_ccd_dict()
             return BiomoleculeChain(atoms, residue_dict, **constructor_kwargs)
         elif self.load_as == "complex":
             return BiomoleculeComplex.from_atoms(
@@ -723,6 +1258,8 @@ class StructureFeature(CustomFeature):
     with_charge: bool = False
     encode_with_foldcomp: bool = False
     compression: Optional[str] = None  # "gzip" or "foldcomp" or None
+    cache_decoded: bool = False  # c.f. bio_datasets.features.decode_cache
+    disk_cache: bool = False  # c.f. bio_datasets.features.disk_cache
     pa_type: ClassVar[Any] = pa.struct(
         {"bytes": pa.binary(), "path": pa.string(), "type": pa.string()}
     )
@@ -835,7 +1372,24 @@ class StructureFeature(CustomFeature):
                 "Decoding is disabled for this feature. Please use Structure(decode=True) instead."
             )
 
-        atoms = load_structure_from_file_dict(
+        if not (self.cache_decoded or self.disk_cache):
+            return self._load_atoms(value, token_per_repo_id=token_per_repo_id)
+        key = self._decode_cache_key(value)
+        if self.cache_decoded:
+            atoms = get_decode_cache().get(key)
+            if atoms is not None:
+                return atoms
+        atoms = get_disk_cache().get(key) if self.disk_cache else None
+        if atoms is None:
+            atoms = self._load_atoms(value, token_per_repo_id=token_per_repo_id)
+            if self.disk_cache:
+                get_disk_cache().put(key, atoms)
+        if self.cache_decoded:
+            get_decode_cache().put(key, atoms)
+        return atoms
+
+    def _load_atoms(self, value: dict, token_per_repo_id=None) -> bs.AtomArray:
+        return load_structure_from_file_dict(
             value,
             token_per_repo_id=token_per_repo_id,
             extra_fields=self.extra_fields,
@@ -843,7 +1397,25 @@ class StructureFeature(CustomFeature):
             load_assembly=self.load_assembly,
             include_bonds=self.include_bonds,
         )
-        return atoms
+
+    def _decode_cache_key(self, value: dict) -> str:
+        """Content hash of the bytes, or the path (with mtime and size if local)."""
+        if value.get("bytes") is not None:
+            source = ("bytes", value["bytes"])
+        else:
+            path = value["path"]
+            source = ("path", path)
+            if is_local_path(path) and os.path.exists(path):
+                stat = os.stat(path)
+                source += (stat.st_mtime_ns, stat.st_size)
+        return content_hash(
+            *source,
+            value["type"],
+            self.extra_fields,
+            self.fill_missing_residues,
+            self.load_assembly,
+            self.include_bonds,
+        )
 
     def _decode_example(
         self, value: dict, token_per_repo_id=None
@@ -871,17 +1443,18 @@ class StructureFeature(CustomFeature):
         constructor_kwargs = self.constructor_kwargs or {}
         if self.load_as == "biotite":
             return atoms
-        if self.load_as == "biomolecule":
-            return Biomolecule(atoms, **constructor_kwargs)
-        elif self.load_as == "chain":
-            return BiomoleculeChain(atoms, **constructor_kwargs)
-        elif self.load_as == "complex":
-            return BiomoleculeComplex.from_atoms(
-                atoms,
-                **constructor_kwargs,
-            )
-        else:
-            raise ValueError(f"Unsupported load_as: {self.load_as}")
+        with timed_stage("load_as"):
+            if self.load_as == "biomolecule":
+                return Biomolecule(atoms, **constructor_kwargs)
+            elif self.load_as == "chain":
+                return BiomoleculeChain(atoms, **constructor_kwargs)
+            elif self.load_as == "complex":
+                return BiomoleculeComplex.from_atoms(
+                    atoms,
+                    **constructor_kwargs,
+                )
+            else:
+                raise ValueError(f"Unsupported load_as: {self.load_as}")
 
     def cast_storage(self, storage: pa.StructArray) -> pa.StructArray:
         if pa.types.is_struct(storage.type):
@@ -1019,6 +1592,14 @@ class ProteinAtomArrayFeature(AtomArrayFeature):
     and are guaranteed to contain no HETATMs or hydrogens.
 
     For generic storage of atom arrays without standardisation, see AtomArrayFeature
+
+    Coordinates can be stored as internal coordinates (see
+    `bio_datasets.structure.protein.internal_coords`) by setting
+    internal_coords_type to 'pnerf' (bond lengths, angles and torsions; lossless
+    up to internal_coords_dtype precision) or 'idealised' (bond angles and
+    torsions, with ideal bond lengths). internal_coords_dtype='uint16' discretises
+    values to ~1e-4 rad / angstrom. Reconstruction restarts from stored anchor
+    coordinates every internal_coords_anchor_interval residues.
     """
 
     all_atoms_present: bool = False
@@ -1026,17 +1607,66 @@ class ProteinAtomArrayFeature(AtomArrayFeature):
     residue_dictionary: ProteinDictionary = field(
         default_factory=functools.partial(ProteinDictionary.from_preset, "protein")
     )
-    load_as: str = "complex"  # biomolecule or chain or complex or biotite; if chain must be monomer
-    internal_coords_type: str = None  # foldcomp, idealised, or pnerf
+    load_as: str = "complex"  # biomolecule or chain or complex or biotite or atom37 or atom14; if chain must be monomer
+    internal_coords_type: Optional[str] = None  # pnerf or idealised
+    internal_coords_dtype: str = "uint16"  # uint16 (discretised), float16 or float32
+    internal_coords_anchor_interval: int = internal_coords.DEFAULT_ANCHOR_INTERVAL
     _type: str = field(
         default="ProteinAtomArrayFeature", init=False, repr=False
     )  # registered feature name
 
     def __post_init__(self):
+        if self.internal_coords_type is not None:
+            if self.internal_coords_type not in internal_coords.INTERNAL_COORDS_TYPES:
+                raise ValueError(
+                    f"Unsupported internal_coords_type: {self.internal_coords_type}. "
+                    f"Expected one of {internal_coords.INTERNAL_COORDS_TYPES}"
+                )
+            if self.internal_coords_dtype not in internal_coords.INTERNAL_COORDS_DTYPES:
+                raise ValueError(
+                    f"Unsupported internal_coords_dtype: {self.internal_coords_dtype}. "
+                    f"Expected one of {internal_coords.INTERNAL_COORDS_DTYPES}"
+                )
+            assert (
+                self.all_atoms_present and not self.backbone_only
+            ), "internal_coords_type requires all_atoms_present"
+            if self.coords_dtype in QUANTISED_COORDS_DTYPES:
+                raise ValueError(
+                    "internal_coords_type cannot be combined with quantised coords_dtype"
+                )
+            if self.internal_coords_anchor_interval < 1:
+                raise ValueError("internal_coords_anchor_interval must be positive")
         super().__post_init__()
         assert (
             self.residue_dictionary is not None
         ), "residue_dictionary must be provided"
+        if self.load_as in ["atom37", "atom14"]:
+            assert (
+                self.all_atoms_present and not self.backbone_only
+            ), f"load_as={self.load_as} requires all_atoms_present"
+
+    def _make_features_dict(self):
+        features = super()._make_features_dict()
+        if self.internal_coords_type is None:
+            return features
+        features.pop("coords")
+        internal_features = [
+            ("anchor_coords", Array2D((None, 3), "float32")),
+            ("fragment_starts", Array1D((None,), "uint32")),
+            ("fallback_atoms", Array1D((None,), "uint32")),
+            ("fallback_coords", Array2D((None, 3), "float32")),
+            ("torsions", Array1D((None,), self.internal_coords_dtype)),
+            ("bond_angles", Array1D((None,), self.internal_coords_dtype)),
+        ]
+        if self.internal_coords_type == "pnerf":
+            internal_features.append(
+                ("bond_lengths", Array1D((None,), self.internal_coords_dtype))
+            )
+        return OrderedDict(internal_features + list(features.items()))
+
+    @property
+    def _atom_field(self) -> str:
+        return "coords" if self.internal_coords_type is None else "torsions"
 
     def deserialize(self):
         if isinstance(self.residue_dictionary, dict):
@@ -1084,7 +1714,8 @@ class ProteinAtomArrayFeature(AtomArrayFeature):
                 if self.residue_dictionary
                 else ["N", "CA", "C", "O"],
             )
-            return self.encode_example(value)
+            # built from amino acid heavy atoms, so only OXT / backbone filtering applies
+            return super()._encode_example(self._filter_protein_atoms(value))
         if isinstance(value, ProteinMixin):
             # TODO: switch to extracting backbone.
             if self.backbone_only:
@@ -1095,20 +1726,191 @@ class ProteinAtomArrayFeature(AtomArrayFeature):
         if isinstance(value, bs.AtomArray):
             value = value[~np.isin(value.element, ["H", "D"])]
             value = value[filter_amino_acids(value)]
-            if not self.residue_dictionary.keep_oxt:
-                value = value[value.atom_name != "OXT"]
-            if self.backbone_only:
-                backbone_mask = np.isin(
-                    value.atom_name, self.residue_dictionary.backbone_atoms
-                )
-                value = value[backbone_mask]
-            return super()._encode_example(value)
+            return super()._encode_example(self._filter_protein_atoms(value))
         return super()._encode_example(value)
 
+    def _filter_protein_atoms(self, value: bs.AtomArray) -> bs.AtomArray:
+        mask = np.ones(len(value), dtype=bool)
+        if not self.residue_dictionary.keep_oxt:
+            mask &= value.atom_name != "OXT"
+        if self.backbone_only:
+            mask &= np.isin(value.atom_name, self.residue_dictionary.backbone_atoms)
+        return value if mask.all() else value[mask]
+
+    def _internal_coords_layout(self, restype_index, chain_id, num_residues):
+        """Layout of the standardised atoms of a batch of `num_residues` examples."""
+        residue_offsets = np.concatenate([[0], np.cumsum(num_residues)])
+        chain_starts = np.ones(len(restype_index), dtype=bool)
+        chain_starts[1:] = chain_id[1:] != chain_id[:-1]
+        chain_starts[residue_offsets[:-1][num_residues > 0]] = True
+        layout = internal_coords.AtomLayout.from_residues(
+            restype_index, chain_starts, self.residue_dictionary
+        )
+        return layout, chain_starts, residue_offsets
+
+    def _build_atom_array_struct(
+        self, value: bs.AtomArray, residue_starts: np.ndarray
+    ) -> dict:
+        atom_array_struct = super()._build_atom_array_struct(value, residue_starts)
+        if self.internal_coords_type is not None:
+            coords = atom_array_struct.pop("coords")
+            layout, chain_starts, _ = self._internal_coords_layout(
+                atom_array_struct["restype_index"],
+                atom_array_struct["chain_id"],
+                np.array([len(residue_starts)]),
+            )
+            if layout.num_atoms != len(coords):
+                raise ValueError(
+                    "Number of atoms does not match residue dictionary templates"
+                )
+            encoded = internal_coords.encode_internal_coords(
+                coords,
+                layout,
+                chain_starts,
+                internal_coords_type=self.internal_coords_type,
+                anchor_interval=self.internal_coords_anchor_interval,
+            )
+            atom_array_struct.update(
+                internal_coords.discretise_internal_coords(
+                    encoded, self.internal_coords_dtype
+                )
+            )
+        return atom_array_struct
+
+    def _decode_coords_batch(self, columns, lengths):
+        """Reconstruct coords from internal coords, if stored (in place)."""
+        if self.internal_coords_type is None:
+            return super()._decode_coords_batch(columns, lengths)
+        internal = {
+            key: columns.pop(key)
+            for key in [
+                "anchor_coords",
+                "fragment_starts",
+                "fallback_atoms",
+                "fallback_coords",
+                "torsions",
+                "bond_angles",
+                "bond_lengths",
+            ]
+            if key in columns
+        }
+        layout, chain_starts, residue_offsets = self._internal_coords_layout(
+            columns["restype_index"].astype(int),
+            columns["chain_id"],
+            lengths["restype_index"],
+        )
+        if layout.num_atoms != len(internal["torsions"]):
+            raise ValueError(
+                "Number of stored atoms does not match residue dictionary templates"
+            )
+        atom_offsets = np.append(layout.residue_starts, len(internal["torsions"]))[
+            residue_offsets
+        ]
+        # fragment starts and fallback atoms are stored relative to each example
+        internal["fragment_starts"] = internal["fragment_starts"].astype(
+            np.int64
+        ) + np.repeat(residue_offsets[:-1], lengths["fragment_starts"])
+        internal["fallback_atoms"] = internal["fallback_atoms"].astype(
+            np.int64
+        ) + np.repeat(atom_offsets[:-1], lengths["fallback_atoms"])
+        columns["coords"] = internal_coords.decode_internal_coords(
+            internal_coords.undiscretise_internal_coords(internal),
+            layout,
+            chain_starts,
+            self.residue_dictionary,
+        )
+        lengths["coords"] = np.diff(atom_offsets)
+
     def _decode_example(
         self, encoded: dict, token_per_repo_id=None
     ) -> Union["ProteinChain", "ProteinComplex", None]:
+        if self.load_as in ["atom37", "atom14"]:
+            return self.decode_batch([encoded])[0]
         atoms = self._decode_atoms(encoded, token_per_repo_id=token_per_repo_id)
+        return self._load_as(atoms)
+
+    @property
+    def _cache_decoded_batches(self) -> bool:
+        # dense batches are decoded without building atom arrays
+        return self.cache_decoded and self.load_as not in ["atom37", "atom14"]
+
+    def _decode_flattened_batch(self, columns, lengths) -> List[Any]:
+        if self.load_as in ["atom37", "atom14"]:
+            return self._decode_dense_batch(columns, lengths)
+        return super()._decode_flattened_batch(columns, lengths)
+
+    def _decode_dense_batch(self, columns, lengths) -> List[Dict[str, np.ndarray]]:
+        """Scatter stored coords into dense (num_residues, 37 | 14, 3) arrays.
+
+        Since all atoms are present, the position of each stored atom follows
+        from the residue templates of the residue dictionary, so we can scatter
+        coords for the whole batch at once without building any atom arrays.
+        Atoms without a position in the dense representation (i.e. OXT for atom14)
+        are dropped; missing atoms have nan coords and are False in the mask.
+        """
+        residue_dictionary = self.residue_dictionary
+        if self.load_as == "atom37":
+            num_slots = len(protein_constants.atom_types)
+            index_by_residue = residue_dictionary.atom37_index_by_residue()
+        else:
+            num_slots = 14
+            index_by_residue = residue_dictionary.atom14_index_by_residue()
+
+        restype_index = columns["restype_index"].astype(int)
+        chain_id = columns["chain_id"]
+        num_residues = len(restype_index)
+        residue_offsets = np.concatenate([[0], np.cumsum(lengths["restype_index"])])
+        # standardised atoms are stored in chain order, so chains are contiguous
+        chain_starts = np.ones(num_residues, dtype=bool)
+        chain_starts[1:] = chain_id[1:] != chain_id[:-1]
+        chain_starts[residue_offsets[:-1]] = True
+        # (includes oxt on the last residue of each chain if keep_oxt)
+        residue_sizes = residue_dictionary.get_residue_sizes(
+            restype_index, np.cumsum(chain_starts)
+        )
+        if residue_sizes.sum() != len(columns["coords"]):
+            raise ValueError(
+                "Number of stored atoms does not match residue dictionary templates"
+            )
+
+        atom_residue_index = np.repeat(np.arange(num_residues), residue_sizes)
+        residue_starts = np.cumsum(residue_sizes) - residue_sizes
+        relative_atom_index = np.arange(len(atom_residue_index)) - np.repeat(
+            residue_starts, residue_sizes
+        )
+        dense_index = index_by_residue[
+            restype_index[atom_residue_index], relative_atom_index
+        ]
+        has_dense_index = dense_index >= 0
+        coords = np.full((num_residues, num_slots, 3), np.nan, dtype=np.float32)
+        coords[
+            atom_residue_index[has_dense_index], dense_index[has_dense_index]
+        ] = columns["coords"][has_dense_index]
+
+        if "res_id" in columns:
+            res_id = columns["res_id"]
+        else:
+            # residue numbering restarts for each chain
+            chain_start_index = np.maximum.accumulate(
+                np.where(chain_starts, np.arange(num_residues), 0)
+            )
+            res_id = np.arange(num_residues) - chain_start_index + 1
+        dense = {
+            f"{self.load_as}_coords": coords,
+            f"{self.load_as}_mask": ~np.isnan(coords).any(axis=-1),
+            "restype_index": restype_index,
+            "aatype": residue_dictionary.aatype_by_residue[restype_index],
+            "chain_id": chain_id,
+            "res_id": res_id,
+        }
+        if self.b_factor_is_plddt and "b_factor" in columns:
+            dense["b_factor"] = columns["b_factor"]
+        return [
+            {key: value[start:end] for key, value in dense.items()}
+            for start, end in zip(residue_offsets[:-1], residue_offsets[1:])
+        ]
+
+    def _load_as(self, atoms: bs.AtomArray):
         if atoms is None:
             return None
         constructor_kwargs = self.constructor_kwargs or {}
@@ -0,0 +1,102 @@
+"""Fixed-point (quantised) storage of atom coordinates.
+
+Coordinates are stored as integer multiples of `resolution` relative to a
+per-structure offset (the centroid, rounded to the resolution grid), so that
+precision does not depend on distance from the origin as it does for float16.
+Optionally, each atom stores the difference from the previous (non-missing)
+atom, which keeps values small for compression and for int16 storage.
+
+Error bound: quantisation is the only lossy step (offsets are exact multiples of
+the resolution and deltas are computed between quantised values), so each
+decoded coordinate is within resolution / 2 of the original, plus float32
+rounding of the decoded value (|x| * 2 ** -24, i.e. ~6e-6 A at 100 A).
+Missing (nan) atoms are stored as the minimum value of the integer dtype.
+"""
+from typing import Tuple
+
+import numpy as np
+
+QUANTISED_COORDS_DTYPES = ["int16", "int32"]
+DEFAULT_COORDS_RESOLUTION = 1e-3
+
+
+def quantise_coords(
+    coords: np.ndarray,
+    resolution: float = DEFAULT_COORDS_RESOLUTION,
+    dtype: str = "int32",
+    delta_encoding: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode (num_atoms, 3) coordinates of a single structure as fixed-point values.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (num_atoms, 3) integer values and the (3,)
+            float64 offset to add back on decoding.
+
+    Raises:
+        ValueError: If the values do not fit in `dtype`; use int32, delta encoding
+            or a coarser resolution.
+    """
+    if dtype not in QUANTISED_COORDS_DTYPES:
+        raise ValueError(
+            f"Unsupported quantised coords dtype: {dtype}. "
+            f"Expected one of {QUANTISED_COORDS_DTYPES}"
+        )
+    coords = np.asarray(coords, dtype=np.float64)
+    is_present = ~np.isnan(coords).any(axis=-1)
+    if is_present.any():
+        offset = np.rint(coords[is_present].mean(axis=0) / resolution) * resolution
+    else:
+        offset = np.zeros(3)
+    values = np.rint((coords[is_present] - offset) / resolution).astype(np.int64)
+    if delta_encoding:
+        values = np.diff(values, axis=0, prepend=np.zeros((1, 3), dtype=np.int64))
+    dtype_info = np.iinfo(dtype)
+    # the minimum value is reserved for missing atoms
+    if len(values) and (
+        values.min() <= dtype_info.min or values.max() > dtype_info.max
+    ):
+        raise ValueError(
+            f"Coordinates do not fit in {dtype} at resolution {resolution}: "
+            "use int32, delta encoding or a coarser resolution"
+        )
+    encoded = np.full(coords.shape, dtype_info.min, dtype=dtype)
+    encoded[is_present] = values
+    return encoded, offset
+
+
+def dequantise_coords(
+    values: np.ndarray,
+    offsets: np.ndarray,
+    lengths: np.ndarray,
+    resolution: float = DEFAULT_COORDS_RESOLUTION,
+    delta_encoding: bool = False,
+) -> np.ndarray:
+    """Decode the concatenated fixed-point coordinates of a batch of structures.
+
+    Args:
+        values (np.ndarray): (num_atoms, 3) integer values of all structures.
+        offsets (np.ndarray): (num_structures, 3) offset of each structure.
+        lengths (np.ndarray): (num_structures,) number of atoms of each structure.
+        resolution (float): Resolution used for encoding.
+        delta_encoding (bool): Whether values were delta encoded.
+
+    Returns:
+        np.ndarray: (num_atoms, 3) float32 coordinates, nan for missing atoms.
+    """
+    is_present = values[:, 0] != np.iinfo(values.dtype).min
+    values = values[is_present].astype(np.int64)
+    structure_index = np.repeat(np.arange(len(lengths)), lengths)[is_present]
+    if delta_encoding:
+        # cumulative sum restarting at the first present atom of each structure
+        values = np.cumsum(values, axis=0)
+        num_present = np.bincount(structure_index, minlength=len(lengths))
+        first_present = np.cumsum(num_present) - num_present
+        preceding_sum = np.concatenate([np.zeros((1, 3), dtype=np.int64), values])[
+            first_present
+        ]
+        values -= np.repeat(preceding_sum, num_present, axis=0)
+    coords = np.full((len(is_present), 3), np.nan, dtype=np.float32)
+    coords[is_present] = (
+        values * resolution + np.asarray(offsets).reshape(-1, 3)[structure_index]
+    )
+    return coords
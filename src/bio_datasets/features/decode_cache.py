@@ -0,0 +1,143 @@
+"""Process-wide LRU cache of decoded atom arrays.
+
+Features opt in with `cache_decoded=True`. Entries are keyed by a content hash
+of the encoded example (or a file path and its mtime / size) together with the
+decode options of the feature, so features with different options can share the
+cache. The total size of cached atom arrays (coords, annotations, bonds and box)
+is bounded by a byte budget, evicting least recently used entries first.
+
+Cached atom arrays are copied on every hit, so callers can modify decoded
+structures without affecting the cache.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Optional
+
+import numpy as np
+from biotite import structure as bs
+
+from bio_datasets import config as bio_config
+
+DecodeCacheInfo = namedtuple(
+    "DecodeCacheInfo",
+    ["hits", "misses", "evictions", "currsize", "nbytes", "max_bytes"],
+)
+
+
+def atom_array_nbytes(atoms: bs.AtomArray) -> int:
+    """Estimated memory footprint of an atom array's coords, annotations, bonds and box."""
+    nbytes = atoms.coord.nbytes
+    for category in atoms.get_annotation_categories():
+        nbytes += atoms.get_annotation(category).nbytes
+    if atoms.bonds is not None:
+        nbytes += atoms.bonds.as_array().nbytes
+    if atoms.box is not None:
+        nbytes += atoms.box.nbytes
+    return nbytes
+
+
+def content_hash(*parts: Any) -> str:
+    """Hash of a sequence of bytes, strings, arrays and other (repr-able) values."""
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, bytes):
+            hasher.update(part)
+        elif isinstance(part, np.ndarray) and part.dtype.kind in "OU":
+            # object arrays (e.g. strings from the python formatter) have no buffer
+            # to hash, so hash their strings, equally for unicode arrays
+            hasher.update(f"str{part.shape}".encode())
+            hasher.update("\x00".join(part.astype(str).ravel().tolist()).encode())
+        elif isinstance(part, np.ndarray):
+            hasher.update(f"{part.dtype}{part.shape}".encode())
+            hasher.update(np.ascontiguousarray(part).view(np.uint8).reshape(-1))
+        else:
+            hasher.update(repr(part).encode())
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+
+class DecodeCache:
+    """Thread-safe LRU cache of atom arrays with a byte budget."""
+
+    def __init__(self, max_bytes: int):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (atoms, nbytes)
+        self._max_bytes = max_bytes
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[bs.AtomArray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(key)
+        return entry[0].copy()
+
+    def put(self, key: str, atoms: bs.AtomArray):
+        nbytes = atom_array_nbytes(atoms)
+        if nbytes > self._max_bytes:
+            return
+        atoms = atoms.copy()
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (atoms, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        while self._nbytes > self._max_bytes:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._nbytes -= nbytes
+            self._evictions += 1
+
+    def set_max_bytes(self, max_bytes: int):
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._evict()
+
+    def info(self) -> DecodeCacheInfo:
+        with self._lock:
+            return DecodeCacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                len(self._entries),
+                self._nbytes,
+                self._max_bytes,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+
+_DECODE_CACHE = DecodeCache(bio_config.DECODE_CACHE_MAX_BYTES)
+
+
+def get_decode_cache() -> DecodeCache:
+    return _DECODE_CACHE
+
+
+def decode_cache_info() -> DecodeCacheInfo:
+    """Hits, misses, evictions, number of entries and bytes of the decode cache."""
+    return _DECODE_CACHE.info()
+
+
+def set_decode_cache_max_bytes(max_bytes: int):
+    """Set the byte budget of the decode cache, evicting entries if necessary."""
+    _DECODE_CACHE.set_max_bytes(max_bytes)
+
+
+def clear_decode_cache():
+    _DECODE_CACHE.clear()
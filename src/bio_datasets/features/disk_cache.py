@@ -0,0 +1,230 @@
+"""Persistent on-disk cache of decoded atom arrays.
+
+StructureFeature(disk_cache=True) parses each structure file once, into a
+columnar sidecar: a directory of .npy files holding coords, numeric annotations,
+bonds and box, and string annotations as a vocabulary plus integer indices.
+Later decodes (in any process, or in later runs) memory-map the sidecar
+(copy-on-write, so decoded atom arrays can still be modified) instead of parsing.
+
+Entries are keyed like the in-memory decode cache (c.f. decode_cache): a
+content hash of the bytes, or the path with mtime and size, plus decode options.
+
+The cache is safe to share between concurrent dataloader workers:
+- entries are written to a temporary directory and atomically renamed into
+  place (if another worker won the race, its entry is kept);
+- evicted entries are atomically renamed before being deleted, and a reader whose
+  entry disappears treats it as a miss (already mapped files remain readable);
+- temporary directories left by crashed workers are removed after an hour.
+
+The cache is best-effort: entries which cannot be read (e.g. written by another
+SIDECAR_VERSION) are treated as misses, and failures to write (e.g. a full or
+read-only disk) are logged, so that decoding falls back to parsing.
+
+The total size is capped at max_bytes by evicting least recently used entries
+(entry directory mtimes are updated on each hit). To bound the cost of scanning
+the cache, each process checks the cap after writing max_bytes / 16 bytes, so
+the cap can be exceeded by that amount per process.
+"""
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Optional
+
+import numpy as np
+from biotite import structure as bs
+
+from bio_datasets import config as bio_config
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_VERSION = 1
+_TMP_PREFIX = ".tmp-"
+_EVICT_PREFIX = ".evict-"
+_STALE_TMP_SECONDS = 3600
+_META_FILE = "meta.json"
+
+
+def _dir_nbytes(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+
+def write_sidecar(atoms: bs.AtomArray, path: str):
+    """Write an atom array to a directory of .npy files."""
+    os.makedirs(path)
+    np.save(os.path.join(path, "coord.npy"), atoms.coord.astype(np.float32))
+    categorical = []
+    for category in atoms.get_annotation_categories():
+        values = atoms.get_annotation(category)
+        if values.dtype.kind == "U":
+            vocab, indices = np.unique(values, return_inverse=True)
+            index_dtype = np.uint16 if len(vocab) <= 65536 else np.uint32
+            np.save(os.path.join(path, f"{category}.vocab.npy"), vocab)
+            values = indices.astype(index_dtype)
+            categorical.append(category)
+        np.save(os.path.join(path, f"{category}.npy"), values)
+    if atoms.bonds is not None:
+        np.save(os.path.join(path, "bonds.npy"), atoms.bonds.as_array())
+    if atoms.box is not None:
+        np.save(os.path.join(path, "box.npy"), atoms.box)
+    meta = {
+        "version": SIDECAR_VERSION,
+        "annotations": atoms.get_annotation_categories(),
+        "categorical": categorical,
+        "bonds": atoms.bonds is not None,
+        "box": atoms.box is not None,
+    }
+    with open(os.path.join(path, _META_FILE), "w") as f:
+        json.dump(meta, f)
+
+
+def read_sidecar(path: str) -> bs.AtomArray:
+    """Memory-map an atom array written by `write_sidecar`."""
+    with open(os.path.join(path, _META_FILE)) as f:
+        meta = json.load(f)
+    if meta["version"] != SIDECAR_VERSION:
+        raise ValueError(f"Unsupported sidecar version {meta['version']}")
+
+    def load(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="c")
+
+    coord = load("coord")
+    atoms = bs.AtomArray(len(coord))
+    atoms.coord = coord
+    for category in meta["annotations"]:
+        values = load(category)
+        if category in meta["categorical"]:
+            values = np.take(
+                np.load(os.path.join(path, f"{category}.vocab.npy")), values
+            )
+        atoms.set_annotation(category, values)
+    if meta["bonds"]:
+        atoms.bonds = bs.BondList(len(atoms), np.asarray(load("bonds")))
+    if meta["box"]:
+        atoms.box = np.asarray(load("box"))
+    return atoms
+
+
+class DiskDecodeCache:
+    """Directory of atom array sidecars, with a size cap and LRU eviction."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._bytes_since_check = 0
+        self._warned = False
+
+    def _warn(self, message: str):
+        # e.g. an unwritable cache dir would otherwise warn on every decode
+        if not self._warned:
+            logger.warning(
+                f"{message} (further disk cache errors are logged at debug level)"
+            )
+            self._warned = True
+        else:
+            logger.debug(message)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[bs.AtomArray]:
+        path = self._entry_path(key)
+        try:
+            atoms = read_sidecar(path)
+            os.utime(path)
+        except (FileNotFoundError, NotADirectoryError):
+            # missing, or evicted by another process while reading
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            # e.g. another sidecar version: replaced by the next put
+            self._warn(f"Ignoring unreadable disk cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        return atoms
+
+    def put(self, key: str, atoms: bs.AtomArray):
+        tmp_path = os.path.join(self.cache_dir, _TMP_PREFIX + uuid.uuid4().hex)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_sidecar(atoms, tmp_path)
+            nbytes = _dir_nbytes(tmp_path)
+        except (OSError, ValueError) as e:
+            self._warn(f"Failed to write disk cache entry to {self.cache_dir}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        try:
+            os.rename(tmp_path, self._entry_path(key))
+        except OSError:
+            # another process wrote the same entry first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        self._bytes_since_check += nbytes
+        if self._bytes_since_check > self.max_bytes // 16:
+            try:
+                self.evict()
+            except OSError as e:
+                self._warn(f"Failed to evict disk cache entries: {e}")
+
+    def _remove(self, path: str):
+        evict_path = os.path.join(self.cache_dir, _EVICT_PREFIX + uuid.uuid4().hex)
+        try:
+            os.rename(path, evict_path)
+        except OSError:
+            return  # already evicted by another process
+        shutil.rmtree(evict_path, ignore_errors=True)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        self._bytes_since_check = 0
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            try:
+                mtime = entry.stat().st_mtime
+                if entry.name.startswith((_TMP_PREFIX, _EVICT_PREFIX)):
+                    if now - mtime > _STALE_TMP_SECONDS:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                entries.append((mtime, _dir_nbytes(entry.path), entry.path))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        total_nbytes = sum(nbytes for _, nbytes, _ in entries)
+        for _, nbytes, path in sorted(entries):
+            if total_nbytes <= self.max_bytes:
+                break
+            self._remove(path)
+            total_nbytes -= nbytes
+
+    def nbytes(self) -> int:
+        total_nbytes = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.startswith((_TMP_PREFIX, _EVICT_PREFIX)):
+                try:
+                    total_nbytes += _dir_nbytes(entry.path)
+                except FileNotFoundError:
+                    continue
+        return total_nbytes
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                self._remove(entry.path)
+
+
+_DISK_CACHE = DiskDecodeCache(
+    bio_config.DISK_CACHE_DIR, bio_config.DISK_CACHE_MAX_BYTES
+)
+
+
+def get_disk_cache() -> DiskDecodeCache:
+    return _DISK_CACHE
+
+
+def set_disk_cache(cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+    """Set the directory and / or size cap of the disk cache (per process)."""
+    if cache_dir is not None:
+        _DISK_CACHE.cache_dir = cache_dir
+    if max_bytes is not None:
+        _DISK_CACHE.max_bytes = max_bytes
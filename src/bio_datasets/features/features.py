@@ -3,6 +3,7 @@ Custom features for bio datasets.
 
 Written to ensure compatibility with datasets loading / uploading when bio datasets not available.
 """
+import functools
 import json
 from typing import ClassVar, Dict, Optional, Union
 
@@ -28,6 +29,8 @@ from datasets.features.features import (
 )
 from datasets.utils.py_utils import zip_dict
 
+from .parallel import ParallelDecodeConfig, decode_rows, get_parallel_decoding
+
 
 class CustomFeature:
     """
@@ -57,6 +60,27 @@ class CustomFeature:
             "Should be implemented by child class if `requires_decoding` is True"
         )
 
+    def decode_batch(self, examples, token_per_repo_id=None):
+        """Decode a list of examples (a column of a batch).
+
+        Child classes can override this to amortise per-example work across the batch.
+        Otherwise examples are decoded one at a time, in a thread or process pool
+        if parallel decoding is configured (c.f. `set_parallel_decoding`).
+        """
+        config = getattr(self, "_parallel_decoding", None) or get_parallel_decoding()
+        return decode_rows(
+            functools.partial(self.decode_example, token_per_repo_id=token_per_repo_id),
+            examples,
+            config=config,
+        )
+
+    def set_parallel_decoding(self, config: Optional[ParallelDecodeConfig]):
+        """Decode batches of this feature in parallel, overriding the global config.
+
+        The config is runtime state: it is not serialised with the feature.
+        """
+        self._parallel_decoding = config
+
     def fallback_feature(self):
         # TODO: automatically infer fallback feature?
         raise NotImplementedError(
@@ -479,16 +503,15 @@ class Features(Features, dict):
         Returns:
             `list[Any]`
         """
-        return (
-            [
-                decode_nested_example(self[column_name], value)
-                if value is not None
-                else None
-                for value in column
-            ]
-            if self._column_requires_decoding[column_name]
-            else column
-        )
+        if not self._column_requires_decoding[column_name]:
+            return column
+        feature = self[column_name]
+        if isinstance(feature, CustomFeature) and feature.requires_decoding:
+            return feature.decode_batch(column)
+        return [
+            decode_nested_example(feature, value) if value is not None else None
+            for value in column
+        ]
 
     def decode_batch(
         self,
@@ -509,18 +532,23 @@ class Features(Features, dict):
         """
         decoded_batch = {}
         for column_name, column in batch.items():
-            decoded_batch[column_name] = (
-                [
+            feature = self[column_name]
+            if not self._column_requires_decoding[column_name]:
+                decoded_batch[column_name] = column
+            elif isinstance(feature, CustomFeature) and feature.requires_decoding:
+                # custom features can decode a whole column at once
+                decoded_batch[column_name] = feature.decode_batch(
+                    column, token_per_repo_id=token_per_repo_id
+                )
+            else:
+                decoded_batch[column_name] = [
                     decode_nested_example(
-                        self[column_name], value, token_per_repo_id=token_per_repo_id
+                        feature, value, token_per_repo_id=token_per_repo_id
                     )
                     if value is not None
                     else None
                     for value in column
                 ]
-                if self._column_requires_decoding[column_name]
-                else column
-            )
         return decoded_batch
 
     def to_fallback(self):
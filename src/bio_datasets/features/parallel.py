@@ -0,0 +1,187 @@
+"""Parallel row-wise decoding of feature columns, with per-stage timings.
+
+Features which decode one row at a time (e.g. StructureFeature, where each row is
+dominated by decompression and parsing) can fan rows out to a thread or process
+pool. Parallel decoding is opt-in, configured globally with
+`set_parallel_decoding` or per feature with `CustomFeature.set_parallel_decoding`
+(which takes precedence). Outputs keep the order of the input rows, and batches
+smaller than `min_batch_size` are decoded serially.
+
+Decoding code reports the time spent in named stages (e.g. pdb.gz/decompress,
+pdb.gz/parse, load_as) with `timed_stage`; `decode_timings` sums these over all
+rows decoded since `reset_decode_timings`, including rows decoded in worker
+processes, along with the wall time of batched decoding. Stage times are
+wall-clock times within each worker, so if summed stage times grow with the
+number of threads while wall time does not drop, threads are contending for the
+GIL (parsing pdb and cif text is mostly pure Python) and a process pool should
+scale better; threads suffice when decompression or IO (which release the GIL)
+dominate. fcz decompression is counted in the parse stage.
+
+Process pools require decode_fn (usually a bound method of the feature) to be
+picklable, and cannot be started from daemonic processes (e.g. torch dataloader
+workers), where thread pools should be used instead.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bio_datasets import config as bio_config
+
+EXECUTOR_TYPES = ["thread", "process"]
+
+
+@dataclass
+class ParallelDecodeConfig:
+    executor: str = "thread"  # thread or process
+    num_workers: Optional[int] = None  # defaults to os.cpu_count()
+    min_batch_size: int = 8  # smaller batches are decoded serially
+    chunk_size: Optional[int] = None  # rows per task; defaults to ~4 tasks per worker
+
+    def __post_init__(self):
+        if self.executor not in EXECUTOR_TYPES:
+            raise ValueError(
+                f"Unsupported executor: {self.executor}. Expected one of {EXECUTOR_TYPES}"
+            )
+        self.num_workers = self.num_workers or os.cpu_count() or 1
+
+
+# rows: rows decoded (serially or in parallel); wall_time: seconds spent in
+# batched decoding calls; stages: seconds per stage, summed over rows and workers
+DecodeTimings = namedtuple("DecodeTimings", ["rows", "wall_time", "stages"])
+
+
+_GLOBAL_CONFIG: Optional[ParallelDecodeConfig] = (
+    ParallelDecodeConfig(
+        bio_config.PARALLEL_DECODE_EXECUTOR, bio_config.PARALLEL_DECODE_NUM_WORKERS
+    )
+    if bio_config.PARALLEL_DECODE_EXECUTOR
+    else None
+)
+_EXECUTORS: Dict[Tuple[str, int], Executor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+_TIMINGS_LOCK = threading.Lock()
+_TIMINGS = {"rows": 0, "wall_time": 0.0, "stages": defaultdict(float)}
+_local = threading.local()
+
+
+def set_parallel_decoding(config: Optional[ParallelDecodeConfig]):
+    """Set the default parallel decoding config (None to decode serially)."""
+    global _GLOBAL_CONFIG
+    _GLOBAL_CONFIG = config
+
+
+def get_parallel_decoding() -> Optional[ParallelDecodeConfig]:
+    return _GLOBAL_CONFIG
+
+
+def _get_executor(config: ParallelDecodeConfig) -> Executor:
+    key = (config.executor, config.num_workers)
+    with _EXECUTORS_LOCK:
+        if key not in _EXECUTORS:
+            executor_cls = (
+                ThreadPoolExecutor
+                if config.executor == "thread"
+                else ProcessPoolExecutor
+            )
+            _EXECUTORS[key] = executor_cls(max_workers=config.num_workers)
+        return _EXECUTORS[key]
+
+
+@atexit.register
+def shutdown_executors():
+    with _EXECUTORS_LOCK:
+        for executor in _EXECUTORS.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _EXECUTORS.clear()
+
+
+def _stage_times() -> Dict[str, float]:
+    if not hasattr(_local, "stage_times"):
+        _local.stage_times = defaultdict(float)
+    return _local.stage_times
+
+
+@contextmanager
+def timed_stage(name: str):
+    """Add the time spent in the block to stage `name` of the current thread."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stage_times()[name] += time.perf_counter() - start
+
+
+def _pop_stage_times() -> Dict[str, float]:
+    stage_times = dict(_stage_times())
+    _local.stage_times = defaultdict(float)
+    return stage_times
+
+
+def _record_timings(rows: int, wall_time: float, stage_times: Dict[str, float]):
+    with _TIMINGS_LOCK:
+        _TIMINGS["rows"] += rows
+        _TIMINGS["wall_time"] += wall_time
+        for name, seconds in stage_times.items():
+            _TIMINGS["stages"][name] += seconds
+
+
+def decode_timings() -> DecodeTimings:
+    with _TIMINGS_LOCK:
+        return DecodeTimings(
+            _TIMINGS["rows"], _TIMINGS["wall_time"], dict(_TIMINGS["stages"])
+        )
+
+
+def reset_decode_timings():
+    with _TIMINGS_LOCK:
+        _TIMINGS["rows"] = 0
+        _TIMINGS["wall_time"] = 0.0
+        _TIMINGS["stages"].clear()
+
+
+def _decode_chunk(
+    decode_fn: Callable[[Any], Any], chunk: List[Any]
+) -> Tuple[List[Any], Dict[str, float]]:
+    """Decode a chunk of rows in a worker, returning outputs and stage times."""
+    _pop_stage_times()
+    decoded = [decode_fn(value) if value is not None else None for value in chunk]
+    return decoded, _pop_stage_times()
+
+
+def decode_rows(
+    decode_fn: Callable[[Any], Any],
+    values: List[Any],
+    config: Optional[ParallelDecodeConfig] = None,
+) -> List[Any]:
+    """Decode each non-None value with decode_fn, in order, optionally in parallel.
+
+    For process pools, decode_fn must be picklable (e.g. a bound method of a
+    feature, or a functools.partial of one).
+    """
+    start = time.perf_counter()
+    values = list(values)
+    if config is None or len(values) < max(config.min_batch_size, 2):
+        decoded, stage_times = _decode_chunk(decode_fn, values)
+    else:
+        chunk_size = config.chunk_size or max(
+            1, -(-len(values) // (4 * config.num_workers))
+        )
+        chunks = [
+            values[ix : ix + chunk_size] for ix in range(0, len(values), chunk_size)
+        ]
+        decoded, stage_times = [], defaultdict(float)
+        for chunk_decoded, chunk_stage_times in _get_executor(config).map(
+            _decode_chunk, [decode_fn] * len(chunks), chunks
+        ):
+            decoded.extend(chunk_decoded)
+            for name, seconds in chunk_stage_times.items():
+                stage_times[name] += seconds
+    _record_timings(len(values), time.perf_counter() - start, stage_times)
+    return decoded
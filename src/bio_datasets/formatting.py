@@ -0,0 +1,180 @@
+"""A datasets formatter exposing structure columns as views over Arrow buffers.
+
+With `ds.with_format("bio")`, AtomArrayFeature (and ProteinAtomArrayFeature) columns
+are returned as `AtomArrayView` mappings rather than decoded objects. Numeric fields
+(e.g. coords, b_factor) are read-only numpy views over the (memory-mapped) Arrow
+buffers, and each field is only converted when it is first accessed.
+Coordinates stored in a quantised `coords_dtype` ("int16", "int32") are returned
+dequantised to float32, and categorical annotations as strings (both copies),
+consistent with decoding.
+Pass `decode=True` to instead decode structure columns in a single batched call
+that reads directly from Arrow.
+
+Other columns are formatted as by the default python formatter.
+"""
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pyarrow as pa
+from datasets.formatting import _register_formatter
+from datasets.formatting.formatting import Formatter
+
+from bio_datasets.arrow_utils import list_array_to_numpy
+from bio_datasets.features.atom_array import AtomArrayFeature
+from bio_datasets.features.coords_codec import (
+    QUANTISED_COORDS_DTYPES,
+    dequantise_coords,
+)
+
+
+class AtomArrayColumnView:
+    """Lazily flattened fields of an Arrow column of encoded atom arrays.
+
+    Each field is flattened once, on first access, for the whole column.
+    """
+
+    def __init__(
+        self, array: Union[pa.StructArray, pa.ChunkedArray], feature: AtomArrayFeature
+    ):
+        if isinstance(array, pa.ChunkedArray):
+            # n.b. combine_chunks copies when there is more than one chunk
+            array = array.chunk(0) if array.num_chunks == 1 else array.combine_chunks()
+        if isinstance(array, pa.ExtensionArray):
+            array = array.storage
+        self._array = array
+        self._feature = feature
+        self._is_valid = array.is_valid().to_numpy(zero_copy_only=False)
+        self._is_quantised = feature.coords_dtype in QUANTISED_COORDS_DTYPES
+        # coords_offset and <name>_other are consumed when decoding coords / categories
+        hidden = {f"{name}_other" for name in feature._vocabs}
+        if self._is_quantised:
+            hidden.add("coords_offset")
+        self._field_names = [
+            name
+            for name in feature._features
+            if array.type.get_field_index(name) >= 0 and name not in hidden
+        ]
+        self._fields: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self):
+        return len(self._array)
+
+    @property
+    def field_names(self) -> List[str]:
+        return self._field_names
+
+    def field(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Flat values and offsets of a field across the column."""
+        if name not in self._fields:
+            if name not in self._field_names:
+                raise KeyError(name)
+            if name == "coords" and self._is_quantised:
+                self._fields[name] = self._dequantised_coords()
+            elif name in self._feature._vocabs:
+                self._fields[name] = self._categorical_field(name)
+            else:
+                self._fields[name] = self._flat_field(name)
+        return self._fields[name]
+
+    def _flat_field(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        subfeature = self._feature._features[name]
+        return list_array_to_numpy(
+            self._array.field(name), getattr(subfeature, "shape", (None,))[1:]
+        )
+
+    def _categorical_field(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        indices, offsets = self._flat_field(name)
+        columns = {name: indices}
+        if self._array.type.get_field_index(f"{name}_other") >= 0:
+            columns[f"{name}_other"] = self._flat_field(f"{name}_other")[0]
+        self._feature._decode_categorical_batch(columns)
+        values = columns[name]
+        values.flags.writeable = False
+        return values, offsets
+
+    def _dequantised_coords(self) -> Tuple[np.ndarray, np.ndarray]:
+        values, offsets = self._flat_field("coords")
+        offset_values, offset_offsets = self._flat_field("coords_offset")
+        # null rows have no coords_offset (and no atoms)
+        coords_offsets = np.zeros((len(self), 3), dtype=np.float64)
+        coords_offsets[np.diff(offset_offsets) == 3] = offset_values.reshape(-1, 3)
+        coords = dequantise_coords(
+            values,
+            coords_offsets,
+            np.diff(offsets),
+            resolution=self._feature.coords_resolution,
+            delta_encoding=self._feature.coords_delta_encoding,
+        )
+        coords.flags.writeable = False
+        return coords, offsets
+
+    def row(self, index: int) -> Optional["AtomArrayView"]:
+        if not self._is_valid[index]:
+            return None
+        return AtomArrayView(self, index)
+
+    def rows(self) -> List[Optional["AtomArrayView"]]:
+        return [self.row(index) for index in range(len(self))]
+
+
+class AtomArrayView(Mapping):
+    """Read-only mapping from field names to the values of a single encoded atom array.
+
+    Values are slices of the flattened fields of the parent column view.
+    """
+
+    def __init__(self, column: AtomArrayColumnView, index: int):
+        self._column = column
+        self._index = index
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        values, offsets = self._column.field(name)
+        return values[offsets[self._index] : offsets[self._index + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._column.field_names)
+
+    def __len__(self) -> int:
+        return len(self._column.field_names)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(fields={self._column.field_names})"
+
+
+class BioFormatter(Formatter[Mapping, list, Mapping]):
+    def __init__(self, features=None, token_per_repo_id=None, decode: bool = False):
+        super().__init__(features, token_per_repo_id)
+        self.decode = decode
+
+    def _format_column(self, pa_table: pa.Table, column_name: str) -> list:
+        feature = self.features[column_name] if self.features is not None else None
+        if isinstance(feature, AtomArrayFeature):
+            column = pa_table.column(column_name)
+            if self.decode:
+                return feature.decode_batch(
+                    column, token_per_repo_id=self.token_per_repo_id
+                )
+            return AtomArrayColumnView(column, feature).rows()
+        column = self.python_arrow_extractor().extract_column(
+            pa_table.select([column_name])
+        )
+        return self.python_features_decoder.decode_column(column, column_name)
+
+    def format_row(self, pa_table: pa.Table) -> Mapping:
+        return {
+            column_name: values[0]
+            for column_name, values in self.format_batch(pa_table).items()
+        }
+
+    def format_column(self, pa_table: pa.Table) -> list:
+        return self._format_column(pa_table, pa_table.column_names[0])
+
+    def format_batch(self, pa_table: pa.Table) -> Mapping:
+        return {
+            column_name: self._format_column(pa_table, column_name)
+            for column_name in pa_table.column_names
+        }
+
+
+_register_formatter(BioFormatter, "bio")
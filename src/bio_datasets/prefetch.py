@@ -0,0 +1,203 @@
+"""Background decoding of streaming (iterable) datasets.
+
+Iterating an IterableDataset decodes each example in the consumer, so e.g. a
+training loop waits on parsing structure files. `prefetch_decode` wraps a
+dataset (typically from `load_dataset(..., streaming=True)`) so that upcoming
+examples are decoded by a thread or process pool while the current one is used:
+
+    ds = prefetch_decode(load_dataset(..., streaming=True), num_workers=8)
+    for example in ds:
+        ...
+
+The wrapped dataset is iterated with decoding disabled for bio features (by
+casting them to decode=False), in a background thread which submits each raw
+example to the pool. At most `max_prefetch` examples are read ahead of the
+consumer (backpressure), and examples are yielded in dataset order, or in
+completion order if `ordered=False`.
+
+Breaking out of iteration (or calling `close()` on the iterator) cancels pending
+decodes and stops the background thread and pool; errors raised while reading
+or decoding are re-raised in the consumer.
+"""
+import dataclasses
+import functools
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, Optional, Union
+
+from datasets import IterableDataset, IterableDatasetDict
+
+from .features import CustomFeature, Features
+from .features.parallel import EXECUTOR_TYPES
+
+_POLL_SECONDS = 0.1
+
+
+class _End:
+    def __init__(self, num_examples: int):
+        self.num_examples = num_examples
+
+
+class _Error:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _decode_columns(features: Features, token_per_repo_id, example: dict) -> dict:
+    decoded = dict(example)
+    decoded.update(
+        features.decode_example(
+            {key: example[key] for key in features},
+            token_per_repo_id=token_per_repo_id,
+        )
+    )
+    return decoded
+
+
+class PrefetchingIterableDataset:
+    """Iterable over an IterableDataset, decoding bio features in the background.
+
+    Attributes other than iteration (e.g. features, column_names) are those of
+    the wrapped dataset; transforms (map, filter, shuffle...) should be applied
+    before wrapping.
+
+    Args:
+        dataset (IterableDataset): The dataset to iterate over. Must not be
+            formatted (c.f. with_format).
+        num_workers (int): Number of decoding threads or processes.
+        executor (str): "thread" or "process". Parsing is mostly pure Python, so
+            processes usually decode faster, at the cost of pickling raw and
+            decoded examples.
+        max_prefetch (int, optional): Maximum number of examples read ahead of
+            the consumer. Defaults to 2 * num_workers.
+        ordered (bool): Whether to yield examples in dataset order, rather than
+            as soon as they are decoded.
+    """
+
+    def __init__(
+        self,
+        dataset: IterableDataset,
+        num_workers: int = 4,
+        executor: str = "thread",
+        max_prefetch: Optional[int] = None,
+        ordered: bool = True,
+    ):
+        if executor not in EXECUTOR_TYPES:
+            raise ValueError(
+                f"Unsupported executor: {executor}. Expected one of {EXECUTOR_TYPES}"
+            )
+        if dataset._formatting is not None and dataset._formatting.format_type:
+            raise ValueError(
+                "Prefetching formatted datasets is not supported: "
+                "apply prefetch_decode to the unformatted dataset"
+            )
+        self.dataset = dataset
+        self.num_workers = num_workers
+        self.executor = executor
+        self.max_prefetch = max_prefetch or 2 * num_workers
+        self.ordered = ordered
+
+        features = dataset.features
+        self._deferred_features = Features(
+            {
+                key: feature
+                for key, feature in (features or {}).items()
+                if isinstance(feature, CustomFeature)
+                and feature.requires_decoding
+                and getattr(feature, "decode", True)
+            }
+        )
+        if self._deferred_features:
+            raw_features = features.copy()
+            for key, feature in self._deferred_features.items():
+                raw_features[key] = dataclasses.replace(feature, decode=False)
+            self._raw_dataset = dataset.cast(raw_features)
+            # DatasetInfo.copy restores features from bio_features, undoing the cast
+            self._raw_dataset._info.bio_features = raw_features
+            self._raw_dataset._info.features = raw_features
+        else:
+            self._raw_dataset = dataset
+
+    def __getattr__(self, name):
+        if name == "dataset":  # not yet set, e.g. while unpickling
+            raise AttributeError(name)
+        return getattr(self.dataset, name)
+
+    def __repr__(self):
+        return (
+            f"PrefetchingIterableDataset({self.dataset!r}, num_workers="
+            f"{self.num_workers}, executor={self.executor!r}, ordered={self.ordered})"
+        )
+
+    def __iter__(self) -> Iterator[dict]:
+        decode_fn = functools.partial(
+            _decode_columns,
+            self._deferred_features,
+            self.dataset._token_per_repo_id,
+        )
+        executor_cls = (
+            ThreadPoolExecutor if self.executor == "thread" else ProcessPoolExecutor
+        )
+        pool = executor_cls(max_workers=self.num_workers)
+        results = queue.Queue()
+        slots = threading.Semaphore(self.max_prefetch)
+        stop = threading.Event()
+
+        def feed():
+            num_examples = 0
+            try:
+                for example in self._raw_dataset:
+                    while not slots.acquire(timeout=_POLL_SECONDS):
+                        if stop.is_set():
+                            return
+                    if stop.is_set():
+                        return
+                    future = pool.submit(decode_fn, example)
+                    if self.ordered:
+                        results.put(future)
+                    else:
+                        future.add_done_callback(results.put)
+                    num_examples += 1
+            except BaseException as e:  # re-raised by the consumer
+                results.put(_Error(e))
+            results.put(_End(num_examples))
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        num_yielded, num_examples = 0, None
+        try:
+            while num_examples is None or num_yielded < num_examples:
+                item = results.get()
+                if isinstance(item, _Error):
+                    raise item.error
+                elif isinstance(item, _End):
+                    num_examples = item.num_examples
+                    continue
+                example = item.result()
+                slots.release()
+                num_yielded += 1
+                yield example
+        finally:
+            stop.set()
+            feeder.join(timeout=1.0)
+            while not results.empty():
+                item = results.get_nowait()
+                if isinstance(item, Future):
+                    item.cancel()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def prefetch_decode(
+    dataset: Union[IterableDataset, IterableDatasetDict], **kwargs
+) -> Union[PrefetchingIterableDataset, dict]:
+    """Decode examples of a streaming dataset (or of each split) in the background.
+
+    Keyword arguments are passed to PrefetchingIterableDataset.
+    """
+    if isinstance(dataset, IterableDatasetDict):
+        return {
+            split: PrefetchingIterableDataset(split_dataset, **kwargs)
+            for split, split_dataset in dataset.items()
+        }
+    return PrefetchingIterableDataset(dataset, **kwargs)
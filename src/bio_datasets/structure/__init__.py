@@ -3,6 +3,7 @@ __all__ = [
     "BiomoleculeChain",
     "BiomoleculeComplex",
     "SmallMolecule",
+    "ProteinBatch",
     "ProteinChain",
     "ProteinComplex",
     "ProteinDictionary",
@@ -15,5 +16,5 @@ from .biomolecule import Biomolecule, BiomoleculeChain
 from .chemical import SmallMolecule
 from .complex import BiomoleculeComplex
 from .nucleic import DNAChain, RNAChain
-from .protein import ProteinChain, ProteinComplex, ProteinDictionary
+from .protein import ProteinBatch, ProteinChain, ProteinComplex, ProteinDictionary
 from .residue import ResidueDictionary
@@ -1,5 +1,5 @@
 import io
-from typing import Generic, List, Optional, TypeVar, Union
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar, Union
 
 import numpy as np
 from biotite import structure as bs
@@ -9,9 +9,15 @@ from biotite.structure.residues import get_residue_starts
 from bio_datasets.np_utils import map_categories_to_indices
 from bio_datasets.structure.parsing import load_structure
 
+from .distances import (
+    blocked_residue_distances,
+    padded_residue_coords,
+    representative_atom_coords,
+)
+from .neighbours import atom_pairs_within, min_distance_by_group
 from .residue import (
     ResidueDictionary,
-    create_complete_atom_array_from_restype_index,
+    expand_residue_templates,
     get_residue_starts_mask,
 )
 
@@ -151,18 +157,19 @@ class Biomolecule(Generic[T]):
             return atoms[expected_residue_mask]
         return atoms
 
+    @staticmethod
+    def chain_order(atoms) -> Optional[np.ndarray]:
+        """Stable permutation sorting atoms by chain id, or None if already sorted."""
+        chain_id = atoms.chain_id
+        if np.all(chain_id[1:] >= chain_id[:-1]):
+            return None
+        return np.argsort(chain_id, kind="stable")
+
     @staticmethod
     def reorder_chains(atoms):
-        chain_ids = np.unique(atoms.chain_id)
-        atom_arrs = []
-        for chain_id in chain_ids:
-            chain_mask = atoms.chain_id == chain_id
-            atom_arrs.append(atoms[chain_mask])
-        new_atoms = sum(atom_arrs, bs.AtomArray(length=0))
-        for annot_name in atoms._annot:
-            if annot_name not in new_atoms._annot:
-                new_atoms.set_annotation(annot_name, atoms._annot[annot_name])
-        return new_atoms
+        """Sort atoms by chain id, preserving the order of atoms within each chain."""
+        order = Biomolecule.chain_order(atoms)
+        return atoms.copy() if order is None else atoms[order]
 
     @staticmethod
     def standardise_atoms(
@@ -171,71 +178,85 @@ class Biomolecule(Generic[T]):
         verbose: bool = False,
         backbone_only: bool = False,
     ):
-        atoms = Biomolecule.reorder_chains(atoms)
-        residue_starts = get_residue_starts(atoms)
-        if (
-            "atomtype_index" not in atoms._annot
-            and residue_dictionary.atom_types is not None
-        ):
-            atoms.set_annotation(
-                "atomtype_index",
-                map_categories_to_indices(
-                    atoms.atom_name, residue_dictionary.atom_types
-                ),
-            )
-        if (
-            "elemtype_index" not in atoms._annot
-            and residue_dictionary.element_types is not None
-        ):
-            atoms.set_annotation(
-                "elemtype_index",
-                map_categories_to_indices(
-                    atoms.element, residue_dictionary.element_types
-                ),
-            )
-        if "restype_index" not in atoms._annot:
-            atoms.set_annotation(
-                "restype_index", residue_dictionary.res_name_to_index(atoms.res_name)
-            )
-
-        atoms.set_annotation(
-            "res_index",
-            np.cumsum(get_residue_starts_mask(atoms, residue_starts)) - 1,
+        """Return a new atom array with all atoms of each residue, in standard order.
+
+        Chains are sorted by chain id (preserving residue order within chains),
+        and each residue is expanded to the full set of atoms defined by the residue
+        dictionary: atoms missing from the input have nan coordinates and
+        mask False. Atoms are placed with a single scatter into the expanded
+        template, so the input atom array is not reordered or modified.
+        """
+        order = Biomolecule.chain_order(atoms)
+
+        def sort(annot):
+            return annot if order is None else annot[order]
+
+        # residues, in chain-sorted order (c.f. biotite get_residue_starts)
+        res_chain_id = sort(atoms.chain_id)
+        res_id = sort(atoms.res_id)
+        ins_code = sort(atoms.ins_code)
+        res_name = sort(atoms.res_name)
+        residue_starts_mask = np.ones(len(atoms), dtype=bool)
+        residue_starts_mask[1:] = (
+            (res_chain_id[1:] != res_chain_id[:-1])
+            | (res_id[1:] != res_id[:-1])
+            | (ins_code[1:] != ins_code[:-1])
+            | (res_name[1:] != res_name[:-1])
         )
+        residue_starts = np.flatnonzero(residue_starts_mask)
+        residue_index = np.cumsum(residue_starts_mask) - 1
+        if order is not None:
+            # residue index of each atom in the input order
+            residue_index = residue_index[np.argsort(order)]
+        res_chain_id = res_chain_id[residue_starts]
+        res_id = res_id[residue_starts]
+        ins_code = ins_code[residue_starts]
+        res_name = res_name[residue_starts]
+
+        if "restype_index" in atoms._annot:
+            restype_index = sort(atoms.restype_index)[residue_starts]
+        else:
+            restype_index = residue_dictionary.res_name_to_index(res_name)
+        if "atomtype_index" in atoms._annot:
+            atomtype_index = atoms.atomtype_index
+        else:
+            atomtype_index = map_categories_to_indices(
+                atoms.atom_name, residue_dictionary.atom_types
+            )
 
         (
             new_atom_array,
             full_residue_starts,
             full_annot_names,
-        ) = create_complete_atom_array_from_restype_index(
-            atoms.restype_index[residue_starts],
+        ) = expand_residue_templates(
+            restype_index,
             residue_dictionary=residue_dictionary,
-            chain_id=atoms.chain_id[residue_starts],
+            chain_id=res_chain_id,
+            res_id=res_id,
             extra_fields=[f for f in ALL_EXTRA_FIELDS if f in atoms._annot],
         )
+        new_atom_array.set_annotation(
+            "ins_code",
+            ins_code[new_atom_array.res_index].astype(new_atom_array.ins_code.dtype),
+        )
 
-        # first we get an array of atom indices for each residue (i.e. a mapping from atom type index to expected index
-        # then we index into this array to get the expected relative index for each atom
+        # expected index of each atom relative to the start of its residue
         expected_relative_atom_indices = (
             residue_dictionary.get_expected_relative_atom_indices(
-                atoms.restype_index, atoms.atomtype_index
+                restype_index[residue_index], atomtype_index
             )
         )
-
         unexpected_atom_mask = expected_relative_atom_indices == -100
-        if np.any(
-            unexpected_atom_mask
-            & (atoms.res_name != residue_dictionary.unknown_residue_name)
-        ):
-            unexpected_atoms = atoms.atom_name[unexpected_atom_mask]
-            unexpected_residues = atoms.res_name[unexpected_atom_mask]
+        is_unk = atoms.res_name == residue_dictionary.unknown_residue_name
+        if np.any(unexpected_atom_mask & ~is_unk):
+            unexpected_atom_mask &= ~is_unk
             unexpected_str = "\n".join(
                 [
                     f"{res_name} {res_id} {atom_name}"
                     for res_name, res_id, atom_name in zip(
-                        unexpected_residues,
+                        atoms.res_name[unexpected_atom_mask],
                         atoms.res_id[unexpected_atom_mask],
-                        unexpected_atoms,
+                        atoms.atom_name[unexpected_atom_mask],
                     )
                 ]
             )
@@ -245,89 +266,62 @@ class Biomolecule(Generic[T]):
             )
 
         # for unk residues, we just drop any e.g. sidechain atoms without raising an exception
-        unexpected_unk_atom_mask = unexpected_atom_mask & (
-            atoms.res_name == residue_dictionary.unknown_residue_name
-        )
-        atoms = atoms[~unexpected_unk_atom_mask]
-        expected_relative_atom_indices = expected_relative_atom_indices[
-            ~unexpected_unk_atom_mask
-        ]
-        residue_starts = get_residue_starts(atoms)
-
-        assert len(full_residue_starts) == len(
-            residue_starts
-        ), f"Full residue starts: {full_residue_starts} and residue starts: {residue_starts} do not match"
-
+        keep_atom_mask = ~unexpected_atom_mask
         existing_atom_indices_in_full_array = (
-            full_residue_starts[atoms.res_index] + expected_relative_atom_indices
-        )
+            full_residue_starts[residue_index] + expected_relative_atom_indices
+        )[keep_atom_mask]
 
         for annot_name, annot in atoms._annot.items():
             if (
-                annot_name in ["atomtype_index", "mask"]
+                annot_name in ["atomtype_index", "mask", "ins_code"]
                 or annot_name in full_annot_names
             ):
                 continue
-
-            getattr(new_atom_array, annot_name)[
+            if annot_name not in new_atom_array._annot:
+                # e.g. auth_chain_id: missing atoms take the value of their residue
+                new_atom_array.set_annotation(
+                    annot_name, sort(annot)[residue_starts][new_atom_array.res_index]
+                )
+            new_atom_array._annot[annot_name][
                 existing_atom_indices_in_full_array
-            ] = annot.astype(new_atom_array._annot[annot_name].dtype)
-
-        # set_annotation vs setattr: set_annotation adds to annot and verifies size
-        new_atom_array.coord[existing_atom_indices_in_full_array] = atoms.coord
-        # if we can create a res start index for each atom, we can assign the value based on that...
+            ] = annot[keep_atom_mask]
+        new_atom_array.coord[existing_atom_indices_in_full_array] = atoms.coord[
+            keep_atom_mask
+        ]
 
-        assert (
-            np.unique(new_atom_array.res_index) == np.unique(atoms.res_index)
-        ).all(), "We need this to agree to use residue indexing for filling annotations"
-        new_atom_array.set_annotation(
-            "res_id",
-            atoms.res_id[residue_starts][new_atom_array.res_index].astype(
-                new_atom_array.res_id.dtype
-            ),
-        )  # override with auth res id
-        new_atom_array.set_annotation(
-            "chain_id",
-            atoms.chain_id[residue_starts][new_atom_array.res_index].astype(
-                new_atom_array.chain_id.dtype
-            ),
+        relative_atom_index = (
+            np.arange(len(new_atom_array))
+            - full_residue_starts[new_atom_array.res_index]
         )
-        new_atom_array.set_annotation(
-            "ins_code",
-            atoms.ins_code[residue_starts][new_atom_array.res_index].astype(
-                new_atom_array.ins_code.dtype
-            ),
-        )
-
         new_atom_array.set_annotation(
             "atomtype_index",
-            map_categories_to_indices(
-                new_atom_array.atom_name, residue_dictionary.atom_types
+            residue_dictionary.get_atomtype_index(
+                new_atom_array.restype_index,
+                relative_atom_index,
+                new_atom_array.chain_id,
             ),
         )
-        assert np.all(
-            new_atom_array.atom_name != ""
-        ), "All atoms must be assigned a name"
         mask = np.zeros(len(new_atom_array), dtype=bool)
         mask[existing_atom_indices_in_full_array] = True
-        missing_atoms_strings = [
-            f"{res_name} {res_id} {atom_name}"
-            for res_name, res_id, atom_name in zip(
-                new_atom_array.res_name[~mask],
-                new_atom_array.res_id[~mask],
-                new_atom_array.atom_name[~mask],
-            )
-        ]
+        new_atom_array.set_annotation("mask", mask)
         if verbose:
+            assert np.all(
+                new_atom_array.atom_name != ""
+            ), "All atoms must be assigned a name"
+            missing_atoms_strings = [
+                f"{res_name} {res_id} {atom_name}"
+                for res_name, res_id, atom_name in zip(
+                    new_atom_array.res_name[~mask],
+                    new_atom_array.res_id[~mask],
+                    new_atom_array.atom_name[~mask],
+                )
+            ]
             print("Filled in missing atoms:\n", "\n".join(missing_atoms_strings))
-        new_atom_array.set_annotation("mask", mask)
         if backbone_only:
             assert residue_dictionary.backbone_atoms is not None
-            # TODO: more efficient backbone only
             new_atom_array = new_atom_array[
-                np.isin(new_atom_array.atom_name, residue_dictionary.backbone_atomss)
+                np.isin(new_atom_array.atom_name, residue_dictionary.backbone_atoms)
             ]
-            full_residue_starts = get_residue_starts(new_atom_array)
         return new_atom_array
 
     def to_pdb(self, pdb_path: str):
@@ -346,6 +340,14 @@ class Biomolecule(Generic[T]):
     def nan_mask(self):
         return np.isnan(self.atoms.coord).any(axis=-1)
 
+    @property
+    def _residue_starts(self):
+        return get_residue_starts(self.atoms)
+
+    def _atom_residue_index(self) -> np.ndarray:
+        """Index of the residue of each atom (in order of residue starts)."""
+        return np.cumsum(get_residue_starts_mask(self.atoms, self._residue_starts)) - 1
+
     @property
     def residue_index(self):
         return self.atoms["residue_index"][self._residue_starts]
@@ -429,61 +431,198 @@ class Biomolecule(Generic[T]):
             all_atom_coords[residue_indices, ix] = self.atoms.coord[at_mask]
         return all_atom_coords
 
+    def _present_atom_mask(
+        self, atom_names: Optional[Union[str, List[str]]] = None
+    ) -> np.ndarray:
+        """Atoms named in atom_names (all atoms if None) that are not missing.
+
+        Atoms are missing if their coordinates are nan or they are masked out by
+        the `mask` annotation of standardised atoms.
+        """
+        atom_mask = ~self.nan_mask
+        if "mask" in self.atoms._annot:
+            atom_mask &= self.atoms.mask
+        if atom_names is not None:
+            atom_mask &= np.isin(self.atoms.atom_name, atom_names)
+        return atom_mask
+
+    def residue_atom_coords(self, atom_name: str) -> np.ndarray:
+        """(num_residues, 3) coordinates of the atom named atom_name in each residue.
+
+        Residues without the atom (or in which it is missing) have nan coordinates.
+        """
+        atom_mask = self._present_atom_mask(atom_name)
+        residue_index = self._atom_residue_index()
+        coords = np.full((self.num_residues, 3), np.nan, dtype=np.float32)
+        coords[residue_index[atom_mask]] = self.atoms.coord[atom_mask]
+        return coords
+
+    def padded_residue_atom_coords(
+        self, atom_names: Optional[List[str]] = None
+    ) -> np.ndarray:
+        """(num_residues, num_slots, 3) coordinates of a set of atoms in each residue.
+
+        If atom_names is given, slot i holds the atom named atom_names[i];
+        otherwise slots hold all atoms of each residue in order. Missing atoms
+        have nan coordinates.
+        """
+        atom_mask = self._present_atom_mask(atom_names)
+        atom_indices = np.flatnonzero(atom_mask)
+        residue_index = self._atom_residue_index()[atom_indices]
+        if atom_names is not None:
+            atom_names = np.asarray(atom_names)
+            name_order = np.argsort(atom_names)
+            slot_index = name_order[
+                np.searchsorted(
+                    atom_names[name_order], self.atoms.atom_name[atom_indices]
+                )
+            ]
+            num_slots = len(atom_names)
+        else:
+            # rank of each atom within its residue
+            slot_index = np.arange(len(atom_indices)) - np.searchsorted(
+                residue_index, residue_index
+            )
+            num_slots = int(slot_index.max()) + 1 if len(slot_index) else 1
+        return padded_residue_coords(
+            self.atoms.coord[atom_indices],
+            residue_index,
+            slot_index,
+            self.num_residues,
+            num_slots,
+        )
+
     def residue_distances(
         self,
-        atom_names: Union[str, List[str]],
+        atom_names: Optional[Union[str, List[str]]],
         residue_mask_from: Optional[np.ndarray] = None,
         residue_mask_to: Optional[np.ndarray] = None,
         nan_fill=None,
         multi_atom_calc_type: str = "min",
+        max_block_elements: Optional[int] = None,
     ) -> np.ndarray:
-        # TODO: handle nans
-        # TODO: allow non-backbone atoms
+        """Dense (num_from, num_to) distances between residues selected by the masks.
+
+        For multiple atom names (or None, for all atoms), the distance between two
+        residues is the min or mean over pairs of their non-missing atoms, or the
+        distance between their representative atoms: the first of atom_names
+        present in each residue ('representative'). Distances are computed in
+        tiles of at most max_block_elements atom pairs, and are nan for residues
+        without any of the atoms unless nan_fill is given.
+        """
         if residue_mask_from is None:
             residue_mask_from = np.ones(self.num_residues, dtype=bool)
         if residue_mask_to is None:
             residue_mask_to = np.ones(self.num_residues, dtype=bool)
-        backbone_coords = self.backbone_coords()
-        if isinstance(atom_names, str) and atom_names in self.backbone_atoms:
-            at_index = self.backbone_atoms.index(atom_names)
-            dists = np.sqrt(
-                np.sum(
-                    (
-                        backbone_coords[None, residue_mask_from, at_index, :]
-                        - backbone_coords[residue_mask_to, None, at_index, :]
-                    )
-                    ** 2,
-                    axis=-1,
-                )
-            )
+        if isinstance(atom_names, str):
+            residue_coords = self.residue_atom_coords(atom_names)[:, None]
         else:
-            raise NotImplementedError(
-                "Muliple atom distance calculations not yet supported"
-            )
+            residue_coords = self.padded_residue_atom_coords(atom_names)
+        dists = blocked_residue_distances(
+            residue_coords[residue_mask_from],
+            residue_coords[residue_mask_to],
+            multi_atom_calc_type=multi_atom_calc_type,
+            max_block_elements=max_block_elements,
+        )
         if nan_fill is not None:
             if isinstance(nan_fill, float) or isinstance(nan_fill, int):
                 dists = np.nan_to_num(dists, nan=nan_fill)
             elif nan_fill == "max":
-                max_dist = np.nanmax(dists, axis=-1)
-                dists = np.nan_to_num(dists, nan=max_dist)
+                max_dist = np.nanmax(dists, axis=-1, keepdims=True)
+                dists = np.where(np.isnan(dists), max_dist, dists)
             else:
                 raise ValueError(
                     f"Invalid nan_fill: {nan_fill}. Please specify a float or int."
                 )
         return dists
 
+    def residue_neighbours(
+        self,
+        atom_names: Optional[Union[str, List[str]]],
+        cutoff: float,
+        residue_mask_from: Optional[np.ndarray] = None,
+        residue_mask_to: Optional[np.ndarray] = None,
+        multi_atom_calc_type: str = "min",
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sparse residue pairs within a cutoff distance, found with a cell list.
+
+        The distance between two residues is the minimum distance between their
+        atoms named in atom_names (all atoms if None), or the distance between their
+        representative atoms ('representative', see `residue_distances`). Missing
+        atoms are ignored. Memory scales with the number of neighbouring atom pairs
+        rather than with the square of the number of residues.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: COO residue indices (from, to)
+                and distances of all pairs within cutoff, sorted by (from, to).
+                Self-pairs are included when the residue masks overlap.
+        """
+        if multi_atom_calc_type not in ["min", "representative"]:
+            raise NotImplementedError(
+                f"Unsupported multi_atom_calc_type: {multi_atom_calc_type}"
+            )
+        if isinstance(atom_names, str):
+            atom_names = [atom_names]
+        if multi_atom_calc_type == "representative":
+            coord = representative_atom_coords(
+                self.padded_residue_atom_coords(atom_names)
+            )
+            residue_index = np.arange(len(coord))
+            atom_mask = ~np.isnan(coord).any(axis=-1)
+        else:
+            coord = self.atoms.coord
+            residue_index = self._atom_residue_index()
+            atom_mask = self._present_atom_mask(atom_names)
+        num_residues = self.num_residues
+        if residue_mask_from is None:
+            residue_mask_from = np.ones(num_residues, dtype=bool)
+        if residue_mask_to is None:
+            residue_mask_to = np.ones(num_residues, dtype=bool)
+        atoms_from = np.flatnonzero(atom_mask & residue_mask_from[residue_index])
+        atoms_to = np.flatnonzero(atom_mask & residue_mask_to[residue_index])
+        index_from, index_to, distances = atom_pairs_within(
+            coord[atoms_from], coord[atoms_to], cutoff
+        )
+        return min_distance_by_group(
+            residue_index[atoms_from[index_from]],
+            residue_index[atoms_to[index_to]],
+            distances,
+            num_residues,
+        )
+
     def residue_contacts(
         self,
-        atom_names: Union[str, List[str]],
+        atom_names: Optional[Union[str, List[str]]],
         threshold: float,
         multi_atom_calc_type: str = "min",
-    ) -> np.ndarray:
-        return (
-            self.residue_distances(
-                atom_names, nan_fill="max", multi_atom_calc_type=multi_atom_calc_type
+        as_pairs: bool = False,
+    ) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """Residues closer than threshold, computed from sparse residue neighbours.
+
+        e.g. `residue_contacts(None, 5.0)` gives heavy-atom minimum distance
+        contacts of standardised (hydrogen-free) atoms.
+
+        Returns a dense (num_residues, num_residues) boolean contact map, or,
+        if as_pairs, the (from, to) residue indices of contacting pairs.
+        """
+        if multi_atom_calc_type == "mean":
+            index_from, index_to = np.nonzero(
+                self.residue_distances(
+                    atom_names, multi_atom_calc_type=multi_atom_calc_type
+                )
+                < threshold
             )
-            < threshold
-        )
+        else:
+            index_from, index_to, distances = self.residue_neighbours(
+                atom_names, threshold, multi_atom_calc_type=multi_atom_calc_type
+            )
+            in_contact = distances < threshold
+            index_from, index_to = index_from[in_contact], index_to[in_contact]
+        if as_pairs:
+            return index_from, index_to
+        contacts = np.zeros((self.num_residues, self.num_residues), dtype=bool)
+        contacts[index_from, index_to] = True
+        return contacts
 
     def backbone(self) -> T:
         # TODO: might need to also modify residue dictionary to avoid explicit nan atom coords
@@ -523,14 +662,158 @@ class BiomoleculeChain(Biomolecule):
         return self.atoms.chain_id[0]
 
 
+def concatenate_chain_atoms(chain_atoms: List[bs.AtomArray]) -> bs.AtomArray:
+    """Concatenate atom arrays into a single new atom array.
+
+    Unlike summing atom arrays, all annotations are kept: annotations missing from
+    some of the arrays are filled with zeros (empty strings for string annotations).
+    Bonds are kept if any of the arrays have bonds.
+    """
+    lengths = [len(atoms) for atoms in chain_atoms]
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=int)])
+    concatenated = bs.AtomArray(int(offsets[-1]))
+    if not chain_atoms:
+        return concatenated
+    concatenated.coord = np.concatenate([atoms.coord for atoms in chain_atoms])
+    annot_dtypes = {}
+    for atoms in chain_atoms:
+        for annot_name, annot in atoms._annot.items():
+            annot_dtypes.setdefault(annot_name, annot.dtype)
+    for annot_name, dtype in annot_dtypes.items():
+        concatenated.set_annotation(
+            annot_name,
+            np.concatenate(
+                [
+                    atoms._annot[annot_name]
+                    if annot_name in atoms._annot
+                    else np.zeros(len(atoms), dtype=dtype)
+                    for atoms in chain_atoms
+                ]
+            ),
+        )
+    if any(atoms.bonds is not None for atoms in chain_atoms):
+        bonds = [
+            atoms.bonds.as_array()
+            if atoms.bonds is not None
+            else np.zeros((0, 3), dtype=np.uint32)
+            for atoms in chain_atoms
+        ]
+        for bond_array, offset in zip(bonds, offsets[:-1]):
+            bond_array[:, :2] += np.uint32(offset)
+        concatenated.bonds = bs.BondList(
+            len(concatenated), np.concatenate(bonds).astype(np.uint32)
+        )
+    return concatenated
+
+
 class BaseBiomoleculeComplex(Biomolecule):
+    """A collection of single-chain biomolecules.
+
+    The atoms of all chains are held in a single contiguous atom array, and the
+    atoms of each chain are slices (views) of this array, so that `atoms` is free
+    to access. In-place modifications of chain atoms are therefore reflected in
+    the complex atoms. Replacing a chain's atoms (or adding or removing chains
+    other than via `__setitem__` / `__delitem__`) requires a call to
+    `invalidate_atoms`.
+    """
+
     def __init__(self, chains: List[BiomoleculeChain]):
         self._chain_ids = [mol.chain_id for mol in chains]
         self._chains_lookup = {mol.chain_id: mol for mol in chains}
+        self._build_atoms()
+
+    def _build_atoms(self):
+        chains = list(self._chains_lookup.values())
+        atoms = concatenate_chain_atoms([chain.atoms for chain in chains])
+        self._chain_offsets = np.concatenate(
+            [[0], np.cumsum([len(chain.atoms) for chain in chains], dtype=int)]
+        )
+        self._chain_positions = {
+            chain_id: ix for ix, chain_id in enumerate(self._chains_lookup)
+        }
+        # slice without bonds, which would otherwise be filtered once per chain
+        bonds, atoms.bonds = atoms.bonds, None
+        for chain, start, stop in zip(
+            chains, self._chain_offsets[:-1], self._chain_offsets[1:]
+        ):
+            chain_bonds = chain.atoms.bonds
+            chain.atoms = atoms[start:stop]
+            if bonds is not None:
+                chain.atoms.bonds = (
+                    chain_bonds
+                    if chain_bonds is not None
+                    else bs.BondList(int(stop - start))
+                )
+        atoms.bonds = bonds
+        self._atoms = atoms
+
+    def invalidate_atoms(self):
+        """Discard the cached complex atoms, after chains have been modified.
+
+        The complex atoms are rebuilt (and chain atoms re-pointed to slices of
+        them) on the next access.
+        """
+        self._atoms = None
+
+    def chain_slice(self, chain_id: str) -> slice:
+        """Slice of the complex atoms containing the atoms of a chain."""
+        if self._atoms is None:
+            self._build_atoms()
+        ix = self._chain_positions[chain_id]
+        return slice(int(self._chain_offsets[ix]), int(self._chain_offsets[ix + 1]))
+
+    def __setitem__(self, chain_id: str, chain: BiomoleculeChain):
+        if chain_id not in self._chains_lookup:
+            self._chain_ids.append(chain_id)
+        self._chains_lookup[chain_id] = chain
+        self.invalidate_atoms()
+
+    def __delitem__(self, chain_id: str):
+        del self._chains_lookup[chain_id]
+        self._chain_ids = [cid for cid in self._chain_ids if cid != chain_id]
+        self.invalidate_atoms()
 
     def __str__(self):
         return str(self._chains_lookup)
 
+    def interfaces(
+        self,
+        atom_names: Union[str, List[str]] = "CA",
+        threshold: float = 10.0,
+    ) -> Dict[str, np.ndarray]:
+        """Interface residue pairs between all pairs of chains, in one neighbour search.
+
+        The distance between two residues is the minimum distance between their
+        atoms named in atom_names.
+
+        Returns:
+            Dict[str, np.ndarray]: a table of residue pairs closer than threshold
+                with columns chain_i, chain_j (chain ids, with chain_i before chain_j
+                in chain order), res_i, res_j (res ids), residue_index_i,
+                residue_index_j (indices into the residues of the complex) and
+                min_dist; sorted by (residue_index_i, residue_index_j).
+        """
+        residue_starts = self._residue_starts
+        residue_chain_id = self.atoms.chain_id[residue_starts]
+        residue_chain_index = np.searchsorted(
+            self._chain_offsets[1:], residue_starts, side="right"
+        )
+        index_i, index_j, distances = self.residue_neighbours(atom_names, threshold)
+        is_interface = (distances < threshold) & (
+            residue_chain_index[index_i] < residue_chain_index[index_j]
+        )
+        index_i, index_j = index_i[is_interface], index_j[is_interface]
+        residue_res_id = self.atoms.res_id[residue_starts]
+        return {
+            "chain_i": residue_chain_id[index_i],
+            "chain_j": residue_chain_id[index_j],
+            "res_i": residue_res_id[index_i],
+            "res_j": residue_res_id[index_j],
+            "residue_index_i": index_i,
+            "residue_index_j": index_j,
+            "min_dist": distances[is_interface],
+        }
+
     @classmethod
     def from_atoms(
         cls,
@@ -559,15 +842,9 @@ class BaseBiomoleculeComplex(Biomolecule):
 
     @property
     def atoms(self):
-        chain_atoms = [chain.atoms for chain in self._chains_lookup.values()]
-        atoms = sum(chain_atoms, bs.AtomArray(length=0))
-        for annot_name in chain_atoms[0]._annot:
-            if annot_name not in atoms._annot:
-                atoms.set_annotation(
-                    annot_name,
-                    np.concatenate([at._annot[annot_name] for at in chain_atoms]),
-                )
-        return atoms
+        if self._atoms is None:
+            self._build_atoms()
+        return self._atoms
 
     @classmethod
     def from_file(
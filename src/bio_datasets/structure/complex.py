@@ -1,5 +1,5 @@
+import itertools
 import string
-from itertools import product
 from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
@@ -19,11 +19,55 @@ def chain_name_generator():
         yield letter
 
     # Double letter chains AA, AB, ..., ZZ, then AAA, AAB, etc.
-    for length in range(2, 1e3):  # Extend as needed (e.g., up to "ZZZZ")
-        for combo in product(single_letters, repeat=length):
+    for length in itertools.count(2):
+        for combo in itertools.product(single_letters, repeat=length):
             yield "".join(combo)
 
 
+def _segment_starts(*keys: np.ndarray) -> np.ndarray:
+    """Mask of positions at which any of the (sorted) keys changes."""
+    starts = np.zeros(len(keys[0]), dtype=bool)
+    starts[:1] = True
+    for key in keys:
+        starts[1:] |= key[1:] != key[:-1]
+    return starts
+
+
+def _chain_slices(chain_id: np.ndarray) -> List[Tuple[int, int]]:
+    """(start, stop) of each contiguous run of atoms with the same chain id."""
+    starts = np.flatnonzero(_segment_starts(chain_id))
+    stops = np.append(starts[1:], len(chain_id))
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+def _split_chain_groups(atoms: bs.AtomArray) -> Tuple[np.ndarray, np.ndarray]:
+    """Group atoms into single-molecule-type chains, with one lexsort.
+
+    Chains (in sorted chain id order) containing a single molecule type form a
+    single group. Chains with mixed molecule types are split by molecule type,
+    and their small molecule atoms are further split into one group per res_id.
+    The order of atoms within each group is preserved.
+
+    Returns:
+        order: permutation sorting atoms by group.
+        group_index: group of each atom, in sorted order (0, ..., n_groups - 1).
+    """
+    molecule_type = atoms.molecule_type
+    _, chain_index = np.unique(atoms.chain_id, return_inverse=True)
+    _, type_index = np.unique(molecule_type, return_inverse=True)
+    chain_type_pairs = np.unique(np.stack([chain_index, type_index], axis=1), axis=0)
+    types_per_chain = np.bincount(chain_type_pairs[:, 0])
+    mixed = types_per_chain[chain_index] > 1
+    type_key = np.where(mixed, type_index, 0)
+    res_key = np.where(mixed & (molecule_type == "small_molecule"), atoms.res_id, 0)
+    order = np.lexsort((res_key, type_key, chain_index))
+    group_index = (
+        np.cumsum(_segment_starts(chain_index[order], type_key[order], res_key[order]))
+        - 1
+    )
+    return order, group_index
+
+
 def _get_presets_by_molecule_type(
     category_to_res_dict_preset_name: Optional[Dict[str, str]] = None,
     use_canonical_presets: bool = True,
@@ -63,76 +107,42 @@ class BiomoleculeComplex(BaseBiomoleculeComplex):
 
     @staticmethod
     def split_relabel_chain(chain_atoms: bs.AtomArray, chain_name_gen: Iterator[str]):
-        new_arrs = []
-        chain_atoms.set_annotation(
-            "molecule_type", get_res_categories(chain_atoms.res_name)
+        """Split a single chain into single-molecule-type chains, named by chain_name_gen."""
+        relabelled_atoms = BiomoleculeComplex._split_relabel(
+            chain_atoms, chain_name_gen
         )
-        molecule_types = chain_atoms.molecule_type
-        if len(np.unique(molecule_types)) == 1:
-            chain_atoms.set_annotation("auth_chain_id", chain_atoms.chain_id)
-            chain_atoms.set_annotation(
-                "chain_id", np.full_like(chain_atoms.chain_id, next(chain_name_gen))
-            )
-            new_arrs.append(chain_atoms)
-        else:
-            for molecule_type in np.unique(molecule_types):
-                if molecule_type == "small_molecule":
-                    # each residue is a separate small molecule
-                    all_small_molecule_atoms = chain_atoms[
-                        chain_atoms.molecule_type == "small_molecule"
-                    ]
-                    res_ids = np.unique(all_small_molecule_atoms.res_id)
-                    for res_id in res_ids:
-                        molecule_atoms = all_small_molecule_atoms[
-                            all_small_molecule_atoms.res_id == res_id
-                        ]
-                        molecule_atoms.set_annotation(
-                            "auth_chain_id", molecule_atoms.chain_id
-                        )
-                        molecule_atoms.set_annotation(
-                            "chain_id",
-                            np.full_like(molecule_atoms.chain_id, next(chain_name_gen)),
-                        )
-                        new_arrs.append(molecule_atoms)
-                else:
-                    molecule_atoms = chain_atoms[
-                        chain_atoms.molecule_type == molecule_type
-                    ]
-                    molecule_atoms.set_annotation(
-                        "auth_chain_id", molecule_atoms.chain_id
-                    )
-                    molecule_atoms.set_annotation(
-                        "chain_id",
-                        np.full_like(molecule_atoms.chain_id, next(chain_name_gen)),
-                    )
-                    new_arrs.append(molecule_atoms)
-        return new_arrs
+        return [
+            relabelled_atoms[start:stop]
+            for start, stop in _chain_slices(relabelled_atoms.chain_id)
+        ]
 
     @staticmethod
-    def split_relabel_chains(atoms: bs.AtomArray):
-        chain_ids = np.unique(atoms.chain_id)
-        new_arrs = []
-        chain_name_gen = chain_name_generator()
-        for chain_id in chain_ids:
-            chain_atoms = atoms[atoms.chain_id == chain_id]
-            new_arrs += BiomoleculeComplex.split_relabel_chain(
-                chain_atoms, chain_name_gen
-            )
-        # TODO: add annotations also.
-        relabelled_atoms = sum(new_arrs, bs.AtomArray(length=0))
-        for key in atoms._annot.keys():
-            if key not in relabelled_atoms._annot:
-                relabelled_atoms.set_annotation(
-                    key,
-                    np.concatenate(
-                        [molecule_atoms._annot[key] for molecule_atoms in new_arrs]
-                    ),
-                )
-        relabelled_atoms.set_annotation(
-            "molecule_type", get_res_categories(relabelled_atoms.res_name)
+    def _split_relabel(atoms: bs.AtomArray, chain_name_gen: Iterator[str]):
+        atoms = atoms.copy()
+        atoms.set_annotation("molecule_type", get_res_categories(atoms.res_name))
+        if len(atoms) == 0:
+            atoms.set_annotation("auth_chain_id", atoms.chain_id)
+            return atoms
+        order, group_index = _split_chain_groups(atoms)
+        chain_names = np.array(
+            list(itertools.islice(chain_name_gen, int(group_index[-1]) + 1))
         )
+        relabelled_atoms = atoms[order]
+        relabelled_atoms.set_annotation("auth_chain_id", relabelled_atoms.chain_id)
+        relabelled_atoms.set_annotation("chain_id", chain_names[group_index])
         return relabelled_atoms
 
+    @staticmethod
+    def split_relabel_chains(atoms: bs.AtomArray):
+        """Relabel chains so that each chain contains a single molecule type.
+
+        Chains containing multiple molecule types are split by molecule type, with
+        each small molecule (residue) becoming a separate chain. New chains are
+        named A, ..., Z, AA, AB, ... in order of (original chain id, molecule type,
+        res_id); the original chain id is stored in the auth_chain_id annotation.
+        """
+        return BiomoleculeComplex._split_relabel(atoms, chain_name_generator())
+
     @classmethod
     def from_atoms(
         cls,
@@ -155,10 +165,12 @@ class BiomoleculeComplex(BaseBiomoleculeComplex):
         atoms = BiomoleculeComplex.filter_atoms(atoms, keep_hydrogens=False)
         atoms = BiomoleculeComplex.split_relabel_chains(atoms)
 
-        for chain_id in np.unique(atoms.chain_id):
-            chain_categories = atoms.molecule_type[atoms.chain_id == chain_id]
-            assert len(np.unique(chain_categories)) == 1
-            chain_category = chain_categories[0]
+        # chains are contiguous after relabelling; construct them in chain id order
+        for start, stop in sorted(
+            _chain_slices(atoms.chain_id), key=lambda bounds: atoms.chain_id[bounds[0]]
+        ):
+            chain_atoms = atoms[start:stop]
+            chain_category = chain_atoms.molecule_type[0]
             if chain_category in ["protein", "dna", "rna"]:
                 dict_cls = (
                     ProteinDictionary
@@ -166,28 +178,19 @@ class BiomoleculeComplex(BaseBiomoleculeComplex):
                     else ResidueDictionary
                 )
                 chain = molecule_type_objects[chain_category](
-                    atoms[atoms.chain_id == chain_id],
+                    chain_atoms,
                     residue_dictionary=dict_cls.from_preset(
                         category_to_res_dict_preset_name[chain_category]
                     ),
                 )
             elif chain_category == "small_molecule":
-                chain = molecule_type_objects["small_molecule"](
-                    atoms[atoms.chain_id == chain_id],
-                )
+                chain = molecule_type_objects["small_molecule"](chain_atoms)
             else:
                 raise ValueError(f"Unsupported chain category: {chain_category}")
             chains.append(chain)
 
         return cls(chains)
 
-    @property
-    def atoms(self):
-        return sum(
-            [chain.atoms for chain in self._chains_lookup.values()],
-            bs.AtomArray(length=0),
-        )
-
     @property
     def chain_ids(self):
         return self._chain_ids
@@ -199,6 +202,17 @@ class BiomoleculeComplex(BaseBiomoleculeComplex):
     def get_chain(self, chain_id: str) -> "BiomoleculeChain":
         return self._chains_lookup[chain_id]
 
+    def _get_chain_pair(
+        self, chain_pair: Optional[Tuple[str, str]] = None
+    ) -> Tuple[str, str]:
+        if chain_pair is None:
+            if len(self._chain_ids) != 2:
+                raise ValueError(
+                    "chain_pair must be specified for non-binary complexes"
+                )
+            chain_pair = (self._chain_ids[0], self._chain_ids[1])
+        return chain_pair
+
     def interface(
         self,
         atom_names: Union[str, List[str]] = "CA",
@@ -206,10 +220,38 @@ class BiomoleculeComplex(BaseBiomoleculeComplex):
         threshold: float = 10.0,
         nan_fill: Optional[Union[float, str]] = None,
     ) -> T:
-        distances = self.interface_distances(
-            atom_names=atom_names, chain_pair=chain_pair, nan_fill=nan_fill
-        )
-        interface_mask = distances < threshold
+        """Residues of either chain in chain_pair closer than threshold to the other chain.
+
+        Uses a sparse neighbour search, so only residue pairs within threshold
+        are ever computed. Residues missing the atoms are never in the interface,
+        unless nan_fill is given, in which case their distances are filled as
+        in `interface_distances` (which computes dense distances).
+        """
+        chain_pair = self._get_chain_pair(chain_pair)
+        residue_chain_id = self.atoms.chain_id[self._residue_starts]
+        residue_mask_from = residue_chain_id == chain_pair[0]
+        residue_mask_to = residue_chain_id == chain_pair[1]
+        interface_residues = np.zeros(len(residue_chain_id), dtype=bool)
+        if nan_fill is not None:
+            in_contact = (
+                self.interface_distances(
+                    atom_names=atom_names, chain_pair=chain_pair, nan_fill=nan_fill
+                )
+                < threshold
+            )
+            interface_residues[np.flatnonzero(residue_mask_from)] = in_contact.any(1)
+            interface_residues[np.flatnonzero(residue_mask_to)] |= in_contact.any(0)
+        else:
+            index_from, index_to, distances = self.residue_neighbours(
+                atom_names,
+                threshold,
+                residue_mask_from=residue_mask_from,
+                residue_mask_to=residue_mask_to,
+            )
+            in_contact = distances < threshold
+            interface_residues[index_from[in_contact]] = True
+            interface_residues[index_to[in_contact]] = True
+        interface_mask = interface_residues[self._atom_residue_index()]
         return self.__class__.from_atoms(self.atoms[interface_mask])
 
     def interface_distances(
@@ -218,15 +260,16 @@ class BiomoleculeComplex(BaseBiomoleculeComplex):
         chain_pair: Optional[Tuple[str, str]] = None,
         nan_fill: Optional[Union[float, str]] = None,
     ) -> np.ndarray:
-        if chain_pair is None:
-            if len(self._chain_ids) != 2:
-                raise ValueError(
-                    "chain_pair must be specified for non-binary complexes"
-                )
-            chain_pair = (self._chain_ids[0], self._chain_ids[1])
-        residue_mask_from = self.atoms.chain_id == chain_pair[0]
-        residue_mask_to = self.atoms.chain_id == chain_pair[1]
-        return self.distances(
+        """Dense distances between the residues of the two chains in chain_pair.
+
+        For interfaces between many chains, prefer `interfaces`, which only
+        computes distances between neighbouring residues.
+        """
+        chain_pair = self._get_chain_pair(chain_pair)
+        residue_chain_id = self.atoms.chain_id[self._residue_starts]
+        residue_mask_from = residue_chain_id == chain_pair[0]
+        residue_mask_to = residue_chain_id == chain_pair[1]
+        return self.residue_distances(
             atom_names=atom_names,
             residue_mask_from=residue_mask_from,
             residue_mask_to=residue_mask_to,
@@ -0,0 +1,111 @@
+"""Blocked residue-residue distance kernels.
+
+Residues are represented as (num_residues, num_atom_slots, 3) padded coordinate
+arrays, in which missing atoms have nan coordinates. Distances are computed over
+tiles of residue pairs so that peak memory is bounded by `max_block_elements`
+rather than growing with num_residues ** 2 * num_atom_slots ** 2.
+"""
+from typing import Optional
+
+import numpy as np
+
+MULTI_ATOM_CALC_TYPES = ["min", "mean", "representative"]
+
+# number of atom-pair distances computed per tile (~32 MB of float64).
+DEFAULT_MAX_BLOCK_ELEMENTS = 2**22
+
+
+def padded_residue_coords(
+    coord: np.ndarray,
+    residue_index: np.ndarray,
+    slot_index: np.ndarray,
+    num_residues: int,
+    num_slots: int,
+) -> np.ndarray:
+    """Scatter atom coordinates into a nan-padded (num_residues, num_slots, 3) array."""
+    residue_coords = np.full((num_residues, num_slots, 3), np.nan, dtype=np.float32)
+    residue_coords[residue_index, slot_index] = coord
+    return residue_coords
+
+
+def representative_atom_coords(residue_coords: np.ndarray) -> np.ndarray:
+    """Coordinates of the first non-missing atom slot of each residue (nan if none)."""
+    is_present = ~np.isnan(residue_coords).any(axis=-1)
+    first_present = np.argmax(is_present, axis=-1)
+    coords = residue_coords[np.arange(len(residue_coords)), first_present]
+    coords[~is_present.any(axis=-1)] = np.nan
+    return coords
+
+
+def _block_size(num_slots_from: int, num_slots_to: int, max_block_elements: int):
+    return max(1, int(np.sqrt(max_block_elements / (num_slots_from * num_slots_to))))
+
+
+def blocked_residue_distances(
+    coords_from: np.ndarray,
+    coords_to: np.ndarray,
+    multi_atom_calc_type: str = "min",
+    max_block_elements: Optional[int] = None,
+) -> np.ndarray:
+    """Distances between all pairs of residues, computed in tiles.
+
+    Args:
+        coords_from (np.ndarray): (n, num_slots_from, 3) padded residue coordinates.
+        coords_to (np.ndarray): (m, num_slots_to, 3) padded residue coordinates.
+        multi_atom_calc_type (str): 'min' or 'mean' distance over all pairs of
+            non-missing atoms, or 'representative' to use the distance between
+            the first non-missing atom slot of each residue.
+        max_block_elements (int, optional): Maximum number of atom-pair distances
+            per tile.
+
+    Returns:
+        np.ndarray: (n, m) float32 distances; nan where either residue has no
+            non-missing atoms.
+    """
+    if multi_atom_calc_type not in MULTI_ATOM_CALC_TYPES:
+        raise ValueError(
+            f"Invalid multi_atom_calc_type: {multi_atom_calc_type}. "
+            f"Expected one of {MULTI_ATOM_CALC_TYPES}"
+        )
+    max_block_elements = max_block_elements or DEFAULT_MAX_BLOCK_ELEMENTS
+    if multi_atom_calc_type == "representative":
+        coords_from = representative_atom_coords(coords_from)[:, None]
+        coords_to = representative_atom_coords(coords_to)[:, None]
+        multi_atom_calc_type = "min"
+    valid_from = ~np.isnan(coords_from).any(axis=-1)
+    valid_to = ~np.isnan(coords_to).any(axis=-1)
+    num_slots_from, num_slots_to = coords_from.shape[1], coords_to.shape[1]
+    # squared distances are computed as |x|^2 + |y|^2 - 2 x.y with a matrix product,
+    # in float64 to limit cancellation error. Missing atoms get infinite norms.
+    coords_from = np.where(valid_from[..., None], coords_from, 0.0).astype(np.float64)
+    coords_to = np.where(valid_to[..., None], coords_to, 0.0).astype(np.float64)
+    sq_norms_from = np.where(valid_from, (coords_from**2).sum(axis=-1), np.inf)
+    sq_norms_to = np.where(valid_to, (coords_to**2).sum(axis=-1), np.inf)
+    num_valid = (
+        valid_from.sum(axis=-1)[:, None] * valid_to.sum(axis=-1)[None]
+    )  # (n, m) number of atom pairs
+    dists = np.empty((len(coords_from), len(coords_to)), dtype=np.float32)
+    block_size = _block_size(num_slots_from, num_slots_to, max_block_elements)
+    for start_from in range(0, len(coords_from), block_size):
+        block_from = slice(start_from, start_from + block_size)
+        flat_from = coords_from[block_from].reshape(-1, 3)
+        for start_to in range(0, len(coords_to), block_size):
+            block_to = slice(start_to, start_to + block_size)
+            flat_to = coords_to[block_to].reshape(-1, 3)
+            pair_sq_dists = (
+                sq_norms_from[block_from].reshape(-1, 1)
+                + sq_norms_to[block_to].reshape(1, -1)
+                - 2 * flat_from @ flat_to.T
+            ).reshape(-1, num_slots_from, len(flat_to) // num_slots_to, num_slots_to)
+            if multi_atom_calc_type == "min":
+                block_dists = np.sqrt(np.maximum(pair_sq_dists.min(axis=(1, 3)), 0.0))
+            else:
+                pair_dists = np.sqrt(np.maximum(pair_sq_dists, 0.0))
+                pair_dists[np.isinf(pair_dists)] = 0.0
+                block_dists = pair_dists.sum(axis=(1, 3)) / np.maximum(
+                    num_valid[block_from, block_to], 1
+                )
+            dists[block_from, block_to] = np.where(
+                num_valid[block_from, block_to] > 0, block_dists, np.nan
+            )
+    return dists
@@ -0,0 +1,76 @@
+"""Sparse neighbour search over atom coordinates.
+
+Pairs within a cutoff are found with a biotite cell list, so that memory scales
+with the number of contacts rather than with the square of the number of atoms.
+"""
+from typing import Tuple
+
+import numpy as np
+from biotite import structure as bs
+
+# number of query positions per cell list lookup; bounds the size of the
+# (padded) neighbour index arrays returned by biotite.
+_QUERY_CHUNK_SIZE = 4096
+
+
+def atom_pairs_within(
+    coord_from: np.ndarray, coord_to: np.ndarray, cutoff: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """All pairs of positions within a cutoff distance of each other.
+
+    Args:
+        coord_from (np.ndarray): (n, 3) query coordinates. Must not contain nans.
+        coord_to (np.ndarray): (m, 3) target coordinates. Must not contain nans.
+        cutoff (float): Maximum distance (inclusive).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: COO indices into coord_from
+            and coord_to, and the corresponding distances (float32), sorted by
+            index into coord_from.
+    """
+    if len(coord_from) == 0 or len(coord_to) == 0:
+        return (
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.float32),
+        )
+    cell_list = bs.CellList(coord_to.astype(np.float32), cell_size=max(cutoff, 1e-3))
+    index_from, index_to = [], []
+    for start in range(0, len(coord_from), _QUERY_CHUNK_SIZE):
+        neighbours = cell_list.get_atoms(
+            coord_from[start : start + _QUERY_CHUNK_SIZE], radius=cutoff
+        )
+        rows, cols = np.nonzero(neighbours >= 0)
+        index_from.append(rows + start)
+        index_to.append(neighbours[rows, cols].astype(np.int64))
+    index_from = np.concatenate(index_from)
+    index_to = np.concatenate(index_to)
+    distances = np.linalg.norm(
+        coord_from[index_from] - coord_to[index_to], axis=-1
+    ).astype(np.float32)
+    return index_from, index_to, distances
+
+
+def min_distance_by_group(
+    group_from: np.ndarray,
+    group_to: np.ndarray,
+    distances: np.ndarray,
+    num_groups_to: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reduce pairs of atoms to pairs of groups (e.g. residues) and their minimum distance.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: unique (group_from, group_to)
+            pairs, sorted lexicographically, and the minimum distance of each pair.
+    """
+    pair_key = group_from.astype(np.int64) * num_groups_to + group_to
+    order = np.lexsort((distances, pair_key))
+    pair_key = pair_key[order]
+    first = np.ones(len(pair_key), dtype=bool)
+    first[1:] = pair_key[1:] != pair_key[:-1]
+    pair_key = pair_key[first]
+    return (
+        pair_key // num_groups_to,
+        pair_key % num_groups_to,
+        distances[order][first],
+    )
@@ -2,11 +2,7 @@ from typing import Optional
 
 from biotite import structure as bs
 
-from bio_datasets.structure.residue import (
-    ResidueDictionary,
-    get_all_residue_names,
-    register_preset_res_dict,
-)
+from bio_datasets.structure.residue import ResidueDictionary, register_preset_res_dict
 
 from .nucleic import NucleotideChain, dna_nucleotides, residue_atoms, residue_elements
 
@@ -35,7 +31,7 @@ register_preset_res_dict(
 
 register_preset_res_dict(
     "dna_all",
-    residue_names=get_all_residue_names("dna"),
+    category="dna",
     backbone_atoms=backbone_atoms,
 )
 
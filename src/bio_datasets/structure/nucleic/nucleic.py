@@ -8,11 +8,9 @@ from biotite.structure.filter import (
     _canonical_nucleotide_list,
     _phosphate_backbone_atoms,
 )
-from biotite.structure.info.ccd import get_ccd
-from biotite.structure.io.pdbx import get_component
 
 from bio_datasets.structure.biomolecule import BiomoleculeChain
-from bio_datasets.structure.residue import ResidueDictionary
+from bio_datasets.structure.residue import ResidueDictionary, get_component_atoms
 
 dna_nucleotides = ["DA", "DC", "DG", "DT"]
 rna_nucleotides = ["A", "C", "G", "U"]
@@ -21,17 +19,14 @@ rna_nucleotides = ["A", "C", "G", "U"]
 def get_residue_atoms_and_elements(residue_names):
     residue_atoms = {}
     residue_elements = {}
-    ccd_data = get_ccd()
     for resname in residue_names:
-        comp = get_component(ccd_data, res_name=resname)
+        atom_names, atom_elements = get_component_atoms(resname)
         atoms = [
-            at
-            for at in comp.atom_name
-            if not at.startswith("H") and not at.startswith("D")
+            at for at in atom_names if not at.startswith("H") and not at.startswith("D")
         ]
         elements = [
             elem
-            for at, elem in zip(comp.atom_name, comp.element)
+            for at, elem in zip(atom_names, atom_elements)
             if elem != "H" and elem != "D" and at != "OXT"
         ]
         assert len(atoms) == len(elements)
@@ -2,11 +2,7 @@ from typing import Optional
 
 from biotite import structure as bs
 
-from bio_datasets.structure.residue import (
-    ResidueDictionary,
-    get_all_residue_names,
-    register_preset_res_dict,
-)
+from bio_datasets.structure.residue import ResidueDictionary, register_preset_res_dict
 
 from .nucleic import NucleotideChain, residue_atoms, residue_elements, rna_nucleotides
 
@@ -35,7 +31,7 @@ register_preset_res_dict(
 
 register_preset_res_dict(
     "rna_all",
-    residue_names=get_all_residue_names("rna"),
+    category="rna",
     backbone_atoms=backbone_atoms,
     unknown_residue_name="UNK",
 )
@@ -29,13 +29,8 @@ from biotite.structure.io.pdbx.convert import (
     _get_transformations,
     _parse_operation_expression,
 )
-from biotite.structure.residues import get_residue_starts
 
-from .residue import (
-    ResidueDictionary,
-    create_complete_atom_array_from_restype_index,
-    get_residue_starts_mask,
-)
+from .residue import ResidueDictionary, expand_residue_templates
 
 FILE_TYPE_TO_EXT = {
     "pdb": "pdb",
@@ -53,144 +48,138 @@ def is_open_compatible(file):
     return isinstance(file, (str, PathLike))
 
 
-def fill_missing_polymer_chain_residues(
-    chain_atoms, complete_res_ids, restype_index, residue_dict, chain_id
-):
-    """Fill in missing residues for a single polymer chain."""
-    missing_res_mask = ~np.isin(complete_res_ids, chain_atoms.res_id)
-    missing_atoms, _, _ = create_complete_atom_array_from_restype_index(
-        restype_index[missing_res_mask],
-        residue_dict,
-        chain_id,
-        res_id=complete_res_ids[missing_res_mask],
-    )
+def _index_of(values: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Index of each value in (unique) keys, or -1 if absent."""
+    if len(keys) == 0:
+        return np.full(len(values), -1)
+    sorter = np.argsort(keys)
+    ix = sorter[np.minimum(np.searchsorted(keys, values, sorter=sorter), len(keys) - 1)]
+    return np.where(keys[ix] == values, ix, -1)
+
+
+def _missing_atoms_like(
+    structure: bs.AtomArray, template_atoms: bs.AtomArray, annotations: dict
+) -> bs.AtomArray:
+    """Atoms of missing residues, with the annotation categories of structure."""
+    missing_atoms = bs.AtomArray(len(template_atoms))
+    missing_atoms.coord[:] = np.nan
+    for category in structure.get_annotation_categories():
+        dtype = structure.get_annotation(category).dtype
+        if category in annotations:
+            values = annotations[category]
+        elif category in template_atoms.get_annotation_categories():
+            values = template_atoms.get_annotation(category)
+        else:
+            values = np.zeros(len(template_atoms), dtype=dtype)
+        missing_atoms.set_annotation(category, np.asarray(values).astype(dtype))
+    return missing_atoms
 
-    missing_atoms.set_annotation(
-        "altloc_id", np.full(len(missing_atoms), ".").astype("str")
-    )
-    missing_atoms.set_annotation(
-        "auth_chain_id",
-        np.full(len(missing_atoms), chain_id).astype("str"),
-    )
-    missing_atoms.set_annotation(
-        "auth_res_id", np.full(len(missing_atoms), -1).astype(int)
-    )
-    if "occupancy" in chain_atoms._annot:
-        raise NotImplementedError("occupancy not supported yet")
-    complete_atoms = chain_atoms + missing_atoms
-    annots_to_concat = [
-        "altloc_id",
-        "auth_chain_id",
-        "auth_res_id",
-    ]
-    for annot in annots_to_concat:
-        complete_atoms.set_annotation(
-            annot,
-            np.concatenate([chain_atoms._annot[annot], missing_atoms._annot[annot]]),
-        )
 
-    residue_starts = get_residue_starts(complete_atoms)
+def _fill_missing_residues(structure: bs.AtomArray, block) -> bs.AtomArray:
+    """Add atoms (with nan coords) for residues of polymer chains missing from structure.
 
-    res_perm = np.argsort(complete_atoms.res_id[residue_starts])
-    residue_sizes = np.diff(np.append(residue_starts, len(complete_atoms)))
+    The residues of each polymer chain (an entity_id and auth chain id pair from
+    entity_poly) are read from entity_poly_seq. Templates for all missing residues
+    of all chains are expanded in a single pass, and merged with the observed
+    atoms in a single sort: non-polymer entities come first, in entity order,
+    followed by polymer chains in entity_poly order, with the residues of each
+    chain ordered by (label) res_id.
 
-    permuted_residue_starts = residue_starts[res_perm]
-    permuted_residue_sizes = residue_sizes[res_perm]
+    Relies on res_id being the canonical label_seq_id, c.f. get_pdbx_structure.
+    """
+    entity_poly = block["entity_poly"]
+    entity_poly_seq = block["entity_poly_seq"]
+    poly_entity_ids = entity_poly["entity_id"].as_array(int, -1)
+    entity_ids = block["entity"]["id"].as_array(int, -1)
+    nonpoly_entity_ids = entity_ids[~np.isin(entity_ids, poly_entity_ids)]
 
-    permuted_residue_starts_atom = np.repeat(
-        permuted_residue_starts, permuted_residue_sizes
-    )
-    post_perm_res_changes = (
-        permuted_residue_starts_atom[1:] != permuted_residue_starts_atom[:-1]
+    # polymer chains, in entity_poly order
+    strand_ids = [
+        strand_id.split(",")
+        for strand_id in entity_poly["pdbx_strand_id"].as_array(str)
+    ]
+    chain_entity_ids = np.repeat(poly_entity_ids, [len(ids) for ids in strand_ids])
+    chain_auth_ids = np.array(sum(strand_ids, []), dtype=structure.auth_chain_id.dtype)
+    num_chains = len(chain_entity_ids)
+
+    # integer (entity_id, auth chain id) keys of chains and of atoms
+    auth_ids, auth_codes = np.unique(
+        np.concatenate([chain_auth_ids, structure.auth_chain_id]), return_inverse=True
     )
-    post_perm_residue_starts = np.concatenate(
-        [[0], np.where(post_perm_res_changes)[0] + 1]
+    chain_keys = chain_entity_ids * len(auth_ids) + auth_codes[:num_chains]
+    atom_keys = structure.entity_id * len(auth_ids) + auth_codes[num_chains:]
+    atom_chain_index = _index_of(atom_keys, chain_keys)
+    poly_mask = atom_chain_index >= 0
+
+    # groups: non-polymer entities, then polymer chains; other atoms are dropped
+    atom_group = _index_of(structure.entity_id, nonpoly_entity_ids)
+    atom_group[poly_mask] = len(nonpoly_entity_ids) + atom_chain_index[poly_mask]
+
+    # residues of all polymer chains, from entity_poly_seq
+    seq_entity_ids = entity_poly_seq["entity_id"].as_array(int, -1)
+    seq_order = np.argsort(seq_entity_ids, kind="stable")
+    seq_starts = np.searchsorted(seq_entity_ids[seq_order], chain_entity_ids)
+    seq_stops = np.searchsorted(
+        seq_entity_ids[seq_order], chain_entity_ids, side="right"
     )
-    _post_perm_res_index = (
-        np.cumsum(get_residue_starts_mask(complete_atoms, post_perm_residue_starts)) - 1
+    seq_lengths = seq_stops - seq_starts
+    template_chain_index = np.repeat(np.arange(num_chains), seq_lengths)
+    # position of each template residue within its chain's entity
+    template_offset = np.arange(seq_lengths.sum()) - np.repeat(
+        np.cumsum(seq_lengths) - seq_lengths, seq_lengths
     )
+    template_seq_index = seq_order[seq_starts[template_chain_index] + template_offset]
+    template_res_ids = entity_poly_seq["num"].as_array(int, -1)[template_seq_index]
 
-    permuted_relative_atom_index = (
-        np.arange(len(complete_atoms)) - post_perm_residue_starts[_post_perm_res_index]
+    # residues which are not observed in their chain
+    max_res_id = max(template_res_ids.max(initial=0), structure.res_id.max(initial=0))
+    observed_keys = (
+        atom_chain_index[poly_mask] * (max_res_id + 1) + structure.res_id[poly_mask]
     )
+    missing_mask = ~np.isin(
+        template_chain_index * (max_res_id + 1) + template_res_ids, observed_keys
+    )
+    missing_chain_index = template_chain_index[missing_mask]
+    missing_res_names = entity_poly_seq["mon_id"].as_array(str)[
+        template_seq_index[missing_mask]
+    ]
 
-    atom_perm = permuted_residue_starts_atom + permuted_relative_atom_index
-
-    complete_atoms = complete_atoms[atom_perm]
-    return complete_atoms
-
+    # chain_id of observed atoms (label_asym_id), falling back to auth chain id
+    chain_label_ids = chain_auth_ids.astype(structure.chain_id.dtype)
+    first_atoms = np.unique(atom_chain_index[poly_mask], return_index=True)
+    chain_label_ids[first_atoms[0]] = structure.chain_id[poly_mask][first_atoms[1]]
 
-def fill_missing_polymer_residues(
-    structure, entity_poly_seq, poly_entity_ids, poly_chain_ids
-):
-    """Fill in missing residues for polymer entities."""
-    processed_chain_atoms = []
     residue_dict = ResidueDictionary.from_ccd_dict()
-    for entity_chain_ids, entity_id in zip(poly_chain_ids, poly_entity_ids):
-        poly_seq_entity_mask = (
-            entity_poly_seq["entity_id"].as_array(int, -1) == entity_id
-        )
-        if not poly_seq_entity_mask.any():
-            for chain_id in entity_chain_ids.split(","):
-                processed_chain_atoms.append(
-                    structure[structure.auth_chain_id == chain_id]
-                )
-        else:
-            complete_res_ids = entity_poly_seq["num"].as_array(int, -1)[
-                poly_seq_entity_mask
-            ]
-            entity_res_name = entity_poly_seq["mon_id"].as_array(str)[
-                poly_seq_entity_mask
-            ]
-            entity_restype_index = residue_dict.res_name_to_index(entity_res_name)
-
-            for chain_id in entity_chain_ids.split(","):
-                chain_atoms = structure[
-                    (structure.auth_chain_id == chain_id)
-                    & (structure.entity_id == entity_id)
-                ]
-                complete_atoms = fill_missing_polymer_chain_residues(
-                    chain_atoms,
-                    complete_res_ids,
-                    entity_restype_index,
-                    residue_dict,
-                    chain_id,
-                )
-                complete_atoms.set_annotation(
-                    "entity_id", np.full(len(complete_atoms), entity_id).astype(int)
-                )
-
-                processed_chain_atoms.append(complete_atoms)
-    return processed_chain_atoms
-
-
-def _fill_missing_residues(structure: bs.AtomArray, block):
-    processed_chain_atoms = []
-    entity_poly = block["entity_poly"]
-    entity_poly_seq = block["entity_poly_seq"]
-    poly_chain_ids = entity_poly["pdbx_strand_id"].as_array(str)
-    poly_entity_ids = entity_poly["entity_id"].as_array(int, -1)
-    entity_ids = block["entity"]["id"].as_array(int, -1)
-
-    nonpoly_entity_mask = ~np.isin(entity_ids, poly_entity_ids)
-    nonpoly_entity_ids = entity_ids[nonpoly_entity_mask]
-    for entity_id in nonpoly_entity_ids:
-        processed_chain_atoms.append(structure[structure.entity_id == entity_id])
-
-    processed_chain_atoms += fill_missing_polymer_residues(
-        structure, entity_poly_seq, poly_entity_ids, poly_chain_ids
+    missing_chain_starts = np.ones(len(missing_chain_index), dtype=bool)
+    missing_chain_starts[1:] = missing_chain_index[1:] != missing_chain_index[:-1]
+    template_atoms, _, _ = expand_residue_templates(
+        residue_dict.res_name_to_index(missing_res_names),
+        residue_dict,
+        chain_id=chain_label_ids[missing_chain_index],
+        chain_starts=missing_chain_starts,
+        res_id=template_res_ids[missing_mask],
+    )
+    missing_atom_chain_index = missing_chain_index[template_atoms.res_index]
+    missing_atoms = _missing_atoms_like(
+        structure,
+        template_atoms,
+        {
+            "ins_code": np.full(len(template_atoms), ""),
+            "altloc_id": np.full(len(template_atoms), "."),
+            "auth_chain_id": chain_auth_ids[missing_atom_chain_index],
+            "auth_res_id": np.full(len(template_atoms), -1),
+            "entity_id": chain_entity_ids[missing_atom_chain_index],
+        },
     )
 
-    filled_structure = sum(processed_chain_atoms, bs.AtomArray(length=0))
-    for key in structure._annot.keys():
-        if key not in filled_structure._annot:
-            filled_structure.set_annotation(
-                key,
-                np.concatenate(
-                    [chain_atoms._annot[key] for chain_atoms in processed_chain_atoms]
-                ),
-            )
-    return filled_structure
+    # single sort by group, then res_id within polymer chains, then position
+    filled_structure = structure + missing_atoms
+    group = np.concatenate(
+        [atom_group, len(nonpoly_entity_ids) + missing_atom_chain_index]
+    )
+    res_id = np.where(group >= len(nonpoly_entity_ids), filled_structure.res_id, 0)
+    order = np.lexsort((np.arange(len(filled_structure)), res_id, group))
+    return filled_structure[order[group[order] >= 0]]
 
 
 def get_pdbx_structure(
@@ -205,7 +194,7 @@ def get_pdbx_structure(
     """Modified from biotite.structure.io.pdbx.get_structure to return canonical chain_id and res_id
     and also add auth_chain_id and auth_res_id annotations.
 
-    TODO: support use_author_fields. But n.b. fill_missing_polymer_chain_residues relies
+    TODO: support use_author_fields. But n.b. _fill_missing_residues relies
     on atoms.res_id matching the canonical `label_seq_id` res_id.
     """
     extra_fields = extra_fields or (["occupancy"] if altloc == "occupancy" else [])
@@ -1,3 +1,10 @@
-__all__ = ["ProteinChain", "ProteinComplex", "ProteinMixin", "ProteinDictionary"]
+__all__ = [
+    "ProteinBatch",
+    "ProteinChain",
+    "ProteinComplex",
+    "ProteinMixin",
+    "ProteinDictionary",
+]
 
+from .batch import ProteinBatch
 from .protein import ProteinChain, ProteinComplex, ProteinDictionary, ProteinMixin
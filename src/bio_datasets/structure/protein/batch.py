@@ -0,0 +1,230 @@
+"""Batched, array-backed representation of proteins.
+
+ProteinBatch holds padded atom37 coordinates and residue-level arrays for a batch
+of proteins, so that per-protein ProteinMixin operations (backbone / beta carbon /
+atom14 / atom37 coordinates, contacts) can be applied to the whole batch at once.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from bio_datasets.collate import collate_dense_proteins
+
+from . import constants as protein_constants
+
+_GLY_INDEX = protein_constants.resname_to_idx["GLY"]
+_ATOM37_ORDER = np.argsort(protein_constants.atom_types)
+_SORTED_ATOM37_TYPES = np.array(protein_constants.atom_types)[_ATOM37_ORDER]
+
+
+def _make_atom14_to_atom37() -> Tuple[np.ndarray, np.ndarray]:
+    """Atom37 index and validity of each atom14 slot of each aatype.
+
+    Unlike RESTYPE_ATOM14_TO_ATOM37, the unknown residue type maps its backbone
+    atoms (the only atoms of UNK residue templates) in order, as for dense
+    decoding with ProteinAtomArrayFeature(load_as="atom14").
+    """
+    atom14_to_atom37 = protein_constants.RESTYPE_ATOM14_TO_ATOM37.copy()
+    atom14_mask = protein_constants.RESTYPE_ATOM14_MASK.astype(bool)
+    backbone_atom37 = [protein_constants.atom_order[at] for at in ["N", "CA", "C", "O"]]
+    atom14_to_atom37[protein_constants.unk_restype_index, :4] = backbone_atom37
+    atom14_mask[protein_constants.unk_restype_index, :4] = True
+    return atom14_to_atom37, atom14_mask
+
+
+ATOM14_TO_ATOM37, ATOM14_MASK = _make_atom14_to_atom37()
+
+
+def atom37_index_from_atom_names(atom_names: np.ndarray) -> np.ndarray:
+    """Atom37 index of each atom name (-1 for names which are not atom37 types)."""
+    position = np.searchsorted(_SORTED_ATOM37_TYPES, atom_names)
+    position = np.minimum(position, len(_SORTED_ATOM37_TYPES) - 1)
+    return np.where(
+        _SORTED_ATOM37_TYPES[position] == atom_names, _ATOM37_ORDER[position], -1
+    )
+
+
+def aatype_from_res_names(res_names: np.ndarray) -> np.ndarray:
+    """Index of each residue name in the standard (AlphaFold) residue order."""
+    unique_res_names, inverse = np.unique(res_names, return_inverse=True)
+    return np.array(
+        [
+            protein_constants.resname_to_idx.get(
+                res_name, protein_constants.unk_restype_index
+            )
+            for res_name in unique_res_names
+        ],
+        dtype=int,
+    )[inverse.reshape(-1)].reshape(np.shape(res_names))
+
+
+def beta_carbon_coords_from_atom37(
+    atom37_coords: np.ndarray, aatype: np.ndarray
+) -> np.ndarray:
+    """CB coordinates (CA for glycine), for arrays of shape (..., 37, 3) and (...)."""
+    return np.where(
+        (aatype == _GLY_INDEX)[..., None],
+        atom37_coords[..., protein_constants.atom_order["CA"], :],
+        atom37_coords[..., protein_constants.atom_order["CB"], :],
+    )
+
+
+def atom14_from_atom37(
+    atom37_coords: np.ndarray, atom37_mask: np.ndarray, aatype: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Gather (..., 14, 3) atom14 coordinates and (..., 14) mask from atom37."""
+    atom37_index = ATOM14_TO_ATOM37[aatype]
+    atom14_mask = ATOM14_MASK[aatype] & np.take_along_axis(
+        atom37_mask, atom37_index, axis=-1
+    )
+    atom14_coords = np.take_along_axis(atom37_coords, atom37_index[..., None], axis=-2)
+    atom14_coords = np.where(atom14_mask[..., None], atom14_coords, np.nan)
+    return atom14_coords.astype(np.float32), atom14_mask
+
+
+def atom37_from_atom14(
+    atom14_coords: np.ndarray, atom14_mask: np.ndarray, aatype: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Scatter (..., 14, 3) atom14 coordinates into (..., 37, 3) atom37 coordinates."""
+    atom37_coords = np.full(
+        atom14_coords.shape[:-2] + (protein_constants.atom_type_num, 3),
+        np.nan,
+        dtype=np.float32,
+    )
+    is_present = atom14_mask & ATOM14_MASK[aatype]
+    *residue_index, atom14_index = np.nonzero(is_present)
+    atom37_index = ATOM14_TO_ATOM37[aatype][is_present]
+    atom37_coords[(*residue_index, atom37_index)] = atom14_coords[is_present]
+    return atom37_coords, ~np.isnan(atom37_coords).any(axis=-1)
+
+
+def _chain_index(chain_id: np.ndarray, residue_mask: np.ndarray) -> np.ndarray:
+    chain_changes = chain_id[:, 1:] != chain_id[:, :-1]
+    chain_index = np.concatenate(
+        [np.zeros((len(chain_id), 1), dtype=int), np.cumsum(chain_changes, axis=1)],
+        axis=1,
+    )
+    return np.where(residue_mask, chain_index, -1)
+
+
+@dataclass
+class ProteinBatch:
+    """Padded, array-backed batch of proteins.
+
+    All arrays have leading (batch_size, max_num_residues) dimensions. Padding
+    residues have nan coordinates, False masks, -1 chain_index and 0 elsewhere.
+
+    Construct with `from_proteins` (from ProteinChain / ProteinComplex objects) or
+    `from_decoded` (from examples decoded by
+    `ProteinAtomArrayFeature(load_as="atom37" | "atom14")`).
+    """
+
+    coords: np.ndarray  # (B, L, 37, 3) atom37 coords, float32, nan if missing
+    atom_mask: np.ndarray  # (B, L, 37) bool
+    restype_index: np.ndarray  # (B, L) index into the residue dictionary
+    aatype: np.ndarray  # (B, L) index in the standard residue order
+    residue_mask: np.ndarray  # (B, L) bool, False for padding
+    chain_index: np.ndarray  # (B, L) index of the chain within each protein
+    res_id: np.ndarray  # (B, L)
+
+    @classmethod
+    def from_decoded(
+        cls,
+        examples: Union[List[Dict[str, np.ndarray]], Dict[str, np.ndarray]],
+        pad_to_multiple_of: Optional[int] = None,
+    ) -> "ProteinBatch":
+        """Build a batch from dense decoded examples, or an already collated batch."""
+        if isinstance(examples, dict):
+            batch = examples
+        else:
+            batch = collate_dense_proteins(
+                examples, pad_to_multiple_of=pad_to_multiple_of
+            )
+        residue_mask = batch["residue_mask"]
+        aatype = np.where(residue_mask, batch["aatype"], 0)
+        if "atom37_coords" in batch:
+            atom37_coords = batch["atom37_coords"].astype(np.float32)
+            atom37_mask = batch["atom37_mask"] & residue_mask[..., None]
+        elif "atom14_coords" in batch:
+            atom37_coords, atom37_mask = atom37_from_atom14(
+                batch["atom14_coords"],
+                batch["atom14_mask"] & residue_mask[..., None],
+                aatype,
+            )
+        else:
+            raise ValueError("Expected atom37 or atom14 coords in decoded examples")
+        return cls(
+            coords=atom37_coords,
+            atom_mask=atom37_mask,
+            restype_index=np.where(residue_mask, batch["restype_index"], 0),
+            aatype=aatype,
+            residue_mask=residue_mask,
+            chain_index=_chain_index(batch["chain_id"], residue_mask),
+            res_id=np.where(residue_mask, batch["res_id"], 0),
+        )
+
+    @classmethod
+    def from_proteins(
+        cls, proteins: Sequence, pad_to_multiple_of: Optional[int] = None
+    ) -> "ProteinBatch":
+        """Build a batch from ProteinChain / ProteinComplex objects."""
+        return cls.from_decoded(
+            [protein.to_dense() for protein in proteins],
+            pad_to_multiple_of=pad_to_multiple_of,
+        )
+
+    def __len__(self):
+        return len(self.residue_mask)
+
+    @property
+    def num_residues(self) -> np.ndarray:
+        return self.residue_mask.sum(axis=1)
+
+    @property
+    def residue_offsets(self) -> np.ndarray:
+        """Offsets of each protein's residues in the flattened (unpadded) residues."""
+        return np.concatenate([[0], np.cumsum(self.num_residues)])
+
+    def beta_carbon_coords(self) -> np.ndarray:
+        return beta_carbon_coords_from_atom37(self.coords, self.aatype)
+
+    def backbone_coords(self, atom_names: Optional[List[str]] = None) -> np.ndarray:
+        """(B, L, len(atom_names), 3) coordinates; CB is CA for glycine."""
+        if atom_names is None:
+            atom_names = ["N", "CA", "C", "O"]
+        return np.stack(
+            [
+                self.beta_carbon_coords()
+                if atom_name == "CB"
+                else self.coords[..., protein_constants.atom_order[atom_name], :]
+                for atom_name in atom_names
+            ],
+            axis=-2,
+        )
+
+    def atom37_coords(self) -> np.ndarray:
+        return self.coords
+
+    def atom14_coords(self) -> np.ndarray:
+        return self.atom14_coords_and_mask()[0]
+
+    def atom14_coords_and_mask(self) -> Tuple[np.ndarray, np.ndarray]:
+        return atom14_from_atom37(self.coords, self.atom_mask, self.aatype)
+
+    def contacts(self, atom_name: str = "CA", threshold: float = 8.0) -> np.ndarray:
+        """(B, L, L) residue contacts; False for padding or missing atoms."""
+        coords = self.backbone_coords([atom_name])[..., 0, :].astype(np.float64)
+        is_present = ~np.isnan(coords).any(axis=-1)
+        coords = np.where(is_present[..., None], coords, 0.0)
+        sq_norms = (coords**2).sum(axis=-1)
+        sq_dists = (
+            sq_norms[:, :, None]
+            + sq_norms[:, None, :]
+            - 2 * np.matmul(coords, coords.transpose(0, 2, 1))
+        )
+        return (
+            (sq_dists < threshold**2)
+            & is_present[:, :, None]
+            & is_present[:, None, :]
+        )
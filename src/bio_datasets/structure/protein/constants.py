@@ -19,8 +19,8 @@ import collections
 from typing import Mapping
 
 import numpy as np
-from biotite.structure.info.ccd import get_ccd
-from biotite.structure.io.pdbx import get_component
+
+from bio_datasets.structure.residue import get_component_atoms
 
 # Distance from one CA to next CA [trans configuration: omega = 180].
 ca_ca = 3.80209737096
@@ -493,20 +493,20 @@ resname_to_idx = {resname: i for i, resname in enumerate(resnames)}
 def get_residue_atoms_and_elements(residue_names):
     residue_atoms = {}
     residue_elements = {}
-    ccd_data = get_ccd()
     for resname in residue_names:
-        comp = get_component(ccd_data, res_name=resname)
+        atom_names, atom_elements = get_component_atoms(resname)
         if resname == "UNK":
             atoms = ["N", "CA", "C", "O"]
+            elements = ["N", "C", "C", "O"]
         else:
             atoms = [
                 at
-                for at in comp.atom_name
+                for at in atom_names
                 if at != "OXT" and not at.startswith("H") and not at.startswith("D")
             ]
             elements = [
                 elem
-                for at, elem in zip(comp.atom_name, comp.element)
+                for at, elem in zip(atom_names, atom_elements)
                 if elem != "H" and elem != "D" and at != "OXT"
             ]
             assert len(atoms) == len(elements)
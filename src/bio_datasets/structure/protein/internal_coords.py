@@ -0,0 +1,564 @@
+"""Internal coordinate (bond length / bond angle / torsion) encoding of proteins.
+
+Each atom of the standardised atoms of a protein is placed relative to three
+previously placed reference atoms (its parent, grandparent and great-grandparent
+in a spanning tree of the residue template, rooted at the backbone). Backbone
+N, CA and C atoms reference the backbone of the previous residue, so that their
+torsions are psi, omega and phi.
+
+Reconstruction (NeRF) is sequential along the backbone. To parallelise it, chains
+are split into fragments of at most `anchor_interval` residues, each starting from
+stored (anchor) cartesian coordinates of its N, CA and C atoms: all fragments in
+a batch are then extended in lockstep, and side chain atoms are placed level by
+level across all residues at once (c.f. pNeRF, AlQuraishi 2019). Anchors also
+bound the accumulation of reconstruction error to a single fragment.
+
+Present atoms which cannot be reconstructed, because a reference atom is
+missing (e.g. the side chain of a residue without a backbone N) or their
+residue is not in any fragment, have their cartesian coordinates stored instead
+(fallback atoms), so that no observed coordinates are lost.
+
+Two types are supported:
+    - pnerf: bond lengths, bond angles and torsions are stored for each atom.
+    - idealised: bond angles and torsions are stored; bond lengths are taken from
+      the ideal (CCD) geometry of each residue type. (Idealising bond angles too
+      gives ~1.5A RMSD reconstructions, vs ~0.1A with stored angles.)
+"""
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+from biotite.structure import info
+
+from . import constants as protein_constants
+
+INTERNAL_COORDS_TYPES = ["pnerf", "idealised"]
+INTERNAL_COORDS_DTYPES = ["uint16", "float16", "float32"]
+DEFAULT_ANCHOR_INTERVAL = 16
+
+# a fragment is started after a chain break (e.g. missing residues)
+MAX_PEPTIDE_BOND_LENGTH = 2.0
+
+# uint16 discretisation: 65535 is reserved for missing values.
+_UINT16_MISSING = np.iinfo(np.uint16).max
+_UINT16_LEVELS = _UINT16_MISSING - 1
+_BOND_LENGTH_RESOLUTION = 1e-4  # angstroms, i.e. lengths up to ~6.55 angstroms
+
+_BACKBONE_CHAIN_ATOMS = ["N", "CA", "C"]
+# (template positions of reference atoms, whether each is in the previous residue)
+# of N, CA and C, which are the first three atoms of each residue template.
+_BACKBONE_REFERENCES = {
+    "N": ([2, 1, 0], [True, True, True]),
+    "CA": ([0, 2, 1], [False, True, True]),
+    "C": ([1, 0, 2], [False, False, True]),
+}
+
+
+@dataclass
+class InternalCoordsTemplates:
+    """Reference atoms and ideal bond length of each atom of each residue type.
+
+    Arrays have shape (num_residue_types, max_residue_size + 1, ...), with the
+    same layout as ProteinDictionary.atom37_index_by_residue: the position after
+    the last atom of each residue holds OXT. Reference positions of the backbone
+    N, CA and C atoms, which reference the previous residue, are not included.
+    """
+
+    reference_position: np.ndarray  # (T, S, 3) template position of reference atoms
+    level: np.ndarray  # (T, S) 0 for N, CA, C; else placement order of side chain atoms
+    ideal_bond_length: np.ndarray  # (T, S)
+
+
+def _bond_angle(a, b, c):
+    ba, bc = a - b, c - b
+    cos_angle = (ba * bc).sum(-1) / (
+        np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1)
+    )
+    return np.arccos(np.clip(cos_angle, -1.0, 1.0))
+
+
+def _torsion(a, b, c, d):
+    b0, b1, b2 = a - b, c - b, d - c
+    b1 = b1 / np.linalg.norm(b1, axis=-1, keepdims=True)
+    v = b0 - (b0 * b1).sum(-1, keepdims=True) * b1
+    w = b2 - (b2 * b1).sum(-1, keepdims=True) * b1
+    x = (v * w).sum(-1)
+    y = (np.cross(b1, v) * w).sum(-1)
+    return np.arctan2(y, x)
+
+
+def _residue_references(res_name: str, residue_atoms):
+    """Reference atom names of each (non backbone N/CA/C) atom of a residue template.
+
+    References are the ancestors of each atom in a breadth-first spanning tree of
+    the residue's bond graph, rooted at N -> CA -> C; N is not expanded, so that
+    e.g. proline CD is placed from CG. References are completed with backbone
+    atoms when an atom has fewer than three ancestors.
+    """
+    bonds = info.bonds_in_residue(res_name)
+    neighbours = {atom_name: [] for atom_name in residue_atoms}
+    for atom_1, atom_2 in bonds:
+        if atom_1 in neighbours and atom_2 in neighbours:
+            neighbours[atom_1].append(atom_2)
+            neighbours[atom_2].append(atom_1)
+    parent = {"N": None, "CA": "N", "C": "CA"}
+    queue = ["CA", "C"]
+    while queue:
+        atom_name = queue.pop(0)
+        for neighbour in neighbours[atom_name]:
+            if neighbour not in parent:
+                parent[neighbour] = atom_name
+                queue.append(neighbour)
+    for atom_name in residue_atoms:
+        if atom_name not in parent:
+            # e.g. atoms only bonded to N
+            parent[atom_name] = "N" if "N" in neighbours[atom_name] else "CA"
+    references = {}
+    for atom_name in residue_atoms:
+        if atom_name in _BACKBONE_CHAIN_ATOMS:
+            continue
+        ancestors = [parent[atom_name]]
+        while parent[ancestors[-1]] is not None and len(ancestors) < 3:
+            ancestors.append(parent[ancestors[-1]])
+        ancestors += [at for at in _BACKBONE_CHAIN_ATOMS if at not in ancestors]
+        references[atom_name] = ancestors[:3]
+    return references
+
+
+def build_internal_coords_templates(residue_dictionary) -> InternalCoordsTemplates:
+    """Build reference atoms and ideal bond lengths from CCD bonds and ideal coordinates."""
+    num_slots = residue_dictionary.max_residue_size + 1
+    shape = (len(residue_dictionary.residue_names), num_slots)
+    reference_position = np.full(shape + (3,), -1, dtype=np.int64)
+    level = np.zeros(shape, dtype=np.int8)
+    ideal_bond_length = np.full(shape, np.nan, dtype=np.float32)
+    peptide_bond_length = protein_constants.between_res_bond_length_c_n[0]
+
+    for ix, res_name in enumerate(residue_dictionary.residue_names):
+        residue_atoms = list(residue_dictionary.residue_atoms[res_name])
+        if residue_atoms[:3] != _BACKBONE_CHAIN_ATOMS:
+            raise ValueError(
+                f"Internal coords require residue templates to start with N, CA, C; got {res_name}: {residue_atoms}"
+            )
+        ideal_atoms = info.residue(res_name)
+        ideal_coords = dict(zip(ideal_atoms.atom_name, ideal_atoms.coord))
+        references = _residue_references(res_name, residue_atoms)
+        references["OXT"] = ["C", "CA", "N"]
+        positions = {atom_name: pos for pos, atom_name in enumerate(residue_atoms)}
+        positions["OXT"] = len(residue_atoms)
+
+        ideal_bond_length[ix, 0] = peptide_bond_length
+        ideal_bond_length[ix, 1] = np.linalg.norm(
+            ideal_coords["CA"] - ideal_coords["N"]
+        )
+        ideal_bond_length[ix, 2] = np.linalg.norm(
+            ideal_coords["C"] - ideal_coords["CA"]
+        )
+
+        atom_levels = {atom_name: 0 for atom_name in _BACKBONE_CHAIN_ATOMS}
+
+        def atom_level(atom_name):
+            if atom_name not in atom_levels:
+                atom_levels[atom_name] = atom_level(references[atom_name][0]) + 1
+            return atom_levels[atom_name]
+
+        for atom_name, ref_names in references.items():
+            pos = positions[atom_name]
+            reference_position[ix, pos] = [positions[ref] for ref in ref_names]
+            level[ix, pos] = atom_level(atom_name)
+            if atom_name in ideal_coords:
+                ideal_bond_length[ix, pos] = np.linalg.norm(
+                    ideal_coords[atom_name] - ideal_coords[ref_names[0]]
+                )
+
+    return InternalCoordsTemplates(
+        reference_position=reference_position,
+        level=level,
+        ideal_bond_length=ideal_bond_length,
+    )
+
+
+@dataclass
+class AtomLayout:
+    """Per-atom reference indices of standardised atoms, computed from residue types."""
+
+    residue_starts: np.ndarray  # (num_residues,) index of the first atom of each residue
+    template_slot: np.ndarray  # (num_atoms,) flat index into (T, S) template arrays
+    references: np.ndarray  # (num_atoms, 3) reference atom indices; -1 if unavailable
+    level: np.ndarray  # (num_atoms,)
+
+    @property
+    def num_atoms(self) -> int:
+        return len(self.template_slot)
+
+    @classmethod
+    def from_residues(
+        cls,
+        restype_index: np.ndarray,
+        chain_starts: np.ndarray,
+        residue_dictionary,
+    ) -> "AtomLayout":
+        """Layout of the standardised atoms of residues (all_atoms_present).
+
+        Args:
+            restype_index (np.ndarray): (num_residues,) residue types.
+            chain_starts (np.ndarray): (num_residues,) True for the first residue
+                of each chain (and of each example in a batch).
+            residue_dictionary (ProteinDictionary): Dictionary defining templates.
+        """
+        templates = residue_dictionary.internal_coords_templates()
+        num_slots = templates.level.shape[1]
+        restype_index = np.asarray(restype_index, dtype=np.int64)
+        residue_sizes = residue_dictionary.get_residue_sizes(
+            restype_index, np.cumsum(chain_starts)
+        )
+        residue_starts = np.cumsum(residue_sizes) - residue_sizes
+        atom_residue_start = np.repeat(residue_starts, residue_sizes)
+        template_position = np.arange(len(atom_residue_start)) - atom_residue_start
+        template_slot = (
+            np.repeat(restype_index * num_slots, residue_sizes) + template_position
+        )
+        # side chain atoms (and OXT) reference atoms within the same residue
+        references = atom_residue_start[:, None] + np.take(
+            templates.reference_position.reshape(-1, 3), template_slot, axis=0
+        )
+        previous_starts = np.concatenate([[-1], residue_starts[:-1]])
+        for atom_offset, (ref_positions, in_previous) in enumerate(
+            _BACKBONE_REFERENCES.values()
+        ):
+            backbone_references = (
+                np.where(in_previous, previous_starts[:, None], residue_starts[:, None])
+                + ref_positions
+            )
+            backbone_references[chain_starts[:, None] & in_previous] = -1
+            references[residue_starts + atom_offset] = backbone_references
+        return cls(
+            residue_starts=residue_starts,
+            template_slot=template_slot,
+            references=references,
+            level=np.take(templates.level, template_slot),
+        )
+
+
+def internal_coords_from_cartesian(coords: np.ndarray, references: np.ndarray):
+    """Bond length, bond angle and torsion of each atom w.r.t. its reference atoms.
+
+    Returns float32 arrays, nan where the atom or any reference atom is missing.
+    """
+    coords = coords.astype(np.float64)
+    padded = np.concatenate([coords, np.full((1, 3), np.nan)])
+    # index -1 selects the nan padding row
+    c, b, a = (padded[references[:, ix]] for ix in range(3))
+    bond_length = np.linalg.norm(coords - c, axis=-1)
+    bond_angle = _bond_angle(coords, c, b)
+    torsion = _torsion(a, b, c, coords)
+    return (
+        bond_length.astype(np.float32),
+        bond_angle.astype(np.float32),
+        torsion.astype(np.float32),
+    )
+
+
+def _local_offsets(bond_length, bond_angle, torsion) -> np.ndarray:
+    """(3, n) position of each atom in the frame of its reference atoms."""
+    radius = bond_length * np.sin(bond_angle)
+    return np.stack(
+        [
+            -bond_length * np.cos(bond_angle),
+            radius * np.cos(torsion),
+            radius * np.sin(torsion),
+        ]
+    )
+
+
+def _normalise(v):
+    return v / np.sqrt(v[0] ** 2 + v[1] ** 2 + v[2] ** 2)
+
+
+def _cross(u, v):
+    return np.stack(
+        [
+            u[1] * v[2] - u[2] * v[1],
+            u[2] * v[0] - u[0] * v[2],
+            u[0] * v[1] - u[1] * v[0],
+        ]
+    )
+
+
+def place_atoms(a, b, c, local_offsets):
+    """Place atoms given reference atoms a, b, c and their local offsets (NeRF).
+
+    All arrays have shape (3, n): coordinates are the leading dimension so that
+    each component is a contiguous row. Offsets are as computed from the bond
+    length |cd|, bond angle bcd and torsion abcd of each atom d.
+    """
+    bc = _normalise(c - b)
+    n = _normalise(_cross(b - a, bc))
+    m = _cross(n, bc)
+    return c + local_offsets[0] * bc + local_offsets[1] * m + local_offsets[2] * n
+
+
+def fragment_starts(
+    coords: np.ndarray,
+    layout: AtomLayout,
+    chain_starts: np.ndarray,
+    anchor_interval: int,
+) -> np.ndarray:
+    """Residues at which reconstruction restarts from stored anchor coordinates.
+
+    A fragment starts at each residue with a complete N/CA/C backbone which is the
+    first residue of a chain, follows a residue with an incomplete backbone or a
+    chain break, or is `anchor_interval` residues into a run of such residues.
+    """
+    backbone = coords[layout.residue_starts[:, None] + np.arange(3)]  # (L, 3, 3)
+    is_complete = ~np.isnan(backbone).any(axis=(-1, -2))
+    peptide_bond_length = np.linalg.norm(backbone[1:, 0] - backbone[:-1, 2], axis=-1)
+    run_starts = chain_starts.copy()
+    run_starts[1:] |= ~is_complete[:-1] | ~(
+        peptide_bond_length <= MAX_PEPTIDE_BOND_LENGTH
+    )
+    run_start_index = np.maximum.accumulate(
+        np.where(run_starts, np.arange(len(run_starts)), 0)
+    )
+    position_in_run = np.arange(len(run_starts)) - run_start_index
+    return np.flatnonzero(is_complete & (position_in_run % anchor_interval == 0))
+
+
+def _anchor_atoms(layout: AtomLayout, starts: np.ndarray) -> np.ndarray:
+    """Indices of the N, CA, C atoms of each fragment start residue."""
+    return (layout.residue_starts[starts][:, None] + np.arange(3)).reshape(-1)
+
+
+def _placement_steps(
+    layout: AtomLayout, starts: np.ndarray, chain_starts: np.ndarray
+) -> List[np.ndarray]:
+    """Atom indices placed at each (parallel) reconstruction step, in order.
+
+    The N, CA, C atoms of residues at each position within their fragments,
+    then side chain atoms by level. Backbone atoms of fragment starts (anchors)
+    and of residues outside any fragment are not placed.
+    """
+    num_residues = len(layout.residue_starts)
+    # each residue belongs to the fragment of the last preceding start in its chain
+    is_start = np.zeros(num_residues, dtype=bool)
+    is_start[starts] = True
+    chain_index = np.cumsum(chain_starts)
+    last_start = np.maximum.accumulate(np.where(is_start, np.arange(num_residues), -1))
+    in_fragment = (last_start >= 0) & (
+        chain_index == chain_index[np.maximum(last_start, 0)]
+    )
+    position_in_fragment = np.where(
+        in_fragment, np.arange(num_residues) - last_start, 0
+    )
+    # (Stable argsorts of small integer types use radix sort.)
+    if position_in_fragment.max(initial=0) <= np.iinfo(np.uint16).max:
+        position_in_fragment = position_in_fragment.astype(np.uint16)
+    residues_by_position = np.argsort(position_in_fragment, kind="stable")
+    position_bounds = np.searchsorted(
+        position_in_fragment[residues_by_position],
+        np.arange(1, int(position_in_fragment.max(initial=0)) + 2),
+    )
+    steps = []
+    for start, end in zip(position_bounds[:-1], position_bounds[1:]):
+        residue_starts = layout.residue_starts[residues_by_position[start:end]]
+        steps += [residue_starts + atom_offset for atom_offset in range(3)]
+    side_chain_atoms = np.flatnonzero(layout.level > 0)
+    side_chain_atoms = side_chain_atoms[
+        np.argsort(layout.level[side_chain_atoms], kind="stable")
+    ]
+    level_bounds = np.searchsorted(
+        layout.level[side_chain_atoms], np.arange(1, layout.level.max(initial=0) + 2)
+    )
+    steps += np.split(side_chain_atoms, level_bounds[1:-1])
+    return steps
+
+
+def _fallback_atoms(
+    is_present: np.ndarray,
+    is_defined: np.ndarray,
+    layout: AtomLayout,
+    anchor_atoms: np.ndarray,
+    steps: List[np.ndarray],
+) -> np.ndarray:
+    """Present atoms which cannot be placed from anchors and internal coords.
+
+    Follows the placement order of decode_internal_coords: an atom is placed if
+    its internal coords are defined and its reference atoms are placed or stored
+    (anchor or fallback atoms); otherwise, if present, it is a fallback atom.
+    """
+    in_steps = np.zeros(len(is_present), dtype=bool)
+    for step in steps:
+        in_steps[step] = True
+    is_fallback = is_present & ~in_steps
+    is_fallback[anchor_atoms] = False
+    # known coords after each step, with a final False entry for -1 references
+    is_known = np.append(is_present & ~in_steps, False)
+    for step in steps:
+        is_placed = is_defined[step] & is_known[layout.references[step]].all(axis=-1)
+        is_fallback[step] = is_present[step] & ~is_placed
+        is_known[step] = is_present[step]
+    return np.flatnonzero(is_fallback)
+
+
+def encode_internal_coords(
+    coords: np.ndarray,
+    layout: AtomLayout,
+    chain_starts: np.ndarray,
+    internal_coords_type: str = "pnerf",
+    anchor_interval: int = DEFAULT_ANCHOR_INTERVAL,
+) -> Dict[str, np.ndarray]:
+    """Encode the coordinates of standardised atoms as anchors and internal coords.
+
+    Returns a dict with `anchor_coords` ((num_fragments * 3, 3) N, CA, C coords of
+    the first residue of each fragment), `fragment_starts` (residue indices),
+    `fallback_atoms` (atom indices) and their `fallback_coords`, and per-atom
+    `torsions` and `bond_angles` (and `bond_lengths` for pnerf), in radians and
+    angstroms.
+    """
+    if internal_coords_type not in INTERNAL_COORDS_TYPES:
+        raise ValueError(
+            f"Unsupported internal_coords_type: {internal_coords_type}. "
+            f"Expected one of {INTERNAL_COORDS_TYPES}"
+        )
+    if anchor_interval < 1:
+        raise ValueError(f"anchor_interval must be positive, got {anchor_interval}")
+    starts = fragment_starts(coords, layout, chain_starts, anchor_interval)
+    bond_length, bond_angle, torsion = internal_coords_from_cartesian(
+        coords, layout.references
+    )
+    anchor_atoms = _anchor_atoms(layout, starts)
+    is_defined = ~np.isnan(torsion) & ~np.isnan(bond_angle)
+    if internal_coords_type == "pnerf":
+        is_defined &= ~np.isnan(bond_length)
+    fallback_atoms = _fallback_atoms(
+        ~np.isnan(coords).any(axis=-1),
+        is_defined,
+        layout,
+        anchor_atoms,
+        _placement_steps(layout, starts, chain_starts),
+    )
+    encoded = {
+        "anchor_coords": coords[anchor_atoms].astype(np.float32),
+        "fragment_starts": starts,
+        "fallback_atoms": fallback_atoms,
+        "fallback_coords": coords[fallback_atoms].astype(np.float32),
+        "torsions": torsion,
+        "bond_angles": bond_angle,
+    }
+    if internal_coords_type == "pnerf":
+        encoded["bond_lengths"] = bond_length
+    return encoded
+
+
+def decode_internal_coords(
+    internal_coords: Dict[str, np.ndarray],
+    layout: AtomLayout,
+    chain_starts: np.ndarray,
+    residue_dictionary,
+) -> np.ndarray:
+    """Reconstruct (num_atoms, 3) float32 coordinates from internal coords.
+
+    Fragments are extended one residue at a time in parallel, then side chain
+    atoms are placed one level at a time. Fallback atoms are set from their
+    stored coordinates; other atoms which are missing, or whose reference atoms
+    are missing, have nan coordinates. `fragment_starts` and `fallback_atoms` are
+    residue and atom indices into the (possibly batched) residues of the layout.
+    """
+    num_atoms = layout.num_atoms
+    torsion = internal_coords["torsions"].astype(np.float32)
+    bond_angle = internal_coords["bond_angles"].astype(np.float32)
+    if "bond_lengths" in internal_coords:
+        bond_length = internal_coords["bond_lengths"].astype(np.float32)
+    else:
+        templates = residue_dictionary.internal_coords_templates()
+        bond_length = np.take(templates.ideal_bond_length, layout.template_slot)
+
+    local_offsets = _local_offsets(bond_length, bond_angle, torsion)
+    # (3, num_atoms + 1) coords with an extra nan column, so that missing (-1)
+    # references produce nan coords
+    coords = np.full((3, num_atoms + 1), np.nan, dtype=np.float32)
+    starts = np.asarray(internal_coords["fragment_starts"], dtype=np.int64)
+    coords[:, _anchor_atoms(layout, starts)] = np.asarray(
+        internal_coords["anchor_coords"]
+    ).T
+    steps = _placement_steps(layout, starts, chain_starts)
+    fallback_atoms = np.asarray(
+        internal_coords.get("fallback_atoms", np.zeros(0)), dtype=np.int64
+    )
+    if len(fallback_atoms) > 0:
+        coords[:, fallback_atoms] = np.asarray(internal_coords["fallback_coords"]).T
+        is_fallback = np.zeros(num_atoms, dtype=bool)
+        is_fallback[fallback_atoms] = True
+        steps = [step[~is_fallback[step]] for step in steps]
+    order = np.concatenate(steps) if steps else np.zeros(0, dtype=np.int64)
+    step_bounds = np.cumsum([0] + [len(step) for step in steps])
+    # gathering in placement order makes each step's inputs contiguous slices;
+    # np.take is substantially faster than fancy indexing along axis 1.
+    references = np.ascontiguousarray(np.take(layout.references, order, axis=0).T)
+    local_offsets = np.take(local_offsets, order, axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for start, end in zip(step_bounds[:-1], step_bounds[1:]):
+            placed = place_atoms(
+                *(
+                    np.take(coords, references[ix, start:end], axis=1)
+                    for ix in [2, 1, 0]
+                ),
+                local_offsets[:, start:end],
+            )
+            for dim in range(3):
+                coords[dim, order[start:end]] = placed[dim]
+    return np.ascontiguousarray(coords[:, :-1].T)
+
+
+def discretise_internal_coords(
+    internal_coords: Dict[str, np.ndarray], dtype: str = "uint16"
+) -> Dict[str, np.ndarray]:
+    """Cast internal coords to a storage dtype, discretising to uint16 if requested.
+
+    uint16 resolution is ~1e-4 radians for angles and 1e-4 angstroms for bond
+    lengths; missing values are stored as 65535.
+    """
+    discretised = dict(internal_coords)
+    for key in ["torsions", "bond_angles", "bond_lengths"]:
+        if key not in internal_coords:
+            continue
+        values = internal_coords[key]
+        if dtype != "uint16":
+            discretised[key] = values.astype(dtype)
+            continue
+        if key == "torsions":
+            scaled = np.round((values + np.pi) / (2 * np.pi) * _UINT16_LEVELS)
+            scaled = scaled % _UINT16_LEVELS
+        elif key == "bond_angles":
+            scaled = np.round(values / np.pi * _UINT16_LEVELS)
+        else:
+            scaled = np.round(values / _BOND_LENGTH_RESOLUTION)
+        scaled = np.clip(scaled, 0, _UINT16_LEVELS)
+        discretised[key] = np.where(np.isnan(values), _UINT16_MISSING, scaled).astype(
+            np.uint16
+        )
+    return discretised
+
+
+def undiscretise_internal_coords(
+    internal_coords: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """Inverse of discretise_internal_coords: float64 radians / angstroms."""
+    values = dict(internal_coords)
+    for key in ["torsions", "bond_angles", "bond_lengths"]:
+        if key not in internal_coords:
+            continue
+        stored = np.asarray(internal_coords[key])
+        if stored.dtype != np.uint16:
+            values[key] = stored.astype(np.float64)
+            continue
+        scaled = stored.astype(np.float64)
+        if key == "torsions":
+            value = scaled / _UINT16_LEVELS * (2 * np.pi) - np.pi
+        elif key == "bond_angles":
+            value = scaled / _UINT16_LEVELS * np.pi
+        else:
+            value = scaled * _BOND_LENGTH_RESOLUTION
+        values[key] = np.where(stored == _UINT16_MISSING, np.nan, value)
+    return values
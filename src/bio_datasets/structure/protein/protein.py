@@ -7,20 +7,23 @@ including coordinates and distances.
 """
 import copy
 from dataclasses import dataclass
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 import biotite.structure as bs
 import numpy as np
 
 from bio_datasets.structure.biomolecule import BaseBiomoleculeComplex, BiomoleculeChain
 from bio_datasets.structure.protein import constants as protein_constants
-from bio_datasets.structure.residue import (
-    ResidueDictionary,
-    get_all_residue_names,
-    register_preset_res_dict,
-)
+from bio_datasets.structure.residue import ResidueDictionary, register_preset_res_dict
 
-from .constants import RESTYPE_ATOM37_TO_ATOM14, atom_types
+from .batch import (
+    aatype_from_res_names,
+    atom14_from_atom37,
+    atom37_index_from_atom_names,
+    beta_carbon_coords_from_atom37,
+)
+from .constants import RESTYPE_ATOM37_TO_ATOM14
+from .internal_coords import InternalCoordsTemplates, build_internal_coords_templates
 
 # TODO: RESTYPE ATOM37 TO ATOM14 can be derived from ResidueDictionary (atom14_coords)
 
@@ -50,7 +53,7 @@ register_preset_res_dict(
 
 register_preset_res_dict(
     "protein_all",
-    residue_names=get_all_residue_names("protein"),
+    category="protein",
     backbone_atoms=["N", "CA", "C", "O"],
     unknown_residue_name="UNK",
 )
@@ -79,8 +82,18 @@ class ProteinDictionary(ResidueDictionary):
     def __post_init__(self):
         self._atom37_compatible = self._check_atom37_compatible()
         self._atom14_compatible = self._check_atom14_compatible()
+        self._atom37_index_by_residue = None
+        self._atom14_index_by_residue = None
+        self._internal_coords_templates = None
         return super().__post_init__()
 
+    def _prebuild(self):
+        super()._prebuild()
+        if self.atom37_compatible:
+            self.atom37_index_by_residue()
+            if self.atom14_compatible:
+                self.atom14_index_by_residue()
+
     @property
     def atom37_compatible(self):
         return self._atom37_compatible
@@ -89,13 +102,88 @@ class ProteinDictionary(ResidueDictionary):
     def atom14_compatible(self):
         return self._atom14_compatible
 
+    @property
+    def aatype_by_residue(self) -> np.ndarray:
+        """Index of each residue type in the standard (AlphaFold) residue order.
+
+        Residues outside the 20 standard amino acids are mapped to the unknown index.
+        """
+        return np.array(
+            [
+                protein_constants.resname_to_idx.get(
+                    res_name, protein_constants.unk_restype_index
+                )
+                for res_name in self.residue_names
+            ]
+        )
+
+    def atom37_index_by_residue(self) -> np.ndarray:
+        """Atom37 index of each atom in the standardised atoms of each residue type.
+
+        Shape (num_residue_types x max_atoms_per_residue + 1): the extra final
+        position (i.e. the position after the last atom of any residue) holds OXT,
+        which is placed after the standard atoms of the final residue of a chain
+        when keep_oxt is True. Padding is -1.
+        """
+        assert (
+            self.atom37_compatible
+        ), "Atom37 representation assumes use of standard amino acid dictionary"
+        if self._atom37_index_by_residue is None:
+            atom37_index = np.full(
+                (len(self.residue_names), self.max_residue_size + 1), -1, dtype=int
+            )
+            for ix, res_name in enumerate(self.residue_names):
+                residue_atoms = self.residue_atoms[res_name]
+                atom37_index[ix, : len(residue_atoms)] = [
+                    protein_constants.atom_order[atom_name]
+                    for atom_name in residue_atoms
+                ]
+                atom37_index[ix, len(residue_atoms)] = protein_constants.atom_order[
+                    "OXT"
+                ]
+            self._atom37_index_by_residue = atom37_index
+        return self._atom37_index_by_residue
+
+    def atom14_index_by_residue(self) -> np.ndarray:
+        """Atom14 index of each atom in the standardised atoms of each residue type.
+
+        Layout as for `atom37_index_by_residue`. OXT has no atom14 position, so is -1.
+        """
+        assert (  # noqa: PT018
+            self.atom14_compatible and self.atom37_compatible
+        ), "Atom14 representation assumes use of standard amino acid dictionary"
+        if self._atom14_index_by_residue is None:
+            atom37_index = self.atom37_index_by_residue()
+            atom14_index = np.full_like(atom37_index, -1)
+            for ix, res_name in enumerate(self.residue_names):
+                num_atoms = len(self.residue_atoms[res_name])
+                if (
+                    res_name in protein_constants.resname_to_idx
+                    and res_name != protein_constants.unk_restype
+                ):
+                    atom14_index[ix, :num_atoms] = RESTYPE_ATOM37_TO_ATOM14[
+                        protein_constants.resname_to_idx[res_name],
+                        atom37_index[ix, :num_atoms],
+                    ]
+                else:
+                    # no atom14 mapping for unknown residues: keep atom order
+                    atom14_index[ix, :num_atoms] = np.arange(num_atoms)
+            self._atom14_index_by_residue = atom14_index
+        return self._atom14_index_by_residue
+
+    def internal_coords_templates(self) -> InternalCoordsTemplates:
+        """Reference atoms and ideal geometry used for internal coordinate encoding."""
+        if self._internal_coords_templates is None:
+            self._internal_coords_templates = build_internal_coords_templates(self)
+        return self._internal_coords_templates
+
     def get_residue_sizes(self, restype_index, chain_id: Union[str, np.ndarray]):
-        # should only be called with single chain
-        if isinstance(chain_id, np.ndarray):
-            assert len(np.unique(chain_id)) == 1
-        residue_sizes = self.residue_sizes[restype_index].copy()
-        if self.keep_oxt:
-            residue_sizes[-1] += 1  # add oxt
+        residue_sizes = self.residue_sizes[restype_index]
+        if self.keep_oxt and len(residue_sizes) > 0:
+            # add oxt to the final residue of each chain
+            residue_sizes[-1] += 1
+            if isinstance(chain_id, np.ndarray):
+                residue_sizes[:-1][chain_id[1:] != chain_id[:-1]] += 1
         return residue_sizes
 
     def get_expected_relative_atom_indices(self, restype_index, atomtype_index):
@@ -118,33 +206,42 @@ class ProteinDictionary(ResidueDictionary):
         relative_atom_index: np.ndarray,
         chain_id: np.ndarray,
     ):
-        assert len(np.unique(chain_id)) == 1
-        final_residue_mask = restype_index == restype_index[-1]
-        oxt_mask = final_residue_mask & (
-            relative_atom_index == self.residue_sizes[restype_index]
+        # oxt is the only atom beyond the standard atoms of a residue
+        oxt_mask = relative_atom_index == self.residue_sizes[restype_index]
+        atom_names = np.full((len(restype_index)), "OXT", dtype="U6")
+        atom_names[~oxt_mask] = super().get_atom_names(
+            restype_index[~oxt_mask], relative_atom_index[~oxt_mask], chain_id
         )
-        atom_names = np.full((len(restype_index)), "", dtype="U6")
-        atom_names[~oxt_mask] = self.standard_atoms_by_residue()[
-            restype_index[~oxt_mask],
-            relative_atom_index[~oxt_mask],
-        ]
-        atom_names[oxt_mask] = "OXT"
         return atom_names
 
     def get_elements(self, restype_index, relative_atom_index, chain_id):
-        assert len(np.unique(chain_id)) == 1
-        final_residue_mask = restype_index == restype_index[-1]
-        oxt_mask = final_residue_mask & (
-            relative_atom_index == self.residue_sizes[restype_index]
+        oxt_mask = relative_atom_index == self.residue_sizes[restype_index]
+        elements = np.full((len(restype_index)), "O", dtype="U6")
+        elements[~oxt_mask] = super().get_elements(
+            restype_index[~oxt_mask], relative_atom_index[~oxt_mask], chain_id
         )
-        elements = np.full((len(restype_index)), "", dtype="U6")
-        elements[~oxt_mask] = self.standard_elements_by_residue()[
-            restype_index[~oxt_mask],
-            relative_atom_index[~oxt_mask],
-        ]
-        elements[oxt_mask] = "O"
         return elements
 
+    def get_elemtype_index(self, restype_index, relative_atom_index, chain_id):
+        oxt_mask = relative_atom_index == self.residue_sizes[restype_index]
+        elemtype_index = np.full(
+            (len(restype_index)), self.element_types.index("O"), dtype=int
+        )
+        elemtype_index[~oxt_mask] = super().get_elemtype_index(
+            restype_index[~oxt_mask], relative_atom_index[~oxt_mask], chain_id
+        )
+        return elemtype_index
+
+    def get_atomtype_index(self, restype_index, relative_atom_index, chain_id):
+        oxt_mask = relative_atom_index == self.residue_sizes[restype_index]
+        atomtype_index = np.full(
+            (len(restype_index)), self.atom_types.index("OXT"), dtype=int
+        )
+        atomtype_index[~oxt_mask] = super().get_atomtype_index(
+            restype_index[~oxt_mask], relative_atom_index[~oxt_mask], chain_id
+        )
+        return atomtype_index
+
 
 def filter_backbone(array, residue_dictionary):
     """
@@ -181,24 +278,23 @@ def set_annotation_at_masked_atoms(
         getattr(atoms, annot_name)[atoms.mask] = new_annot[atoms.mask]
 
 
-# TODO: add support for batched application of these functions (i.e. to multiple proteins at once)
 class ProteinMixin:
+    """Protein-specific methods. See ProteinBatch for batched versions."""
+
     def to_complex(self):
         return ProteinComplex.from_atoms(self.atoms)
 
+    def aatype(self) -> np.ndarray:
+        """Index of each residue in the standard (AlphaFold) residue order."""
+        return aatype_from_res_names(self.atoms.res_name[self._residue_starts])
+
     def beta_carbon_coords(self) -> np.ndarray:
-        # TODO: check for nan cb or missing cb
-        has_beta_carbon = self.atoms.res_name != "GLY"
-        beta_carbon_coords = np.zeros((self.num_residues, 3), dtype=np.float32)
-        beta_carbon_coords[has_beta_carbon[self._residue_starts]] = self.atoms.coord[
-            self._residue_starts[has_beta_carbon] + 4
-        ]
-        beta_carbon_coords[~has_beta_carbon[self._residue_starts]] = self.atoms.coord[
-            self._residue_starts[~has_beta_carbon] + 1
-        ]  # ca for gly
-        return beta_carbon_coords
+        """CB coordinates of each residue (CA for glycine); nan if missing."""
+        return beta_carbon_coords_from_atom37(self.atom37_coords(), self.aatype())
 
     def backbone_coords(self, atom_names: Optional[List[str]] = None) -> np.ndarray:
+        if atom_names is None:
+            atom_names = self.residue_dictionary.backbone_atoms
         assert all(
             atom in self.residue_dictionary.backbone_atoms + ["CB"]
             for atom in atom_names
@@ -216,31 +312,51 @@ class ProteinMixin:
         return coords
 
     def contacts(self, atom_name: str = "CA", threshold: float = 8.0) -> np.ndarray:
-        return super().contacts(atom_name=atom_name, threshold=threshold)
+        return self.residue_contacts(atom_names=atom_name, threshold=threshold)
 
     def atom14_coords(self) -> np.ndarray:
-        assert (  # noqa: PT018
-            self.residue_dictionary.atom14_compatible
-            and self.residue_dictionary.atom37_compatible
-        ), "Atom14 representation assumes use of standard amino acid dictionary"
-        atom14_coords = np.full((len(self.num_residues), 14, 3), np.nan)
-        atom14_index = RESTYPE_ATOM37_TO_ATOM14[
-            self.atoms.residue_index, self.atoms.atom37_index
-        ]
-        atom14_coords[self.atoms.residue_index, atom14_index] = self.atoms.coord
-        return atom14_coords
+        return atom14_from_atom37(
+            self.atom37_coords(), self.atom37_mask(), self.aatype()
+        )[0]
 
     def atom37_coords(self) -> np.ndarray:
-        assert (
-            self.residue_dictionary.atom37_compatible
-        ), "Atom37 representation assumes use of standard amino acid dictionary"
-        # since we have standardised the atoms we can just return standardised atom37 indices for each residue
-        atom37_coords = np.full((len(self.num_residues), len(atom_types), 3), np.nan)
+        """(num_residues, 37, 3) coordinates; nan for missing atoms."""
+        # non-atom37 atom names (e.g. in non-standard residues) are dropped
+        atom37_index = atom37_index_from_atom_names(self.atoms.atom_name)
+        atom_mask = self._present_atom_mask() & (atom37_index >= 0)
+        atom37_coords = np.full(
+            (self.num_residues, protein_constants.atom_type_num, 3),
+            np.nan,
+            dtype=np.float32,
+        )
         atom37_coords[
-            self.atoms.residue_index, self.atoms.atom37_index
-        ] = self.atoms.coord
+            self._atom_residue_index()[atom_mask], atom37_index[atom_mask]
+        ] = self.atoms.coord[atom_mask]
         return atom37_coords
 
+    def atom37_mask(self) -> np.ndarray:
+        return ~np.isnan(self.atom37_coords()).any(axis=-1)
+
+    def to_dense(self) -> Dict[str, np.ndarray]:
+        """Residue-level arrays, in the format of `ProteinAtomArrayFeature(load_as="atom37")`."""
+        residue_starts = self._residue_starts
+        atom37_coords = self.atom37_coords()
+        aatype = self.aatype()
+        return {
+            "atom37_coords": atom37_coords,
+            "atom37_mask": ~np.isnan(atom37_coords).any(axis=-1),
+            "restype_index": (
+                self.atoms.restype_index[residue_starts]
+                if "restype_index" in self.atoms._annot
+                else self.residue_dictionary.res_name_to_index(
+                    self.atoms.res_name[residue_starts]
+                )
+            ),
+            "aatype": aatype,
+            "chain_id": self.atoms.chain_id[residue_starts],
+            "res_id": self.atoms.res_id[residue_starts],
+        }
+
 
 class ProteinChain(ProteinMixin, BiomoleculeChain):
 
@@ -1,17 +1,25 @@
+import functools
 import itertools
 import json
-from dataclasses import dataclass
+import os
+import threading
+from collections import namedtuple
+from dataclasses import FrozenInstanceError, dataclass, fields
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
+import biotite
 import numpy as np
 from biotite import structure as bs
+from biotite.structure.filter import _canonical_aa_list, _canonical_nucleotide_list
 from biotite.structure.info.ccd import get_ccd
+from biotite.structure.io.pdbx import get_component
 from biotite.structure.residues import get_residue_starts
 
 from bio_datasets.np_utils import map_categories_to_indices
 
 
+@functools.lru_cache(maxsize=None)
 def get_ccd_dict():
     with open(
         Path(__file__).parent.parent
@@ -23,11 +31,133 @@ def get_ccd_dict():
         return json.load(f)
 
 
-def get_atom_elements():
+CCD_COMPONENT_TABLE_PATH = (
+    Path(__file__).parent.parent / "structure" / "library" / "ccd_components.npz"
+)
+CCD_COMPONENT_TABLE_VERSION = 1
+# components whose atoms are stored in the component table, so that the
+# standard residue constants can be built without parsing the full CCD.
+TABLE_COMPONENTS = _canonical_aa_list + ["UNK"] + _canonical_nucleotide_list
+
+
+def build_ccd_component_table() -> Dict[str, np.ndarray]:
+    """Build the compact per-component table from the (full) CCD.
+
+    Saved by setup_ccd.py to CCD_COMPONENT_TABLE_PATH, so that component names,
+    types and one letter codes, and the atoms of standard residues, can be
+    looked up without loading the CCD.
+    """
     ccd_data = get_ccd()
-    return list(np.unique(ccd_data["chem_comp_atom"]["type_symbol"].as_array()))
+    res_types = np.char.upper(
+        np.char.strip(ccd_data["chem_comp"]["type"].as_array(str))
+    )
+    type_names, type_index = np.unique(res_types, return_inverse=True)
+    atom_names, elements, sizes = [], [], []
+    for res_name in TABLE_COMPONENTS:
+        comp = get_component(ccd_data, res_name=res_name)
+        atom_names.append(comp.atom_name)
+        elements.append(comp.element)
+        sizes.append(len(comp))
+    return {
+        "version": np.array(CCD_COMPONENT_TABLE_VERSION),
+        "res_names": ccd_data["chem_comp"]["id"].as_array(str),
+        "type_names": type_names,
+        "type_index": type_index.astype(np.uint8),
+        "one_letter_codes": ccd_data["chem_comp"]["one_letter_code"].as_array(str),
+        "element_types": np.unique(
+            ccd_data["chem_comp_atom"]["type_symbol"].as_array(str)
+        ),
+        "component_names": np.array(TABLE_COMPONENTS),
+        "component_offsets": np.concatenate([[0], np.cumsum(sizes)]),
+        "component_atom_names": np.concatenate(atom_names),
+        "component_elements": np.concatenate(elements),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_ccd_component_table() -> Dict[str, np.ndarray]:
+    """Compact CCD component table, loaded from the library if available."""
+    if CCD_COMPONENT_TABLE_PATH.exists():
+        with np.load(CCD_COMPONENT_TABLE_PATH) as table:
+            if int(table["version"]) == CCD_COMPONENT_TABLE_VERSION:
+                return dict(table)
+    return build_ccd_component_table()
+
+
+def get_component_atoms(res_name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Atom names and elements of a CCD component (including hydrogens and OXT)."""
+    table = get_ccd_component_table()
+    component_names = table["component_names"]
+    if res_name in component_names:
+        ix = int(np.flatnonzero(component_names == res_name)[0])
+        start, end = table["component_offsets"][ix : ix + 2]
+        return (
+            table["component_atom_names"][start:end],
+            table["component_elements"][start:end],
+        )
+    comp = get_component(get_ccd(), res_name=res_name)
+    return comp.atom_name, comp.element
+
+
+RESIDUE_DICTIONARY_ARTIFACT_VERSION = 1
+
+
+def _ccd_fingerprint() -> Dict[str, Optional[Union[str, int]]]:
+    """Identifies the CCD in use, without loading it."""
+    # bio_datasets uses the library CCD if it exists (c.f. __init__)
+    ccd_path = CCD_COMPONENT_TABLE_PATH.parent / "components.bcif"
+    ccd_stat = ccd_path.stat() if ccd_path.exists() else None
+    return {
+        "biotite": biotite.__version__,
+        "ccd_size": ccd_stat.st_size if ccd_stat is not None else None,
+        "ccd_mtime": int(ccd_stat.st_mtime) if ccd_stat is not None else None,
+    }
+
 
+def _group_ccd_atoms(
+    keep_hydrogens: bool = False, keep_oxt: bool = False
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Group the (filtered) atoms of the CCD atom table by component.
 
+    Returns sorted component names, and atom names and elements ordered by
+    component (preserving CCD order within each component), with atoms of
+    component i at offsets[i]:offsets[i+1].
+    """
+    chem_comp_atom = get_ccd()["chem_comp_atom"]
+    comp_ids = chem_comp_atom["comp_id"].as_array(str)
+    atom_names = chem_comp_atom["atom_id"].as_array(str)
+    elements = chem_comp_atom["type_symbol"].as_array(str)
+    # components are unique before filtering, so that fully filtered components
+    # (e.g. hydrogen) are still present, with no atoms
+    res_names = np.unique(comp_ids)
+
+    mask = np.ones(len(comp_ids), dtype=bool)
+    if not keep_hydrogens:
+        mask &= (elements != "H") & (elements != "D")
+    if not keep_oxt:
+        mask &= atom_names != "OXT"
+    comp_ids, atom_names, elements = comp_ids[mask], atom_names[mask], elements[mask]
+
+    order = np.argsort(comp_ids, kind="stable")
+    comp_index = np.searchsorted(res_names, comp_ids[order])
+    offsets = np.concatenate(
+        [[0], np.cumsum(np.bincount(comp_index, minlength=len(res_names)))]
+    )
+    return res_names, atom_names[order], elements[order], offsets
+
+
+@functools.lru_cache(maxsize=None)
+def get_atom_elements():
+    return list(get_ccd_component_table()["element_types"])
+
+
+@functools.lru_cache(maxsize=None)
+def get_standard_atom_names():
+    """Atom names of the standard amino acid, nucleotide and UNK components."""
+    return sorted(set(get_ccd_component_table()["component_atom_names"].tolist()))
+
+
+@functools.lru_cache(maxsize=None)
 def get_residue_frequencies():
     freq_path = Path(__file__).parent.parent / "structure" / "library" / "cc-counts.tdd"
     with open(freq_path, "r") as f:
@@ -35,7 +165,6 @@ def get_residue_frequencies():
         return {line.split()[0]: int(line.split()[1]) for line in f}
 
 
-ALL_ELEMENT_TYPES = get_atom_elements()
 _PRESET_RESIDUE_DICTIONARY_KWARGS = (
     {}
 )  # kwargs to pass to ResidueDictionary.from_ccd_dict
@@ -45,6 +174,113 @@ def register_preset_res_dict(preset_name: str, **kwargs):
     _PRESET_RESIDUE_DICTIONARY_KWARGS[preset_name] = kwargs
 
 
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "currsize"])
+
+
+def _freeze(obj):
+    """Convert (nested) kwargs into a hashable cache key."""
+    if isinstance(obj, dict):
+        return tuple(sorted((key, _freeze(value)) for key, value in obj.items()))
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return tuple(_freeze(value) for value in obj)
+    return obj
+
+
+def _read_only(*args, **kwargs):
+    raise TypeError(
+        "Cached residue dictionaries are shared and read-only; "
+        "use dataclasses.replace to create a modified copy"
+    )
+
+
+class _ReadOnlyList(list):
+    """List which cannot be modified in place (compares equal to a list)."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
+
+class _ReadOnlyDict(dict):
+    """Dict which cannot be modified in place (compares equal to a dict)."""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+
+def _make_read_only(obj):
+    """Recursively convert lists and dicts into read-only equivalents."""
+    if isinstance(obj, dict):
+        return _ReadOnlyDict(
+            (key, _make_read_only(value)) for key, value in obj.items()
+        )
+    if isinstance(obj, list):
+        return _ReadOnlyList(_make_read_only(value) for value in obj)
+    if isinstance(obj, tuple):
+        return tuple(_make_read_only(value) for value in obj)
+    return obj
+
+
+class _ResidueDictionaryCache:
+    """Process-wide cache of residue dictionaries built from the CCD dictionary.
+
+    Cached dictionaries are shared between all callers, so they are frozen
+    (public fields cannot be reassigned, and list and dict fields cannot be
+    modified in place) and their lookup tables are prebuilt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dictionaries = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._dictionaries:
+                self._hits += 1
+                return self._dictionaries[key]
+            self._misses += 1
+            residue_dictionary = build()
+            residue_dictionary._prebuild()
+            for f in fields(residue_dictionary):
+                setattr(
+                    residue_dictionary,
+                    f.name,
+                    _make_read_only(getattr(residue_dictionary, f.name)),
+                )
+            residue_dictionary._frozen = True
+            self._dictionaries[key] = residue_dictionary
+            return residue_dictionary
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, len(self._dictionaries))
+
+    def clear(self):
+        with self._lock:
+            self._dictionaries.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+_RESIDUE_DICTIONARY_CACHE = _ResidueDictionaryCache()
+
+
+def residue_dictionary_cache_info() -> CacheInfo:
+    """Hits, misses and size of the cache used by from_ccd_dict / from_preset."""
+    return _RESIDUE_DICTIONARY_CACHE.info()
+
+
+def clear_residue_dictionary_cache():
+    _RESIDUE_DICTIONARY_CACHE.clear()
+
+
 # c.f. docstring of biotite.structure.filter.filter_amino_acids
 PROTEIN_TYPES = [
     "D-PEPTIDE LINKING",
@@ -95,14 +331,15 @@ CARBOHYDRATE_TYPES = [
 CHEMICAL_TYPES = ["NON-POLYMER", "OTHER", "PEPTIDE-LIKE"]
 
 
-RES_NAMES = get_ccd()["chem_comp"]["id"].as_array()
+@functools.lru_cache(maxsize=None)
+def get_ccd_residue_names() -> np.ndarray:
+    return get_ccd_component_table()["res_names"]
 
 
-# we dont store these in memory bc too large
 def get_component_types():
-    ccd_data = get_ccd()
-    res_types = ccd_data["chem_comp"]["type"].as_array()
-    return dict(zip(RES_NAMES, res_types))
+    table = get_ccd_component_table()
+    res_types = table["type_names"][table["type_index"]]
+    return dict(zip(get_ccd_residue_names(), res_types))
 
 
 def get_component_categories(chem_component_types: Dict[str, str]):
@@ -124,22 +361,38 @@ def get_component_categories(chem_component_types: Dict[str, str]):
     return categories
 
 
-# useful to store this globally because it helps us split chains in complex.py
-CHEM_COMPONENT_CATEGORIES = get_component_categories(get_component_types())
+# useful to cache this because it helps us split chains in complex.py
+@functools.lru_cache(maxsize=None)
+def get_chem_component_categories() -> Dict[str, str]:
+    return get_component_categories(get_component_types())
 
 
 def get_component_3to1():
-    ccd_data = get_ccd()
-    res_names = ccd_data["chem_comp"]["id"].as_array()
-    res_types = ccd_data["chem_comp"]["one_letter_code"].as_array()
+    res_names = get_ccd_residue_names()
+    res_types = get_ccd_component_table()["one_letter_codes"]
     return {name: code for name, code in zip(res_names, res_types) if code}
 
 
+# formerly module-level constants; now built on first access
+_LAZY_CONSTANTS = {
+    "ALL_ELEMENT_TYPES": get_atom_elements,
+    "RES_NAMES": get_ccd_residue_names,
+    "CHEM_COMPONENT_CATEGORIES": get_chem_component_categories,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_CONSTANTS:
+        return _LAZY_CONSTANTS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_res_categories(res_name: np.ndarray):
     unique_resnames = np.unique(res_name)
     unique_restype_indices = map_categories_to_indices(res_name, list(unique_resnames))
+    chem_component_categories = get_chem_component_categories()
     unique_categories = np.array(
-        [CHEM_COMPONENT_CATEGORIES[resname] for resname in unique_resnames]
+        [chem_component_categories[resname] for resname in unique_resnames]
     )
     return unique_categories[unique_restype_indices]
 
@@ -153,7 +406,7 @@ def get_all_residue_names(category: str):
         "carbohydrate",
     ], f"Unsupported molecule category {category}"
     return sorted(
-        res for res, cat in CHEM_COMPONENT_CATEGORIES.items() if cat == category
+        res for res, cat in get_chem_component_categories().items() if cat == category
     )
 
 
@@ -202,17 +455,57 @@ class ResidueDictionary:
         if self.conversions is not None:
             for conversion in self.conversions:
                 assert conversion["to_residue"] in self.residue_names
-                # tuples get converted to lists during serialization so we need to convert them back for eq checks
-                conversion["atom_swaps"] = [
-                    tuple(swaps) for swaps in conversion["atom_swaps"]
-                ]
-                conversion["element_swaps"] = [
-                    tuple(swaps) for swaps in conversion["element_swaps"]
-                ]
+            # tuples get converted to lists during serialization so we need to convert them back for eq checks
+            # n.b. copied rather than modified in place, as conversions may be read-only (c.f. from_ccd_dict)
+            self.conversions = [
+                dict(
+                    conversion,
+                    atom_swaps=[tuple(swaps) for swaps in conversion["atom_swaps"]],
+                    element_swaps=[
+                        tuple(swaps) for swaps in conversion["element_swaps"]
+                    ],
+                )
+                for conversion in self.conversions
+            ]
         self._expected_relative_atom_indices_mapping = None
+        self._templates = None
+        self._residue_name_lookup = None
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False) and not name.startswith("_"):
+            raise FrozenInstanceError(
+                f"Cannot assign to field '{name}' of a cached residue dictionary; "
+                "use dataclasses.replace to create a modified copy"
+            )
+        super().__setattr__(name, value)
+
+    def _prebuild(self):
+        """Build lazily computed lookup tables, so that shared instances are read-only."""
+        self._build_templates()
+        self._get_residue_name_lookup()
+        if self.backbone_atoms is not None:
+            self.backbone_elements_by_residue()
+        if len(self.residue_names) <= 100 and self.atom_types is not None:
+            self._expected_relative_atom_indices_mapping = (
+                self.relative_atom_indices_mapping()
+            )
 
     @classmethod
-    def from_ccd_dict(
+    def from_ccd_dict(cls, use_cache: bool = True, **kwargs):
+        """Build a dictionary from (a subset of) the pre-built CCD residue dictionary.
+
+        By default, dictionaries are cached per class and kwargs, and the returned
+        instance is shared (and frozen): use dataclasses.replace to modify it.
+        See _from_ccd_dict for supported kwargs.
+        """
+        if not use_cache:
+            return cls._from_ccd_dict(**kwargs)
+        return _RESIDUE_DICTIONARY_CACHE.get(
+            (cls, _freeze(kwargs)), functools.partial(cls._from_ccd_dict, **kwargs)
+        )
+
+    @classmethod
+    def _from_ccd_dict(
         cls,
         residue_names: Optional[List[str]] = None,
         category: Optional[str] = None,
@@ -307,18 +600,54 @@ class ResidueDictionary:
         unknown_residue_name: str = "UNK",
         conversions: Optional[List[Dict]] = None,
         minimum_pdb_entries: int = 1,  # ligands might often be unique - but then what's benefit of residue dictionary for unique ligands? SmallMolecule doens't even use residue dictionary
+        cache_path: Optional[Union[str, Path]] = None,
     ):
-        ccd_data = get_ccd()
+        """Build a dictionary directly from the CCD.
+
+        Components' atoms are grouped in a single pass over the CCD atom table.
+        If cache_path is given, the dictionary is saved there, and reloaded on
+        subsequent calls with the same arguments (and the same CCD).
+        """
+        build_kwargs = dict(
+            residue_names=None if residue_names is None else sorted(residue_names),
+            category=category,
+            keep_hydrogens=keep_hydrogens,
+            keep_oxt=keep_oxt,
+            backbone_atoms=backbone_atoms,
+            unknown_residue_name=unknown_residue_name,
+            conversions=conversions,
+            minimum_pdb_entries=minimum_pdb_entries,
+        )
+        if cache_path is not None:
+            cache_path = Path(cache_path)
+            header = json.loads(
+                json.dumps(
+                    {
+                        "version": RESIDUE_DICTIONARY_ARTIFACT_VERSION,
+                        "ccd": _ccd_fingerprint(),
+                        "kwargs": build_kwargs,
+                    }
+                )
+            )
+            if cache_path.exists():
+                with open(cache_path, "r") as f:
+                    artifact = json.load(f)
+                if artifact.get("header") == header:
+                    return cls(**artifact["residue_dictionary"])
+
         chem_component_3to1 = get_component_3to1()
-        chem_component_categories = get_component_categories(get_component_types())
+        chem_component_categories = get_chem_component_categories()
         frequencies = get_residue_frequencies()
-        res_names = np.unique(ccd_data["chem_comp_atom"]["comp_id"].as_array(str))
+        ccd_res_names, atom_names, elements, offsets = _group_ccd_atoms(
+            keep_hydrogens=keep_hydrogens, keep_oxt=keep_oxt
+        )
+        selected_res_names = None if residue_names is None else set(residue_names)
 
         def keep_res(res_name):
             res_filter = frequencies.get(res_name, 0) >= minimum_pdb_entries
             res_filter = (
                 res_filter
-                and (residue_names is None or res_name in residue_names)
+                and (selected_res_names is None or res_name in selected_res_names)
                 and (
                     category is None or chem_component_categories[res_name] == category
                 )
@@ -328,7 +657,10 @@ class ResidueDictionary:
             )
             return res_filter
 
-        res_names = [res for res in res_names if keep_res(res)]
+        res_indices = [
+            ix for ix, res in enumerate(ccd_res_names.tolist()) if keep_res(res)
+        ]
+        res_names = ccd_res_names[res_indices].tolist()
         categories = {chem_component_categories[name] for name in res_names}
         res_letters = [chem_component_3to1[name] for name in res_names]
         res_categories = {name: chem_component_categories[name] for name in res_names}
@@ -339,27 +671,15 @@ class ResidueDictionary:
 
         res_atom_names = {}
         res_element_types = {}
-        chem_comp_atom = ccd_data["chem_comp_atom"]
-        for name in res_names:
-            res_mask = chem_comp_atom["comp_id"].as_array(str) == name
-            assert np.any(res_mask), f"No atoms found for residue {name}"
-            res_elements_arr = chem_comp_atom["type_symbol"].as_array(str)[res_mask]
-            res_atom_names_arr = chem_comp_atom["atom_id"].as_array(str)[res_mask]
-            assert len(res_elements_arr) == len(res_atom_names_arr)
-
-            mask = np.ones(len(res_atom_names_arr), dtype=bool)
-            if not keep_hydrogens:
-                mask &= (res_elements_arr != "H") & (res_elements_arr != "D")
-            if not keep_oxt:
-                mask &= res_atom_names_arr != "OXT"
-
-            res_atom_names[name] = list(res_atom_names_arr[mask])
-            res_element_types[name] = list(res_elements_arr[mask])
+        for name, ix in zip(res_names, res_indices):
+            start, end = offsets[ix], offsets[ix + 1]
+            res_atom_names[name] = atom_names[start:end].tolist()
+            res_element_types[name] = elements[start:end].tolist()
 
         element_types = sorted(set(itertools.chain(*res_element_types.values())))
         atom_types = sorted(set(itertools.chain(*res_atom_names.values())))
-        return cls(
-            residue_names=list(res_names),
+        residue_dictionary = cls(
+            residue_names=res_names,
             residue_letters=res_letters,
             residue_atoms=res_atom_names,
             residue_elements=res_element_types,
@@ -370,15 +690,105 @@ class ResidueDictionary:
             atom_types=atom_types,
             conversions=conversions,
         )
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            artifact = {
+                "header": header,
+                "residue_dictionary": {
+                    f.name: getattr(residue_dictionary, f.name)
+                    for f in fields(residue_dictionary)
+                },
+            }
+            with open(tmp_path, "w") as f:
+                f.write(json.dumps(artifact))
+            os.replace(tmp_path, cache_path)
+        return residue_dictionary
 
     def __str__(self):
         return f"{self.__class__.__name__} ({len(self.residue_names)}) residue types"
 
+    def _build_templates(self):
+        """Flatten the standardised atoms of all residue types into contiguous tables.
+
+        Atoms of residue type i occupy positions offsets[i]:offsets[i+1], so that
+        per-atom lookups are a single gather for any number of residues/chains.
+        """
+        residue_atoms = [
+            self.residue_atoms[res_name] for res_name in self.residue_names
+        ]
+        residue_elements = [
+            self.residue_elements[res_name] for res_name in self.residue_names
+        ]
+        atom_names = list(itertools.chain.from_iterable(residue_atoms))
+        elements = list(itertools.chain.from_iterable(residue_elements))
+        residue_sizes = np.array([len(atoms) for atoms in residue_atoms], dtype=int)
+        atom_type_lookup = {at: i for i, at in enumerate(self.atom_types or [])}
+        element_type_lookup = {el: i for i, el in enumerate(self.element_types or [])}
+        self._templates = {
+            "offsets": np.concatenate([[0], np.cumsum(residue_sizes)]).astype(int),
+            "atom_names": np.array(atom_names, dtype="U6"),
+            "elements": np.array(elements, dtype="U6"),
+            "atomtype_index": np.array(
+                [atom_type_lookup.get(at, -100) for at in atom_names], dtype=int
+            ),
+            "elemtype_index": np.array(
+                [element_type_lookup.get(el, -100) for el in elements], dtype=int
+            ),
+        }
+        return self._templates
+
+    def _get_template(self, name: str) -> np.ndarray:
+        templates = self._templates or self._build_templates()
+        return templates[name]
+
+    @property
+    def template_offsets(self) -> np.ndarray:
+        """Start of the atoms of each residue type in the flat template tables."""
+        return self._get_template("offsets")
+
+    @property
+    def template_atom_names(self) -> np.ndarray:
+        return self._get_template("atom_names")
+
+    @property
+    def template_elements(self) -> np.ndarray:
+        return self._get_template("elements")
+
+    @property
+    def template_atomtype_index(self) -> np.ndarray:
+        """Index in atom_types of each template atom (-100 if not present)."""
+        return self._get_template("atomtype_index")
+
+    @property
+    def template_elemtype_index(self) -> np.ndarray:
+        return self._get_template("elemtype_index")
+
+    def backbone_elements_by_residue(self) -> np.ndarray:
+        """Elements of the backbone atoms of each residue type.
+
+        Shape (num_residue_types x num_backbone_atoms); empty where a residue
+        type does not contain a backbone atom.
+        """
+        assert self.backbone_atoms is not None
+        templates = self._templates or self._build_templates()
+        if "backbone_elements" not in templates:
+            backbone_elements = np.full(
+                (len(self.residue_names), len(self.backbone_atoms)), "", dtype="U6"
+            )
+            for ix, res_name in enumerate(self.residue_names):
+                res_elements = dict(
+                    zip(self.residue_atoms[res_name], self.residue_elements[res_name])
+                )
+                backbone_elements[ix] = [
+                    res_elements.get(at, "") for at in self.backbone_atoms
+                ]
+            templates["backbone_elements"] = backbone_elements
+        return templates["backbone_elements"]
+
     @property
     def residue_sizes(self):
-        return np.array(
-            [len(self.residue_atoms[resname]) for resname in self.residue_names]
-        )
+        return np.diff(self.template_offsets)
 
     def get_res_name_relative_atom_indices_mapping(self, res_name: str) -> np.ndarray:
         if res_name == self.unknown_residue_name:
@@ -427,29 +837,34 @@ class ResidueDictionary:
         assert self.element_types is not None
         return len(self.element_types)
 
-    # TODO: would be good to cache but cant cache list arg.
+    def _template_by_residue(self, template: np.ndarray, resnames=None) -> np.ndarray:
+        if resnames is None:
+            restype_index = np.arange(len(self.residue_names))
+        else:
+            restype_index = self.res_name_to_index(np.array(resnames))
+        residue_sizes = self.residue_sizes[restype_index]
+        residue_index = np.repeat(np.arange(len(restype_index)), residue_sizes)
+        relative_atom_index = np.arange(len(residue_index)) - np.repeat(
+            np.cumsum(residue_sizes) - residue_sizes, residue_sizes
+        )
+        arr = np.full(
+            (len(restype_index), self.max_residue_size), "", dtype=template.dtype
+        )
+        arr[residue_index, relative_atom_index] = template[
+            self.template_offsets[restype_index[residue_index]] + relative_atom_index
+        ]
+        return arr
+
     def standard_atoms_by_residue(self, resnames: Optional[List[str]] = None):
         """Return a fixed size array of atom names for each residue type.
 
         Shape (num_residue_types x max_atoms_per_residue)
         e.g. for proteins we use atom14 (21 x 14)
-
-        N.B.This function remains a bit of a bottleneck.
         """
-        resnames = resnames or self.residue_names
-        arr = np.full((len(resnames), self.max_residue_size), "", dtype="U6")
-        for ix, residue_name in enumerate(resnames):
-            residue_atoms = self.residue_atoms[residue_name]
-            arr[ix, : len(residue_atoms)] = residue_atoms
-        return arr
+        return self._template_by_residue(self.template_atom_names, resnames)
 
     def standard_elements_by_residue(self, resnames: Optional[List[str]] = None):
-        resnames = resnames or self.residue_names
-        arr = np.full((len(resnames), self.max_residue_size), "", dtype="U6")
-        for ix, residue_name in enumerate(resnames):
-            residue_elements = self.residue_elements[residue_name]
-            arr[ix, : len(residue_elements)] = residue_elements
-        return arr
+        return self._template_by_residue(self.template_elements, resnames)
 
     def get_residue_sizes(
         self, restype_index: np.ndarray, chain_id: np.ndarray
@@ -492,13 +907,8 @@ class ResidueDictionary:
         chain_id: np.ndarray,
     ):
         # chain_id is used by ProteinDictionary -- TODO: maybe just accept atoms directly
-        restype_indices = np.unique(restype_index)
-        resnames = list(np.array(self.residue_names)[restype_indices])
-        # index relative to restype_indices of restype_index
-        subset_restype_indices = np.searchsorted(restype_indices, restype_index)
-        return self.standard_atoms_by_residue(resnames)[
-            subset_restype_indices,
-            relative_atom_index,
+        return self.template_atom_names[
+            self.template_offsets[restype_index] + relative_atom_index
         ]
 
     def get_elements(
@@ -507,23 +917,50 @@ class ResidueDictionary:
         relative_atom_index: np.ndarray,
         chain_id: np.ndarray,
     ):
-        restype_indices = np.unique(restype_index)
-        resnames = list(np.array(self.residue_names)[restype_indices])
-        # index relative to restype_indices of restype_index
-        subset_restype_indices = np.searchsorted(restype_indices, restype_index)
-        return self.standard_elements_by_residue(resnames)[
-            subset_restype_indices,
-            relative_atom_index,
+        return self.template_elements[
+            self.template_offsets[restype_index] + relative_atom_index
+        ]
+
+    def get_elemtype_index(
+        self,
+        restype_index: np.ndarray,
+        relative_atom_index: np.ndarray,
+        chain_id: np.ndarray,
+    ):
+        return self.template_elemtype_index[
+            self.template_offsets[restype_index] + relative_atom_index
+        ]
+
+    def get_atomtype_index(
+        self,
+        restype_index: np.ndarray,
+        relative_atom_index: np.ndarray,
+        chain_id: np.ndarray,
+    ):
+        return self.template_atomtype_index[
+            self.template_offsets[restype_index] + relative_atom_index
         ]
 
+    def _get_residue_name_lookup(self) -> Dict[str, int]:
+        if self._residue_name_lookup is None:
+            self._residue_name_lookup = {
+                res_name: ix for ix, res_name in enumerate(self.residue_names)
+            }
+        return self._residue_name_lookup
+
     def res_name_to_index(self, res_name: np.ndarray) -> np.ndarray:
         # n.b. protein resnames are sorted in alphabetical order, apart from UNK
-        if not np.all(np.isin(res_name, np.array(self.residue_names))):
+        # dict lookups of unique names, since CCD dictionaries have ~40k residues
+        lookup = self._get_residue_name_lookup()
+        unique_res_names, inverse = np.unique(res_name, return_inverse=True)
+        unexpected = [name for name in unique_res_names if name not in lookup]
+        if unexpected:
             raise ValueError(
                 f"res_name contains elements not in the allowed list: "
-                f"{np.unique(res_name[~np.isin(res_name, np.array(self.residue_names))])}"
+                f"{np.array(unexpected)}"
             )
-        return map_categories_to_indices(res_name, self.residue_names)
+        res_indices = np.array([lookup[name] for name in unique_res_names], dtype=int)
+        return res_indices[inverse].reshape(np.shape(res_name))
 
     def res_letter_to_index(self, res_letter: np.ndarray) -> np.ndarray:
         if not np.all(np.isin(res_letter, np.array(self.residue_letters))):
@@ -575,63 +1012,11 @@ def get_residue_starts_mask(
     return mask
 
 
-def _create_complete_atom_array_from_restype_index(
+def expand_residue_templates(
     restype_index: np.ndarray,
     residue_dictionary: ResidueDictionary,
     chain_id: np.ndarray,
-    extra_fields: Optional[List[str]] = None,
-    res_id: Optional[np.ndarray] = None,
-    backbone_only: bool = False,
-):
-    assert isinstance(chain_id, np.ndarray)
-    assert len(chain_id) == len(restype_index)
-    unique_chain_ids = np.unique(chain_id)
-    chain_atom_arrays = []
-    chain_residue_starts = []
-    residue_starts_offset = 0
-    res_index_offset = 0
-    for single_chain_id in unique_chain_ids:
-        chain_mask = chain_id == single_chain_id
-        if res_id is not None:
-            chain_res_id = res_id[chain_mask]
-        else:
-            chain_res_id = None
-        (
-            atom_array,
-            residue_starts,
-            full_annot_names,
-        ) = create_single_chain_atom_array_from_restype_index(
-            restype_index=restype_index[chain_mask],
-            residue_dictionary=residue_dictionary,
-            chain_id=single_chain_id,
-            extra_fields=extra_fields,
-            backbone_only=backbone_only,
-            residue_index_offset=res_index_offset,
-            res_id=chain_res_id,
-        )
-        chain_atom_arrays.append(atom_array)
-        chain_residue_starts.append(residue_starts + residue_starts_offset)
-        residue_starts_offset += len(atom_array)
-        res_index_offset += atom_array.res_index.max() + 1
-
-    concatenated_array = sum(chain_atom_arrays, bs.AtomArray(length=0))
-    for key in atom_array._annot.keys():
-        if key not in concatenated_array._annot:
-            concatenated_array.set_annotation(
-                key,
-                np.concatenate([atoms._annot[key] for atoms in chain_atom_arrays]),
-            )
-    return (
-        concatenated_array,
-        np.concatenate(chain_residue_starts),
-        full_annot_names,
-    )
-
-
-def create_single_chain_atom_array_from_restype_index(
-    restype_index: np.ndarray,
-    residue_dictionary: ResidueDictionary,
-    chain_id: str,
+    chain_starts: Optional[np.ndarray] = None,
     extra_fields: Optional[List[str]] = None,
     res_id: Optional[np.ndarray] = None,
     backbone_only: bool = False,
@@ -639,40 +1024,65 @@ def create_single_chain_atom_array_from_restype_index(
 ):
     """
     Populate annotations from restype_index, assuming all atoms are present.
+
+    All chains are expanded in a single pass. Residues must be in chain order
+    (i.e. the residues of each chain are contiguous); atoms are returned in the
+    same order as residues.
+
+    Args:
+        restype_index: (n_residues,) residue type indices.
+        residue_dictionary: dictionary defining the atoms of each residue type.
+        chain_id: (n_residues,) chain id of each residue.
+        chain_starts: (n_residues,) mask of the first residue of each chain.
+            Defaults to positions where chain_id changes; can be passed explicitly
+            to separate consecutive chains with the same id (e.g. from different
+            structures in a batch).
+        res_id: (n_residues,) residue ids. Defaults to 1-based index within chain.
     """
-    assert isinstance(chain_id, str)
+    num_residues = len(restype_index)
+    if chain_starts is None:
+        chain_starts = np.ones(num_residues, dtype=bool)
+        chain_starts[1:] = chain_id[1:] != chain_id[:-1]
+    # integer chain index distinguishes consecutive chains with the same id
+    chain_index = np.cumsum(chain_starts) - 1
 
     if backbone_only:
-        residue_sizes = len(residue_dictionary.backbone_atoms) * len(restype_index)
+        residue_sizes = np.full(num_residues, len(residue_dictionary.backbone_atoms))
     else:
-        residue_sizes = residue_dictionary.get_residue_sizes(restype_index, chain_id)
-        # (n_residues,) NOT (n_atoms,)
-
-    residue_starts = np.concatenate(
-        [[0], np.cumsum(residue_sizes)[:-1]]
-    )  # (n_residues,)
-    new_atom_array = bs.AtomArray(length=np.sum(residue_sizes))
-    chain_id = np.full(len(new_atom_array), chain_id, dtype="U4")
+        residue_sizes = residue_dictionary.get_residue_sizes(
+            restype_index, chain_index
+        )  # (n_residues,) NOT (n_atoms,)
+
+    residue_starts = np.cumsum(residue_sizes) - residue_sizes  # (n_residues,)
+    residue_index = np.repeat(np.arange(num_residues), residue_sizes)
+    relative_atom_index = np.arange(len(residue_index)) - residue_starts[residue_index]
+    atom_restype_index = restype_index[residue_index]
+
+    new_atom_array = bs.AtomArray(length=len(residue_index))
     new_atom_array.set_annotation(
-        "chain_id",
-        chain_id,
+        "chain_id", np.asarray(chain_id).astype("U4")[residue_index]
     )
     full_annot_names = [
         "chain_id",
     ]
-    residue_index = (
-        np.cumsum(get_residue_starts_mask(new_atom_array, residue_starts)) - 1
-    )
-    relative_atom_index = np.arange(len(new_atom_array)) - residue_starts[residue_index]
-    atom_names = new_atom_array.atom_name
-    new_atom_array.set_annotation("restype_index", restype_index[residue_index])
-    atom_names = residue_dictionary.get_atom_names(
-        new_atom_array.restype_index, relative_atom_index, chain_id
-    )
+    new_atom_array.set_annotation("restype_index", atom_restype_index)
+    if backbone_only:
+        atom_names = np.array(residue_dictionary.backbone_atoms)[relative_atom_index]
+        elements = residue_dictionary.backbone_elements_by_residue()[
+            atom_restype_index, relative_atom_index
+        ]
+    else:
+        atom_chain_index = chain_index[residue_index]
+        atom_names = residue_dictionary.get_atom_names(
+            atom_restype_index, relative_atom_index, atom_chain_index
+        )
+        elements = residue_dictionary.get_elements(
+            atom_restype_index, relative_atom_index, atom_chain_index
+        )
     new_atom_array.set_annotation("atom_name", atom_names)
     new_atom_array.set_annotation(
         "res_name",
-        np.array(residue_dictionary.residue_names)[new_atom_array.restype_index],
+        np.array(residue_dictionary.residue_names)[atom_restype_index],
     )
     new_atom_array.set_annotation("hetero", np.zeros(len(new_atom_array), dtype=bool))
     new_atom_array.set_annotation("res_index", residue_index + residue_index_offset)
@@ -680,17 +1090,21 @@ def create_single_chain_atom_array_from_restype_index(
         assert res_id.shape == restype_index.shape
         new_atom_array.set_annotation("res_id", res_id[residue_index])
     else:
-        new_atom_array.set_annotation("res_id", residue_index + 1)
-    elements = residue_dictionary.get_elements(
-        new_atom_array.restype_index, relative_atom_index, chain_id
-    )
+        chain_first_residue = np.flatnonzero(chain_starts)
+        new_atom_array.set_annotation(
+            "res_id",
+            residue_index - chain_first_residue[chain_index[residue_index]] + 1,
+        )
     new_atom_array.set_annotation("element", elements)
-    new_atom_array.set_annotation(
-        "elemtype_index",
-        map_categories_to_indices(
-            new_atom_array.element, residue_dictionary.element_types
-        ),
-    )
+    if backbone_only:
+        elemtype_index = map_categories_to_indices(
+            elements, residue_dictionary.element_types
+        )
+    else:
+        elemtype_index = residue_dictionary.get_elemtype_index(
+            atom_restype_index, relative_atom_index, atom_chain_index
+        )
+    new_atom_array.set_annotation("elemtype_index", elemtype_index)
     full_annot_names += [
         "atom_name",
         "restype_index",
@@ -708,6 +1122,52 @@ def create_single_chain_atom_array_from_restype_index(
     return new_atom_array, residue_starts, full_annot_names
 
 
+def _create_complete_atom_array_from_restype_index(
+    restype_index: np.ndarray,
+    residue_dictionary: ResidueDictionary,
+    chain_id: np.ndarray,
+    extra_fields: Optional[List[str]] = None,
+    res_id: Optional[np.ndarray] = None,
+    backbone_only: bool = False,
+):
+    assert isinstance(chain_id, np.ndarray)
+    assert len(chain_id) == len(restype_index)
+    # chains are ordered alphabetically
+    chain_order = np.argsort(chain_id, kind="stable")
+    return expand_residue_templates(
+        restype_index=restype_index[chain_order],
+        residue_dictionary=residue_dictionary,
+        chain_id=chain_id[chain_order],
+        extra_fields=extra_fields,
+        res_id=res_id[chain_order] if res_id is not None else None,
+        backbone_only=backbone_only,
+    )
+
+
+def create_single_chain_atom_array_from_restype_index(
+    restype_index: np.ndarray,
+    residue_dictionary: ResidueDictionary,
+    chain_id: str,
+    extra_fields: Optional[List[str]] = None,
+    res_id: Optional[np.ndarray] = None,
+    backbone_only: bool = False,
+    residue_index_offset: int = 0,
+):
+    """
+    Populate annotations from restype_index, assuming all atoms are present.
+    """
+    assert isinstance(chain_id, str)
+    return expand_residue_templates(
+        restype_index=restype_index,
+        residue_dictionary=residue_dictionary,
+        chain_id=np.full(len(restype_index), chain_id),
+        extra_fields=extra_fields,
+        res_id=res_id,
+        backbone_only=backbone_only,
+        residue_index_offset=residue_index_offset,
+    )
+
+
 def create_complete_atom_array_from_restype_index(
     restype_index: np.ndarray,
     residue_dictionary: ResidueDictionary,
@@ -0,0 +1,73 @@
+"""Convert a structure file column of a dataset to atom array storage.
+
+e.g. convert-structures path/to/saved_dataset path/to/output --num_proc 16
+Rerun the same command to resume an interrupted conversion.
+"""
+import argparse
+import json
+import os
+
+from datasets import load_from_disk
+
+from bio_datasets import load_dataset
+from bio_datasets.convert import convert_structure_dataset, default_target_feature
+
+
+def create_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "dataset", type=str, help="Directory saved with save_to_disk, or hub dataset"
+    )
+    parser.add_argument("output_dir", type=str)
+    parser.add_argument("--split", type=str, default="train")
+    parser.add_argument("--column", type=str, default="structure")
+    parser.add_argument("--num_proc", type=int, default=1)
+    parser.add_argument("--rows_per_shard", type=int, default=1000)
+    parser.add_argument("--writer_batch_size", type=int, default=100)
+    parser.add_argument(
+        "--target_feature_kwargs",
+        type=json.loads,
+        default=None,
+        help='JSON overrides of target feature args, e.g. \'{"coords_dtype": "int32"}\'',
+    )
+    parser.add_argument(
+        "--raise_errors",
+        action="store_true",
+        help="Raise on rows which fail to convert, rather than skipping them",
+    )
+    return parser
+
+
+def main():
+    parser = create_parser()
+    args = parser.parse_args()
+    if os.path.isdir(args.dataset):
+        dataset = load_from_disk(args.dataset)
+        if args.split in getattr(dataset, "keys", lambda: [])():
+            dataset = dataset[args.split]
+    else:
+        dataset = load_dataset(args.dataset, split=args.split)
+
+    target_feature = default_target_feature(
+        dataset.features[args.column], **(args.target_feature_kwargs or {})
+    )
+    summary = convert_structure_dataset(
+        dataset,
+        args.output_dir,
+        column=args.column,
+        target_feature=target_feature,
+        num_proc=args.num_proc,
+        rows_per_shard=args.rows_per_shard,
+        writer_batch_size=args.writer_batch_size,
+        skip_errors=not args.raise_errors,
+    )
+    print(
+        f"Converted {summary.num_converted} rows ({summary.num_errors} errors) in "
+        f"{summary.num_shards - summary.num_resumed_shards} shards; "
+        f"{summary.num_resumed_shards} of {summary.num_shards} shards were already "
+        f"complete. Failed rows are listed in {args.output_dir}/errors-*.jsonl"
+    )
+
+
+if __name__ == "__main__":
+    main()
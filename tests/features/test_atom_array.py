@@ -1,9 +1,24 @@
+import gzip
+import json
+
 import numpy as np
 import pytest
+from biotite.structure.residues import get_residue_starts
 from biotite.structure.sequence import to_sequence
+from datasets import Dataset
 
-from bio_datasets.features.atom_array import AtomArrayFeature, ProteinAtomArrayFeature
+from bio_datasets.features import Features
+from bio_datasets.features.atom_array import (
+    AtomArrayFeature,
+    ProteinAtomArrayFeature,
+    element_from_atom_name,
+    iter_jsonl,
+    protein_atom_array_from_dict,
+)
+from bio_datasets.structure.parsing import load_structure
 from bio_datasets.structure.protein import ProteinDictionary
+from bio_datasets.structure.protein import constants as protein_constants
+from bio_datasets.structure.residue import ResidueDictionary
 
 
 @pytest.mark.parametrize(
@@ -48,3 +63,348 @@ def test_encode_decode_atom_array_without_residue_dictionary(afdb_atom_array):
     assert np.all(decoded.chain_id == afdb_atom_array.chain_id)
     assert decoded.element[-1] == "O"
     assert decoded.atom_name[-1] == "OXT"
+
+
+@pytest.mark.parametrize(
+    "feature_kwargs",
+    [
+        {"with_element": True, "all_atoms_present": False, "load_as": "biotite"},
+        {"with_element": False, "all_atoms_present": True, "load_as": "biotite"},
+        {"with_b_factor": True, "b_factor_is_plddt": True, "load_as": "biotite"},
+    ],
+)
+def test_decode_batch_matches_decode_example(afdb_atom_array, feature_kwargs):
+    """Batched decoding from python dicts and from arrow should match per-example decoding."""
+    prot_dict = ProteinDictionary.from_preset("protein", keep_oxt=True)
+    feat = ProteinAtomArrayFeature(residue_dictionary=prot_dict, **feature_kwargs)
+    features = Features({"structure": feat})
+    atoms = afdb_atom_array.copy()
+    atoms.set_annotation("b_factor", np.full(len(atoms), 90.0))
+    examples = [atoms, None, atoms[:100]]
+    ds = Dataset.from_dict({"structure": examples}, features=features)
+    expected = [
+        feat.decode_example(feat.encode_example(atoms)) if atoms is not None else None
+        for atoms in examples
+    ]
+    for decoded in [
+        feat.decode_batch(
+            [feat.encode_example(ex) if ex is not None else None for ex in examples]
+        ),
+        feat.decode_batch(ds.data.column("structure")),
+        ds[:]["structure"],
+    ]:
+        assert decoded[1] is None
+        for atoms, expected_atoms in zip(decoded[::2], expected[::2]):
+            assert len(atoms) == len(expected_atoms)
+            assert np.allclose(atoms.coord, expected_atoms.coord, equal_nan=True)
+            for annot in expected_atoms.get_annotation_categories():
+                assert np.all(
+                    atoms.get_annotation(annot) == expected_atoms.get_annotation(annot)
+                ), annot
+
+
+@pytest.mark.parametrize("keep_oxt", [False, True])
+def test_decode_atom37(afdb_atom_array, keep_oxt):
+    """Dense atom37 decoding should match scattering the decoded atom array."""
+    prot_dict = ProteinDictionary.from_preset("protein", keep_oxt=keep_oxt)
+    kwargs = {"all_atoms_present": True, "with_element": False}
+    feat = ProteinAtomArrayFeature(
+        residue_dictionary=prot_dict, load_as="atom37", **kwargs
+    )
+    atoms_feat = ProteinAtomArrayFeature(
+        residue_dictionary=prot_dict, load_as="biotite", **kwargs
+    )
+    encoded = feat.encode_example(afdb_atom_array)
+    decoded = feat.decode_example(encoded)
+    atoms = atoms_feat.decode_example(encoded)
+
+    residue_index = atoms.res_id - 1
+    expected = np.full((residue_index.max() + 1, 37, 3), np.nan)
+    atom37_index = [protein_constants.atom_order[name] for name in atoms.atom_name]
+    expected[residue_index, atom37_index] = atoms.coord
+    assert np.allclose(decoded["atom37_coords"], expected, equal_nan=True)
+    assert decoded["atom37_mask"].sum() == len(atoms)
+    assert decoded["atom37_mask"][-1, protein_constants.atom_order["OXT"]] == keep_oxt
+    assert np.all(
+        np.array(protein_constants.resnames)[decoded["aatype"]]
+        == atoms.res_name[get_residue_starts(atoms)]
+    )
+
+
+@pytest.mark.parametrize(
+    "internal_coords_type,internal_coords_dtype,max_rmsd",
+    [
+        ("pnerf", "float32", 1e-3),
+        ("pnerf", "uint16", 0.01),
+        ("idealised", "uint16", 0.2),
+    ],
+)
+def test_internal_coords(
+    afdb_atom_array, internal_coords_type, internal_coords_dtype, max_rmsd
+):
+    """Internal coords round trip, batched (arrow) and dense decoding."""
+    prot_dict = ProteinDictionary.from_preset("protein", keep_oxt=True)
+    kwargs = {"residue_dictionary": prot_dict, "all_atoms_present": True}
+    cartesian_feat = ProteinAtomArrayFeature(load_as="biotite", **kwargs)
+    feat = ProteinAtomArrayFeature(
+        load_as="biotite",
+        internal_coords_type=internal_coords_type,
+        internal_coords_dtype=internal_coords_dtype,
+        internal_coords_anchor_interval=8,
+        **kwargs,
+    )
+    expected = cartesian_feat.decode_example(
+        cartesian_feat.encode_example(afdb_atom_array)
+    )
+    encoded = feat.encode_example(afdb_atom_array)
+    assert "coords" not in encoded
+    decoded = feat.decode_example(encoded)
+    assert np.all(decoded.atom_name == expected.atom_name)
+    rmsd = np.sqrt(((decoded.coord - expected.coord) ** 2).sum(axis=-1).mean())
+    assert rmsd < max_rmsd
+
+    examples = [afdb_atom_array, None, afdb_atom_array[afdb_atom_array.res_id > 5]]
+    ds = Dataset.from_dict(
+        {"structure": examples}, features=Features({"structure": feat})
+    )
+    batch_decoded = feat.decode_batch(ds.data.column("structure"))
+    assert batch_decoded[1] is None
+    assert np.allclose(batch_decoded[0].coord, decoded.coord, atol=1e-4)
+    assert np.allclose(
+        batch_decoded[2].coord,
+        feat.decode_example(feat.encode_example(examples[2])).coord,
+        atol=1e-4,
+    )
+
+    dense_feat = ProteinAtomArrayFeature(
+        load_as="atom37",
+        internal_coords_type=internal_coords_type,
+        internal_coords_dtype=internal_coords_dtype,
+        internal_coords_anchor_interval=8,
+        **kwargs,
+    )
+    dense = dense_feat.decode_example(encoded)
+    assert dense["atom37_mask"].sum() == len(decoded)
+
+    with pytest.raises(ValueError):
+        ProteinAtomArrayFeature(
+            internal_coords_type=internal_coords_type,
+            internal_coords_anchor_interval=0,
+            **kwargs,
+        )
+
+
+@pytest.mark.parametrize("internal_coords_type", ["pnerf", "idealised"])
+def test_internal_coords_partial_residues(afdb_atom_array, internal_coords_type):
+    """Present atoms whose reference atoms are missing are not lost."""
+    atoms = afdb_atom_array.copy()
+    # missing backbone N (first residue and mid-chain), and a missing side chain atom
+    atoms.coord[(atoms.res_id == 1) & (atoms.atom_name == "N")] = np.nan
+    atoms.coord[(atoms.res_id == 20) & (atoms.atom_name == "N")] = np.nan
+    atoms.coord[(atoms.res_id == 30) & (atoms.atom_name == "CB")] = np.nan
+    kwargs = {"all_atoms_present": True, "load_as": "biotite"}
+    cartesian_feat = ProteinAtomArrayFeature(**kwargs)
+    feat = ProteinAtomArrayFeature(
+        internal_coords_type=internal_coords_type,
+        internal_coords_dtype="float32",
+        internal_coords_anchor_interval=8,
+        **kwargs,
+    )
+    expected = cartesian_feat.decode_example(cartesian_feat.encode_example(atoms))
+    encoded = feat.encode_example(atoms)
+    assert len(encoded["fallback_atoms"]) > 0
+    decoded = feat.decode_example(encoded)
+    is_present = ~np.isnan(expected.coord).any(axis=-1)
+    assert np.array_equal(~np.isnan(decoded.coord).any(axis=-1), is_present)
+    assert np.allclose(decoded.coord[is_present], expected.coord[is_present], atol=0.5)
+    # atoms referencing the missing N are stored as cartesian coords
+    residue_20_ca = (decoded.res_id == 20) & (decoded.atom_name == "CA")
+    assert np.allclose(decoded.coord[residue_20_ca], expected.coord[residue_20_ca])
+
+    examples = [atoms[atoms.res_id > 5], None, atoms]
+    ds = Dataset.from_dict(
+        {"structure": examples}, features=Features({"structure": feat})
+    )
+    batch_decoded = feat.decode_batch(ds.data.column("structure"))
+    assert np.allclose(batch_decoded[2].coord, decoded.coord, equal_nan=True)
+
+
+@pytest.mark.parametrize(
+    "coords_dtype,coords_delta_encoding",
+    [("int32", False), ("int32", True), ("int16", True)],
+)
+def test_quantised_coords(afdb_atom_array, coords_dtype, coords_delta_encoding):
+    """Fixed-point coords are within resolution / 2, in single and batched decoding."""
+    resolution = 1e-3
+    afdb_atom_array = afdb_atom_array.copy()
+    afdb_atom_array.coord += 500.0  # far from the origin, where float16 is coarse
+    afdb_atom_array.coord[3] = np.nan
+    feat = AtomArrayFeature(
+        load_as="biotite",
+        coords_dtype=coords_dtype,
+        coords_resolution=resolution,
+        coords_delta_encoding=coords_delta_encoding,
+    )
+    encoded = feat.encode_example(afdb_atom_array)
+    assert encoded["coords"].dtype == np.dtype(coords_dtype)
+    decoded = feat.decode_example(encoded)
+    assert np.all(np.isnan(decoded.coord[3]))
+    is_present = ~np.isnan(afdb_atom_array.coord).any(axis=-1)
+    error = np.abs(decoded.coord[is_present] - afdb_atom_array.coord[is_present])
+    assert error.max() <= resolution / 2 + 1e-4
+
+    examples = [afdb_atom_array, None, afdb_atom_array[afdb_atom_array.res_id > 5]]
+    ds = Dataset.from_dict(
+        {"structure": examples}, features=Features({"structure": feat})
+    )
+    batch_decoded = feat.decode_batch(ds.data.column("structure"))
+    assert batch_decoded[1] is None
+    for example, batch_example in zip(examples[::2], batch_decoded[::2]):
+        expected = feat.decode_example(feat.encode_example(example))
+        assert np.array_equal(batch_example.coord, expected.coord, equal_nan=True)
+
+
+def test_quantised_coords_overflow(afdb_atom_array):
+    afdb_atom_array = afdb_atom_array.copy()
+    afdb_atom_array.coord[0] += 100.0  # > 32.767 A from the centroid
+    feat = AtomArrayFeature(load_as="biotite", coords_dtype="int16")
+    with pytest.raises(ValueError, match="do not fit"):
+        feat.encode_example(afdb_atom_array)
+
+
+@pytest.mark.parametrize("with_residue_dictionary", [False, True])
+def test_categorical_annotations(afdb_atom_array, with_residue_dictionary):
+    """Categorical annotations round trip, and vocabularies survive serialisation."""
+    residue_dictionary = (
+        ResidueDictionary.from_preset("protein") if with_residue_dictionary else None
+    )
+    feat = AtomArrayFeature(
+        residue_dictionary=residue_dictionary,
+        load_as="biotite",
+        categorical_annotations=True,
+    )
+    assert feat._features["atom_name"].dtype == "uint8"
+    assert feat._features["element"].dtype == "uint8"
+    assert feat._features["chain_id"].dtype == "uint8"
+    features = Features.from_dict(Features({"structure": feat}).to_dict())
+    feat = features["structure"]
+    assert (feat.atom_name_vocab is None) == with_residue_dictionary
+
+    encoded = feat.encode_example(afdb_atom_array)
+    assert encoded["atom_name"].dtype == np.uint8
+    decoded = feat.decode_example(encoded)
+    assert np.all(decoded.atom_name == afdb_atom_array.atom_name)
+    assert np.all(decoded.element == afdb_atom_array.element)
+    assert np.all(decoded.chain_id == afdb_atom_array.chain_id)
+
+    examples = [afdb_atom_array, None, afdb_atom_array[afdb_atom_array.res_id > 5]]
+    ds = Dataset.from_dict({"structure": examples}, features=features)
+    batch_decoded = feat.decode_batch(ds.data.column("structure"))
+    assert batch_decoded[1] is None
+    for example, batch_example in zip(examples[::2], batch_decoded[::2]):
+        assert np.all(batch_example.atom_name == example.atom_name)
+        assert np.all(batch_example.element == example.element)
+        assert np.all(batch_example.chain_id == example.chain_id)
+    sliced = ds[0:2]["structure"]
+    assert sliced[1] is None
+    assert np.all(sliced[0].atom_name == afdb_atom_array.atom_name)
+
+
+def test_categorical_annotations_unknown_values(cif_file_1aq1):
+    """Values outside the vocabularies (ligand atom names, long chain ids) round trip."""
+    atoms = load_structure(cif_file_1aq1)
+    atoms.chain_id[atoms.hetero] = "AAA"
+    feat = AtomArrayFeature(load_as="biotite", categorical_annotations=True)
+    encoded = feat.encode_example(atoms)
+    assert "C28" in encoded["atom_name_other"]
+    assert set(encoded["chain_id_other"]) == {"AAA"}
+    decoded = feat.decode_example(encoded)
+    assert np.all(decoded.atom_name == atoms.atom_name)
+    assert np.all(decoded.element == atoms.element)
+    assert np.all(decoded.chain_id == atoms.chain_id)
+
+    examples = [atoms, None, atoms[~atoms.hetero], atoms]
+    ds = Dataset.from_dict(
+        {"structure": examples}, features=Features({"structure": feat})
+    )
+    batch_decoded = feat.decode_batch(ds.data.column("structure"))
+    for example, batch_example in zip(examples[::2], batch_decoded[::2]):
+        assert np.all(batch_example.atom_name == example.atom_name)
+        assert np.all(batch_example.chain_id == example.chain_id)
+    assert np.all(batch_decoded[3].atom_name == atoms.atom_name)
+    sliced = ds[0:3]["structure"]
+    assert sliced[1] is None
+    assert np.all(sliced[0].chain_id == atoms.chain_id)
+    assert np.all(sliced[2].atom_name == examples[2].atom_name)
+
+
+def test_element_from_atom_name(cif_file_1aq1):
+    atoms = load_structure(cif_file_1aq1)
+    assert np.all(
+        element_from_atom_name(atoms.atom_name, atoms.res_name) == atoms.element
+    )
+    # CA is calcium in a calcium ion, and a carbon otherwise
+    elements = element_from_atom_name(
+        np.array(["CA", "CA", "OXT", "C1"]), np.array(["CA", "ALA", "GLY", "???"])
+    )
+    assert elements.tolist() == ["CA", "C", "O", "C"]
+
+
+def test_encode_decode_without_element(cif_file_1aq1):
+    atoms = load_structure(cif_file_1aq1)
+    feat = AtomArrayFeature(load_as="biotite", with_element=False)
+    assert "element" not in feat._features
+    encoded = feat.encode_example(atoms)
+    assert "element" not in encoded
+    assert np.all(feat.decode_example(encoded).element == atoms.element)
+    ds = Dataset.from_dict(
+        {"structure": [atoms]}, features=Features({"structure": feat})
+    )
+    assert np.all(
+        feat.decode_batch(ds.data.column("structure"))[0].element == atoms.element
+    )
+
+
+def test_protein_atom_array_from_dict(afdb_atom_array, tmp_path):
+    """Backbone and atom37 dicts, streamed from JSONL, round trip through encoding."""
+    dense_feat = ProteinAtomArrayFeature(
+        load_as="atom37",
+        all_atoms_present=True,
+        residue_dictionary=ProteinDictionary.from_preset("protein", keep_oxt=True),
+    )
+    dense = dense_feat.decode_example(dense_feat.encode_example(afdb_atom_array))
+    sequence = "".join(
+        protein_constants.restypes_with_x[aatype] for aatype in dense["aatype"]
+    )
+    backbone_coords = {
+        atom_name: dense["atom37_coords"][:, protein_constants.atom_order[atom_name]]
+        for atom_name in ["N", "CA", "C", "O"]
+    }
+    backbone_dict = {
+        "sequence": sequence,
+        "backbone_coords": {k: v.tolist() for k, v in backbone_coords.items()},
+        "chain_id": "A" * len(sequence),
+    }
+    jsonl_path = tmp_path / "coords.jsonl.gz"
+    with gzip.open(jsonl_path, "wt") as f:
+        f.write(json.dumps(backbone_dict) + "\n")
+    (streamed,) = list(iter_jsonl(jsonl_path))
+    atoms = protein_atom_array_from_dict(streamed)
+    assert len(atoms) == 4 * len(sequence)
+    assert np.allclose(atoms.coord[1::4], backbone_coords["CA"])
+    assert np.all(
+        atoms.res_name[::4]
+        == afdb_atom_array.res_name[afdb_atom_array.atom_name == "CA"]
+    )
+    assert np.all(atoms.element[3::4] == "O")
+
+    atoms = protein_atom_array_from_dict(
+        {
+            "sequence": sequence,
+            "atom37_coords": dense["atom37_coords"],
+            "atom37_mask": dense["atom37_mask"],
+        }
+    )
+    decoded = dense_feat.decode_example(dense_feat.encode_example(atoms))
+    assert np.array_equal(decoded["atom37_mask"], dense["atom37_mask"])
+    assert np.allclose(decoded["atom37_coords"], dense["atom37_coords"], equal_nan=True)
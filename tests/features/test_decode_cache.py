@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pytest
+
+from bio_datasets import Dataset, Features
+from bio_datasets import config as bio_config
+from bio_datasets.features import AtomArrayFeature, StructureFeature
+from bio_datasets.features.decode_cache import (
+    atom_array_nbytes,
+    clear_decode_cache,
+    decode_cache_info,
+    set_decode_cache_max_bytes,
+)
+from bio_datasets.structure.parsing import load_structure
+
+TESTS_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+@pytest.fixture(autouse=True)
+def empty_decode_cache():
+    clear_decode_cache()
+    yield
+    set_decode_cache_max_bytes(bio_config.DECODE_CACHE_MAX_BYTES)
+    clear_decode_cache()
+
+
+def test_structure_feature_decode_cache():
+    feat = StructureFeature(cache_decoded=True)
+    path = os.path.join(TESTS_DIR, "1qys.pdb")
+    encoded = feat.encode_example({"path": path})
+    atoms = feat.decode_example(encoded)
+    atoms.coord[:] = 0.0  # decoded atoms are copies of the cached atoms
+    cached_atoms = feat.decode_example(encoded)
+    assert not np.all(cached_atoms.coord == 0.0)
+    info = decode_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+    assert info.nbytes == atom_array_nbytes(cached_atoms)
+
+    # same contents as bytes have a different key; decode options are part of keys
+    with open(path, "rb") as f:
+        feat.decode_example({"bytes": f.read(), "path": None, "type": "pdb"})
+    StructureFeature(cache_decoded=True, with_b_factor=True).decode_example(encoded)
+    assert decode_cache_info().misses == 3
+
+
+def test_decode_cache_evicts_least_recently_used():
+    feat = StructureFeature(cache_decoded=True)
+    path = os.path.join(TESTS_DIR, "AF-V9HVX0-F1-model_v4.pdb")
+    with open(path, "rb") as f:
+        # two entries of the same size, with different keys
+        encoded = [
+            feat.encode_example({"path": path}),
+            {"bytes": f.read(), "path": None, "type": "pdb"},
+        ]
+    atoms = feat.decode_example(encoded[0])
+    set_decode_cache_max_bytes(atom_array_nbytes(atoms) + 1)
+    feat.decode_example(encoded[1])
+    info = decode_cache_info()
+    assert (info.evictions, info.currsize) == (1, 1)
+    assert info.nbytes <= info.max_bytes
+    feat.decode_example(encoded[1])
+    feat.decode_example(encoded[0])
+    assert (decode_cache_info().hits, decode_cache_info().misses) == (1, 3)
+
+    # entries larger than the budget are not cached
+    set_decode_cache_max_bytes(atom_array_nbytes(atoms) - 1)
+    assert decode_cache_info().currsize == 0
+    feat.decode_example(encoded[0])
+    assert decode_cache_info().currsize == 0
+
+
+def test_atom_array_feature_decode_cache(afdb_atom_array):
+    feat = AtomArrayFeature(load_as="biotite", cache_decoded=True)
+    encoded = feat.encode_example(afdb_atom_array)
+    decoded = feat.decode_example(dict(encoded))
+    cached = feat.decode_example(dict(encoded))
+    assert decode_cache_info().hits == 1
+    assert np.all(cached.coord == decoded.coord)
+    assert np.all(cached.atom_name == afdb_atom_array.atom_name)
+
+
+def test_atom_array_feature_decode_cache_dataset(cif_file_1aq1):
+    """Rows formatted by datasets (string fields as object arrays) are cached."""
+    atoms = load_structure(cif_file_1aq1)
+    feat = AtomArrayFeature(
+        load_as="biotite", cache_decoded=True, categorical_annotations=True
+    )
+    ds = Dataset.from_dict(
+        {"structure": [atoms]}, features=Features({"structure": feat})
+    )
+    decoded = ds[0]["structure"]
+    cached = ds[0]["structure"]
+    assert (decode_cache_info().hits, decode_cache_info().misses) == (1, 1)
+    assert np.all(cached.res_name == decoded.res_name)
+    assert np.all(cached.atom_name == atoms.atom_name)
+
+
+def test_atom_array_feature_decode_cache_batches(afdb_atom_array):
+    """Rows and slices share cache entries; only missing examples are decoded."""
+    feat = AtomArrayFeature(
+        load_as="biotite", cache_decoded=True, categorical_annotations=True
+    )
+    examples = [afdb_atom_array[:50], None, afdb_atom_array]
+    ds = Dataset.from_dict(
+        {"structure": examples}, features=Features({"structure": feat})
+    )
+    ds[0]["structure"]
+    batch = ds[0:3]["structure"]
+    assert (decode_cache_info().hits, decode_cache_info().misses) == (1, 2)
+    assert batch[1] is None
+    assert np.all(batch[2].coord == afdb_atom_array.coord)
+    assert np.all(batch[0].atom_name == afdb_atom_array.atom_name[:50])
+
+    batch = ds.with_format("bio", decode=True)[0:3]["structure"]
+    info = decode_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (3, 2, 2)
+    assert np.all(batch[2].atom_name == afdb_atom_array.atom_name)
+    assert np.allclose(ds[2]["structure"].coord, afdb_atom_array.coord)
+    assert decode_cache_info().hits == 4
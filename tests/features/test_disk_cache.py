@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from bio_datasets import config as bio_config
+from bio_datasets.features import StructureFeature, atom_array
+from bio_datasets.features.disk_cache import get_disk_cache, set_disk_cache
+
+TESTS_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+@pytest.fixture(autouse=True)
+def disk_cache_dir(tmp_path):
+    set_disk_cache(cache_dir=str(tmp_path / "decoded"))
+    yield tmp_path / "decoded"
+    set_disk_cache(
+        cache_dir=bio_config.DISK_CACHE_DIR, max_bytes=bio_config.DISK_CACHE_MAX_BYTES
+    )
+
+
+def _raise(*args, **kwargs):
+    raise AssertionError("structure file was parsed")
+
+
+def test_disk_cache_round_trip(disk_cache_dir, monkeypatch):
+    feat = StructureFeature(disk_cache=True, include_bonds=True, with_b_factor=True)
+    encoded = feat.encode_example({"path": os.path.join(TESTS_DIR, "1aq1.cif")})
+    parsed = feat.decode_example(encoded)
+    assert len(os.listdir(disk_cache_dir)) == 1
+
+    monkeypatch.setattr(atom_array, "load_structure_from_file_dict", _raise)
+    cached = StructureFeature(
+        disk_cache=True, include_bonds=True, with_b_factor=True
+    ).decode_example(encoded)
+    assert np.array_equal(cached.coord, parsed.coord)
+    for category in parsed.get_annotation_categories():
+        assert (
+            cached.get_annotation(category).dtype
+            == parsed.get_annotation(category).dtype
+        )
+        assert np.array_equal(
+            cached.get_annotation(category), parsed.get_annotation(category)
+        )
+    assert np.array_equal(cached.bonds.as_array(), parsed.bonds.as_array())
+    cached.coord[:] = 0.0  # copy-on-write
+    assert not np.all(feat.decode_example(encoded).coord == 0.0)
+
+    # decode options are part of the key
+    with pytest.raises(AssertionError, match="parsed"):
+        StructureFeature(disk_cache=True).decode_example(encoded)
+
+
+def test_disk_cache_eviction(disk_cache_dir):
+    feat = StructureFeature(disk_cache=True)
+    path = os.path.join(TESTS_DIR, "1qys.pdb")
+    with open(path, "rb") as f:
+        # two entries of the same size, with different keys
+        encoded = [
+            feat.encode_example({"path": path}),
+            {"bytes": f.read(), "path": None, "type": "pdb"},
+        ]
+    feat.decode_example(encoded[0])
+    set_disk_cache(max_bytes=get_disk_cache().nbytes() + 1)
+    feat.decode_example(encoded[1])
+    assert get_disk_cache().nbytes() <= get_disk_cache().max_bytes
+    assert os.listdir(disk_cache_dir) == [feat._decode_cache_key(encoded[1])]
+
+
+def test_disk_cache_concurrent_writers(disk_cache_dir):
+    feat = StructureFeature(disk_cache=True)
+    encoded = feat.encode_example({"path": os.path.join(TESTS_DIR, "1qys.pdb")})
+    with ThreadPoolExecutor(4) as pool:
+        decoded = list(pool.map(lambda _: feat.decode_example(encoded), range(8)))
+    assert os.listdir(disk_cache_dir) == [feat._decode_cache_key(encoded)]
+    for atoms in decoded[1:]:
+        assert np.array_equal(atoms.coord, decoded[0].coord)
+
+
+def test_disk_cache_errors_fall_back_to_parsing(disk_cache_dir, tmp_path):
+    feat = StructureFeature(disk_cache=True)
+    encoded = feat.encode_example({"path": os.path.join(TESTS_DIR, "1qys.pdb")})
+    expected = StructureFeature().decode_example(encoded)
+
+    # entries from another sidecar version are misses, and are replaced
+    feat.decode_example(encoded)
+    meta_path = disk_cache_dir / feat._decode_cache_key(encoded) / "meta.json"
+    meta_path.write_text(meta_path.read_text().replace('"version": 1', '"version": 0'))
+    assert get_disk_cache().get(feat._decode_cache_key(encoded)) is None
+    assert np.array_equal(feat.decode_example(encoded).coord, expected.coord)
+    assert get_disk_cache().get(feat._decode_cache_key(encoded)) is not None
+
+    # an unwritable cache dir (below a file)
+    (tmp_path / "file").write_text("")
+    set_disk_cache(cache_dir=str(tmp_path / "file" / "decoded"))
+    assert np.array_equal(feat.decode_example(encoded).coord, expected.coord)
@@ -0,0 +1,78 @@
+import gzip
+import os
+
+import numpy as np
+import pytest
+
+from bio_datasets import Features
+from bio_datasets.features import StructureFeature
+from bio_datasets.features.parallel import (
+    ParallelDecodeConfig,
+    decode_timings,
+    reset_decode_timings,
+    set_parallel_decoding,
+)
+from bio_datasets.structure.residue import ResidueDictionary
+
+TESTS_DIR = os.path.dirname(os.path.dirname(__file__))
+FILENAMES = ["1qys.pdb", "AF-V9HVX0-F1-model_v4.pdb", "AF-Q9R172-F1-model_v4.pdb"]
+
+
+@pytest.fixture(autouse=True)
+def serial_decoding():
+    reset_decode_timings()
+    yield
+    set_parallel_decoding(None)
+
+
+@pytest.fixture(scope="module")
+def encoded_column():
+    column = []
+    for filename in FILENAMES:
+        with open(os.path.join(TESTS_DIR, filename), "rb") as f:
+            column.append(
+                {"bytes": gzip.compress(f.read()), "path": None, "type": "pdb.gz"}
+            )
+    return column * 3 + [None]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_decode_batch(encoded_column, executor):
+    feat = StructureFeature()
+    serial = feat.decode_batch(encoded_column)
+    assert decode_timings().rows == len(encoded_column)
+
+    reset_decode_timings()
+    set_parallel_decoding(
+        ParallelDecodeConfig(executor=executor, num_workers=2, min_batch_size=4)
+    )
+    decoded = Features({"structure": feat}).decode_batch({"structure": encoded_column})
+    assert decoded["structure"][-1] is None
+    for parallel_atoms, serial_atoms in zip(decoded["structure"][:-1], serial[:-1]):
+        assert np.array_equal(parallel_atoms.coord, serial_atoms.coord)
+        assert np.all(parallel_atoms.res_name == serial_atoms.res_name)
+
+    # stage timings are collected from workers
+    timings = decode_timings()
+    assert timings.rows == len(encoded_column)
+    assert set(timings.stages) == {"pdb.gz/decompress", "pdb.gz/parse"}
+    assert all(seconds > 0 for seconds in timings.stages.values())
+
+
+def test_per_feature_parallel_decoding(encoded_column):
+    set_parallel_decoding(ParallelDecodeConfig(executor="thread", num_workers=2))
+    feat = StructureFeature(
+        load_as="biomolecule",
+        constructor_kwargs={
+            "residue_dictionary": ResidueDictionary.from_preset("protein")
+        },
+    )
+    # the feature's config takes precedence, and small batches are decoded serially
+    feat.set_parallel_decoding(ParallelDecodeConfig(executor="process", num_workers=2))
+    decoded = feat.decode_batch(encoded_column[:2])
+    for mol, example in zip(decoded, encoded_column[:2]):
+        expected = feat.decode_example(example).atoms.coord
+        assert np.array_equal(mol.atoms.coord, expected, equal_nan=True)
+    assert "load_as" in decode_timings().stages
+    with pytest.raises(ValueError):
+        ParallelDecodeConfig(executor="greenlet")
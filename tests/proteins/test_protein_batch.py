@@ -0,0 +1,77 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from bio_datasets import Dataset, Features
+from bio_datasets.features.atom_array import ProteinAtomArrayFeature
+from bio_datasets.structure.protein import ProteinBatch, ProteinChain, ProteinDictionary
+
+
+@pytest.mark.parametrize("load_as", ["atom37", "atom14"])
+def test_protein_batch_from_decoded(afdb_atom_array, pdb_atoms_top7, load_as):
+    proteins = [ProteinChain(afdb_atom_array), ProteinChain(pdb_atoms_top7)]
+    batch = ProteinBatch.from_proteins(proteins, pad_to_multiple_of=16)
+    assert batch.coords.shape == (2, 96, 37, 3)
+    assert list(batch.num_residues) == [61, 92]
+
+    feat = ProteinAtomArrayFeature(
+        all_atoms_present=True, with_element=False, load_as=load_as
+    )
+    ds = Dataset.from_dict(
+        {"structure": [afdb_atom_array, pdb_atoms_top7]},
+        features=Features({"structure": feat}),
+    )
+    decoded_batch = ProteinBatch.from_decoded(ds[:2]["structure"])
+    num_residues = decoded_batch.coords.shape[1]
+    assert (decoded_batch.atom_mask == batch.atom_mask[:, :num_residues]).all()
+    assert np.allclose(
+        decoded_batch.coords,
+        batch.coords[:, :num_residues],
+        atol=1e-2,
+        equal_nan=True,
+    )
+
+
+def test_protein_batch_ops(afdb_atom_array, pdb_atoms_top7):
+    proteins = [ProteinChain(afdb_atom_array), ProteinChain(pdb_atoms_top7)]
+    batch = ProteinBatch.from_proteins(proteins)
+    contacts = batch.contacts("CA", 8.0)
+    atom14_coords, atom14_mask = batch.atom14_coords_and_mask()
+    backbone_coords = batch.backbone_coords(["N", "CA", "C", "CB"])
+    for ix, protein in enumerate(proteins):
+        num_residues = protein.num_residues
+        assert (contacts[ix, :num_residues, :num_residues] == protein.contacts()).all()
+        assert not contacts[ix, num_residues:].any()
+        assert np.array_equal(
+            atom14_coords[ix, :num_residues], protein.atom14_coords(), equal_nan=True
+        )
+        assert atom14_mask[ix, :num_residues].sum() == protein.atoms.mask.sum()
+        assert np.array_equal(
+            backbone_coords[ix, :num_residues],
+            protein.backbone_coords(["N", "CA", "C", "CB"]),
+            equal_nan=True,
+        )
+    assert np.isnan(atom14_coords[0, 61:]).all()
+
+
+def test_to_dense_restype_index(pdb_atoms_top7):
+    residue_dictionary = ProteinDictionary.from_preset("protein")
+    # residue order differing from the AlphaFold restype order
+    residue_dictionary = dataclasses.replace(
+        residue_dictionary,
+        residue_names=residue_dictionary.residue_names[::-1],
+        residue_letters=residue_dictionary.residue_letters[::-1],
+    )
+    protein = ProteinChain(pdb_atoms_top7, residue_dictionary=residue_dictionary)
+    expected = protein.to_dense()["restype_index"]
+    protein.atoms.del_annotation("restype_index")
+    dense = protein.to_dense()
+    # residue dictionary indices, not AlphaFold restype order (aatype)
+    assert np.array_equal(dense["restype_index"], expected)
+    assert np.array_equal(
+        dense["restype_index"],
+        protein.residue_dictionary.res_name_to_index(
+            protein.atoms.res_name[protein._residue_starts]
+        ),
+    )
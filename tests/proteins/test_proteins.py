@@ -1,11 +1,27 @@
+import dataclasses
+import json
+import pickle
+from dataclasses import FrozenInstanceError
+
 import numpy as np
+import pytest
 from biotite.structure.filter import filter_amino_acids
 from biotite.structure.io.pdbx import CIFFile, get_structure
 from biotite.structure.residues import residue_iter
 
+from bio_datasets.structure.biomolecule import Biomolecule
 from bio_datasets.structure.parsing import load_structure
-from bio_datasets.structure.protein import ProteinChain
+from bio_datasets.structure.protein import (
+    ProteinChain,
+    ProteinComplex,
+    ProteinDictionary,
+)
 from bio_datasets.structure.protein import constants as protein_constants
+from bio_datasets.structure.residue import (
+    clear_residue_dictionary_cache,
+    create_complete_atom_array_from_restype_index,
+    residue_dictionary_cache_info,
+)
 
 expected_residue_atoms = {
     "ALA": ["N", "CA", "C", "O", "CB"],
@@ -229,3 +245,188 @@ def test_fill_missing_residues(cif_file_1aq1):
     # n.b. order will be different
     assert len(default_atoms) + nanmask.sum() == len(atoms)
     # TODO: also check that unique chain ids etc are the same
+
+
+def test_fill_missing_residues_annotations(cif_file_1aq1):
+    atoms = load_structure(
+        cif_file_1aq1,
+        fill_missing_residues=True,
+        extra_fields=["b_factor", "occupancy"],
+        include_bonds=True,
+    )
+    observed = load_structure(
+        cif_file_1aq1, extra_fields=["b_factor", "occupancy"], include_bonds=True
+    )
+    nanmask = np.isnan(atoms.coord).any(axis=-1)
+    assert atoms.bonds.get_bond_count() == observed.bonds.get_bond_count()
+    assert np.all(atoms.occupancy[nanmask] == 0)
+    assert np.all(atoms.auth_res_id[nanmask] == -1)
+    # filled residues take the chain annotations of their (polymer) chain, and
+    # residues of each polymer chain are ordered by res_id
+    filled_entity_ids = np.unique(atoms.entity_id[nanmask])
+    polymer = atoms[np.isin(atoms.entity_id, filled_entity_ids)]
+    assert np.unique(polymer.chain_id).tolist() == ["A"]
+    assert np.unique(polymer.auth_chain_id).tolist() == ["A"]
+    assert np.all(np.diff(polymer.res_id) >= 0)
+
+
+def test_multi_chain_template_expansion():
+    """Single-pass multi-chain expansion should match expanding each chain separately."""
+    residue_dictionary = ProteinDictionary.from_preset("protein", keep_oxt=True)
+    restype_index = np.random.default_rng(0).integers(0, 21, size=30)
+    chain_id = np.array(["B"] * 10 + ["A"] * 12 + ["C"] * 8)
+    atoms, residue_starts, _ = create_complete_atom_array_from_restype_index(
+        restype_index, residue_dictionary, chain_id
+    )
+    chain_atoms = []
+    for ix, single_chain_id in enumerate(["A", "B", "C"]):
+        chain_mask = chain_id == single_chain_id
+        single_chain_atoms, _, _ = create_complete_atom_array_from_restype_index(
+            restype_index[chain_mask], residue_dictionary, single_chain_id
+        )
+        chain_atoms.append(single_chain_atoms)
+    assert len(atoms) == sum(len(chain) for chain in chain_atoms)
+    assert len(residue_starts) == len(restype_index)
+    for annot in ["chain_id", "atom_name", "element", "res_name", "res_id"]:
+        assert np.all(
+            atoms.get_annotation(annot)
+            == np.concatenate([chain.get_annotation(annot) for chain in chain_atoms])
+        ), annot
+    # oxt at the end of each chain
+    assert np.sum(atoms.atom_name == "OXT") == 3
+    assert np.all(np.diff(atoms.res_index) >= 0)
+
+
+def test_preset_dictionary_cache(pdb_atoms_top7):
+    clear_residue_dictionary_cache()
+    atoms = pdb_atoms_top7[filter_amino_acids(pdb_atoms_top7)]
+    chains = []
+    for ix in range(60):
+        chain_atoms = atoms.copy()
+        chain_atoms.chain_id[:] = f"C{ix}"
+        chains.append(chain_atoms)
+    ProteinComplex.from_atoms(sum(chains[1:], chains[0]))
+    cache_info = residue_dictionary_cache_info()
+    assert cache_info.misses == 1 and cache_info.hits == 59
+
+    residue_dictionary = ProteinDictionary.from_preset("protein")
+    assert residue_dictionary is ProteinDictionary.from_preset("protein")
+    assert residue_dictionary is not ProteinDictionary.from_preset(
+        "protein", keep_oxt=True
+    )
+    with pytest.raises(FrozenInstanceError):
+        residue_dictionary.keep_oxt = True
+    assert dataclasses.replace(residue_dictionary, keep_oxt=True).keep_oxt
+
+
+def test_cached_residue_dictionary_read_only():
+    residue_dictionary = ProteinDictionary.from_preset("protein")
+    num_residues = len(residue_dictionary.residue_names)
+    with pytest.raises(TypeError):
+        residue_dictionary.residue_names.append("XXX")
+    with pytest.raises(TypeError):
+        residue_dictionary.residue_atoms["ALA"].append("XX")
+    with pytest.raises(TypeError):
+        residue_dictionary.residue_elements["XXX"] = []
+    with pytest.raises(TypeError):
+        residue_dictionary.conversions[0]["to_residue"] = "ALA"
+    shared = ProteinDictionary.from_preset("protein")
+    assert len(shared.residue_names) == num_residues
+    assert "XX" not in shared.residue_atoms["ALA"]
+
+    # read-only containers compare equal to (and serialise like) builtins
+    copied = pickle.loads(pickle.dumps(residue_dictionary))
+    assert copied == residue_dictionary
+    assert copied == ProteinDictionary(
+        **json.loads(json.dumps(dataclasses.asdict(residue_dictionary)))
+    )
+    modified = dataclasses.replace(
+        residue_dictionary, residue_names=list(residue_dictionary.residue_names)
+    )
+    modified.residue_names.append("XXX")
+
+
+def test_standardise_atoms_chain_order(cif_file_1aq1):
+    residue_dictionary = ProteinDictionary.from_preset("protein")
+    atoms = Biomolecule.filter_atoms(load_structure(cif_file_1aq1), residue_dictionary)
+    second_chain = atoms.copy()
+    second_chain.chain_id[:] = "B"
+    # chain B before chain A: standardisation sorts chains by id
+    shuffled = second_chain + atoms
+    original_chain_id = shuffled.chain_id.copy()
+    standardised = Biomolecule.standardise_atoms(shuffled, residue_dictionary)
+    assert np.array_equal(shuffled.chain_id, original_chain_id)
+
+    expected = Biomolecule.standardise_atoms(atoms + second_chain, residue_dictionary)
+    for annot_name in expected.get_annotation_categories():
+        assert np.array_equal(
+            standardised.get_annotation(annot_name),
+            expected.get_annotation(annot_name),
+        ), annot_name
+    assert np.array_equal(standardised.coord, expected.coord, equal_nan=True)
+    # per-residue annotations not defined by the template are kept
+    assert "auth_res_id" in standardised.get_annotation_categories()
+    chain_a = standardised[standardised.chain_id == "A"]
+    assert np.array_equal(chain_a.auth_res_id, chain_a.res_id)
+
+
+def test_residue_contacts_sparse(pdb_atoms_top7):
+    protein = ProteinChain(pdb_atoms_top7)
+    ca_coords = protein.atoms.coord[protein.atoms.atom_name == "CA"]
+    dense_distances = np.linalg.norm(ca_coords[:, None] - ca_coords[None], axis=-1)
+    assert (protein.residue_contacts("CA", 8.0) == (dense_distances < 8.0)).all()
+    index_from, index_to, distances = protein.residue_neighbours("CA", 8.0)
+    assert len(index_from) == (dense_distances <= 8.0).sum()
+    assert np.allclose(distances, dense_distances[index_from, index_to], atol=1e-4)
+
+
+@pytest.mark.parametrize("multi_atom_calc_type", ["min", "mean", "representative"])
+def test_residue_distances_multi_atom(pdb_atoms_top7, multi_atom_calc_type):
+    protein = ProteinChain(pdb_atoms_top7)
+    # missing atoms: nan coordinates and masked-out atoms
+    protein.atoms.coord[np.flatnonzero(protein.atoms.atom_name == "CB")[:10]] = np.nan
+    protein.atoms.mask[np.flatnonzero(protein.atoms.atom_name == "CG")[:10]] = False
+    atom_names = ["CB", "CG", "CA"]
+    present = protein.atoms.mask & ~np.isnan(protein.atoms.coord).any(axis=-1)
+    residue_atoms = [
+        [
+            ix
+            for name in atom_names
+            for ix in np.flatnonzero(
+                present
+                & (protein.atoms.atom_name == name)
+                & (protein._atom_residue_index() == res_ix)
+            )
+        ]
+        for res_ix in range(protein.num_residues)
+    ]
+    if multi_atom_calc_type == "representative":
+        residue_atoms = [atoms[:1] for atoms in residue_atoms]
+    expected = np.zeros((protein.num_residues, protein.num_residues))
+    for i, atoms_i in enumerate(residue_atoms):
+        for j, atoms_j in enumerate(residue_atoms):
+            pair_dists = np.linalg.norm(
+                protein.atoms.coord[atoms_i][:, None]
+                - protein.atoms.coord[atoms_j][None],
+                axis=-1,
+            )
+            expected[i, j] = (
+                pair_dists.mean()
+                if multi_atom_calc_type == "mean"
+                else pair_dists.min()
+            )
+
+    distances = protein.residue_distances(
+        atom_names,
+        multi_atom_calc_type=multi_atom_calc_type,
+        max_block_elements=1000,  # force tiling
+    )
+    assert np.allclose(distances, expected, atol=1e-3)
+    if multi_atom_calc_type != "mean":
+        index_from, index_to, sparse_distances = protein.residue_neighbours(
+            atom_names, 6.0, multi_atom_calc_type=multi_atom_calc_type
+        )
+        assert (
+            np.stack([index_from, index_to], axis=1) == np.argwhere(expected <= 6.0)
+        ).all()
+        assert np.allclose(sparse_distances, expected[index_from, index_to], atol=1e-3)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from bio_datasets import Dataset, Features
+from bio_datasets.collate import (
+    collate_dense_proteins,
+    get_num_residues,
+    length_bucketed_batches,
+)
+from bio_datasets.features.atom_array import ProteinAtomArrayFeature
+
+
+def test_collate_atom14(afdb_atom_array):
+    feat = ProteinAtomArrayFeature(
+        all_atoms_present=True, with_element=False, load_as="atom14"
+    )
+    ds = Dataset.from_dict(
+        {"structure": [afdb_atom_array, afdb_atom_array[:80]]},
+        features=Features({"structure": feat}),
+    )
+    num_residues = get_num_residues(ds.data.column("structure"))
+    assert list(num_residues) == [61, 10]
+
+    batch = collate_dense_proteins(ds[:2]["structure"], pad_to_multiple_of=16)
+    assert batch["atom14_coords"].shape == (2, 64, 14, 3)
+    assert batch["atom14_mask"].shape == (2, 64, 14)
+    assert np.all(batch["residue_mask"].sum(axis=1) == num_residues)
+    assert not batch["atom14_mask"][1, 10:].any()
+    assert np.isnan(batch["atom14_coords"][1, 10:]).all()
+
+
+def test_length_bucketed_batches():
+    lengths = np.random.default_rng(0).integers(10, 500, size=103)
+    batches = length_bucketed_batches(
+        lengths, batch_size=8, bucket_size_multiplier=4, seed=0
+    )
+    assert sorted(np.concatenate(batches)) == list(range(103))
+    assert sum(len(batch) < 8 for batch in batches) <= 4
+    # within a bucket, batches are sorted by length
+    unbucketed = length_bucketed_batches(
+        lengths, batch_size=8, bucket_size_multiplier=100, shuffle=False
+    )
+    assert np.all(np.diff(lengths[np.concatenate(unbucketed)]) >= 0)
+    dropped = length_bucketed_batches(lengths, batch_size=8, drop_last=True, seed=0)
+    assert all(len(batch) == 8 for batch in dropped)
@@ -0,0 +1,132 @@
+import biotite.structure as bs
+import numpy as np
+
+from bio_datasets.structure.complex import BiomoleculeComplex, chain_name_generator
+from bio_datasets.structure.parsing import load_structure
+
+
+def test_chain_name_generator():
+    names = list(zip(range(26 + 26**2 + 1), chain_name_generator()))
+    assert names[25][1] == "Z"
+    assert names[26][1] == "AA"
+    assert names[-1][1] == "AAA"
+
+
+def test_split_relabel_chains_many_groups(cif_file_1aq1):
+    atoms = load_structure(cif_file_1aq1)
+    atoms = atoms[atoms.element != "H"]
+    # add many single-atom ligands to chain A, beyond the 26 single-letter names
+    ions = bs.AtomArray(40)
+    ions.res_name[:] = "ZN"
+    ions.atom_name[:] = "ZN"
+    ions.element[:] = "ZN"
+    ions.hetero[:] = True
+    ions.res_id[:] = np.arange(1000, 1040)[::-1]
+    ions.chain_id[:] = "A"
+    atoms = ions + atoms
+
+    relabelled = BiomoleculeComplex.split_relabel_chains(atoms)
+    assert len(relabelled) == len(atoms)
+    chain_ids, counts = np.unique(relabelled.chain_id, return_counts=True)
+    assert "AA" in chain_ids
+    for chain_id in chain_ids:
+        chain_mask = relabelled.chain_id == chain_id
+        assert len(np.unique(relabelled.molecule_type[chain_mask])) == 1
+        assert len(np.unique(relabelled.auth_chain_id[chain_mask])) == 1
+        if relabelled.molecule_type[chain_mask][0] == "small_molecule":
+            assert len(np.unique(relabelled.res_id[chain_mask])) == 1
+    ion_chains = relabelled.chain_id[relabelled.res_name == "ZN"]
+    assert len(np.unique(ion_chains)) == 40
+    assert (relabelled.auth_chain_id[relabelled.res_name == "ZN"] == "A").all()
+    # small molecules are named in res_id order
+    assert (np.diff(relabelled.res_id[relabelled.res_name == "ZN"]) > 0).all()
+
+    complex = BiomoleculeComplex.from_atoms(atoms)
+    filtered = BiomoleculeComplex.filter_atoms(atoms, keep_hydrogens=False)
+    assert len(complex.chain_ids) == len(
+        np.unique(BiomoleculeComplex.split_relabel_chains(filtered).chain_id)
+    )
+
+
+def test_complex_atoms_buffer(cif_file_1aq1):
+    complex = BiomoleculeComplex.from_atoms(load_structure(cif_file_1aq1))
+    atoms = complex.atoms
+    assert complex.atoms is atoms
+    for chain_id, chain in complex.chains:
+        chain_atoms = atoms[complex.chain_slice(chain_id)]
+        assert np.shares_memory(chain.atoms.coord, atoms.coord)
+        assert (chain_atoms.atom_name == chain.atoms.atom_name).all()
+    # ligand bonds are offset into the complex atoms
+    ligand_chain_id = complex.chain_ids[-1]
+    ligand_slice = complex.chain_slice(ligand_chain_id)
+    assert len(atoms.bonds.as_array()) == len(
+        complex.get_chain(ligand_chain_id).atoms.bonds.as_array()
+    )
+    assert atoms.bonds.as_array()[:, :2].min() >= ligand_slice.start
+
+    complex.get_chain("A").atoms.coord[0] = 0.0
+    assert (complex.atoms.coord[0] == 0.0).all()
+
+    del complex[ligand_chain_id]
+    assert complex.atoms is not atoms
+    assert len(complex.atoms) == ligand_slice.start
+    assert complex.atoms.bonds.as_array().shape[0] == 0
+
+
+def test_interface(pdb_atoms_top7):
+    shifted_atoms = pdb_atoms_top7.copy()
+    shifted_atoms.chain_id[:] = "B"
+    shifted_atoms.coord += np.array([20.0, 0.0, 0.0], dtype=np.float32)
+    complex = BiomoleculeComplex.from_atoms(pdb_atoms_top7 + shifted_atoms)
+    ca_coords = complex.atoms.coord[complex.atoms.atom_name == "CA"]
+    ca_chain_id = complex.atoms.chain_id[complex.atoms.atom_name == "CA"]
+    distances = np.linalg.norm(
+        ca_coords[ca_chain_id == "A", None] - ca_coords[None, ca_chain_id == "B"],
+        axis=-1,
+    )
+    interface = complex.interface("CA", threshold=10.0)
+    num_interface_residues = [
+        len(np.unique(chain.atoms.res_id)) for _, chain in interface.chains
+    ]
+    assert num_interface_residues == [
+        (distances < 10.0).any(axis=1).sum(),
+        (distances < 10.0).any(axis=0).sum(),
+    ]
+
+    dense_interface = complex.interface("CA", threshold=10.0, nan_fill="max")
+    assert np.array_equal(
+        dense_interface.atoms.coord, interface.atoms.coord, equal_nan=True
+    )
+    # a residue missing CA is only in the interface if nan_fill < threshold
+    far_residue = np.argmax(distances.min(axis=1))
+    far_ca = np.flatnonzero(complex.atoms.atom_name == "CA")[far_residue]
+    complex.atoms.coord[far_ca] = np.nan
+    far_res_id = complex.atoms.res_id[far_ca]
+    unfilled_interface = complex.interface("CA", threshold=10.0)
+    assert far_res_id not in unfilled_interface.get_chain("A").atoms.res_id
+    filled_interface = complex.interface("CA", threshold=10.0, nan_fill=0.0)
+    assert far_res_id in filled_interface.get_chain("A").atoms.res_id
+
+
+def test_interfaces_all_chain_pairs(pdb_atoms_top7):
+    chain_atoms = []
+    for ix, chain_id in enumerate("ABCD"):
+        atoms = pdb_atoms_top7.copy()
+        atoms.chain_id[:] = chain_id
+        atoms.coord += np.array([15.0 * ix, 0.0, 0.0], dtype=np.float32)
+        chain_atoms.append(atoms)
+    complex = BiomoleculeComplex.from_atoms(sum(chain_atoms[1:], chain_atoms[0]))
+    interfaces = complex.interfaces("CA", threshold=10.0)
+    assert len(interfaces["min_dist"]) > 0
+    for ix, chain_i in enumerate(complex.chain_ids):
+        for chain_j in complex.chain_ids[ix + 1 :]:
+            distances = complex.interface_distances("CA", chain_pair=(chain_i, chain_j))
+            pair_mask = (interfaces["chain_i"] == chain_i) & (
+                interfaces["chain_j"] == chain_j
+            )
+            assert pair_mask.sum() == (distances < 10.0).sum()
+            assert np.allclose(
+                np.sort(interfaces["min_dist"][pair_mask]),
+                np.sort(distances[distances < 10.0]),
+                atol=1e-4,
+            )
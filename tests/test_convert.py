@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from bio_datasets import Dataset, Features, Value
+from bio_datasets.convert import (
+    convert_structure_dataset,
+    default_target_feature,
+    load_converted_dataset,
+    read_conversion_errors,
+)
+from bio_datasets.features import AtomArrayFeature, StructureFeature
+
+TESTS_DIR = os.path.dirname(__file__)
+FILENAMES = ["1qys.pdb", "AF-V9HVX0-F1-model_v4.pdb", "AF-Q9R172-F1-model_v4.pdb"]
+
+
+@pytest.fixture
+def structure_dataset():
+    structures = []
+    for filename in FILENAMES * 2:
+        with open(os.path.join(TESTS_DIR, filename), "rb") as f:
+            structures.append({"bytes": f.read(), "path": None, "type": "pdb"})
+    structures[4] = {"bytes": b"garbage", "path": None, "type": "pdb"}
+    structures[5] = None
+    features = Features(
+        {"id": Value("int32"), "structure": StructureFeature(with_b_factor=True)}
+    )
+    return Dataset.from_dict(
+        {"id": list(range(len(structures))), "structure": structures},
+        features=features,
+    )
+
+
+@pytest.mark.parametrize("num_proc", [1, 2])
+def test_convert_structure_dataset(structure_dataset, tmp_path, num_proc):
+    summary = convert_structure_dataset(
+        structure_dataset, str(tmp_path), rows_per_shard=2, num_proc=num_proc
+    )
+    assert tuple(summary) == (3, 0, 5, 1)
+    errors = read_conversion_errors(str(tmp_path))
+    assert [error["row"] for error in errors] == [4]
+
+    converted = load_converted_dataset(str(tmp_path))
+    assert isinstance(converted.features["structure"], AtomArrayFeature)
+    assert converted["id"] == [0, 1, 2, 3, 5]
+    assert converted[4]["structure"] is None
+    for ix in range(4):
+        expected = structure_dataset[ix]["structure"]
+        atoms = converted[ix]["structure"]
+        assert np.allclose(atoms.coord, expected.coord)
+        assert np.allclose(atoms.b_factor, expected.b_factor)
+        assert np.all(atoms.atom_name == expected.atom_name)
+
+
+def test_convert_structure_dataset_resume(structure_dataset, tmp_path):
+    convert_structure_dataset(structure_dataset, str(tmp_path), rows_per_shard=2)
+    shard_path = tmp_path / "data-00001-of-00003.arrow"
+    os.remove(shard_path)
+    summary = convert_structure_dataset(
+        structure_dataset, str(tmp_path), rows_per_shard=2
+    )
+    assert tuple(summary) == (3, 2, 2, 0)
+    assert len(load_converted_dataset(str(tmp_path))) == 5
+
+    with pytest.raises(ValueError):
+        convert_structure_dataset(structure_dataset, str(tmp_path), rows_per_shard=3)
+
+
+def test_convert_structure_dataset_with_bonds(structure_dataset, tmp_path, caplog):
+    features = structure_dataset.features.copy()
+    features["structure"] = StructureFeature(include_bonds=True)
+    dataset = structure_dataset.cast(features)
+    assert not default_target_feature(features["structure"]).with_bonds
+    assert "bonds" in caplog.text
+    summary = convert_structure_dataset(dataset, str(tmp_path), rows_per_shard=3)
+    assert summary.num_converted == 5
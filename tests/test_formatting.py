@@ -0,0 +1,77 @@
+import numpy as np
+from biotite.structure.residues import get_residue_starts
+
+from bio_datasets import Dataset, Features, Value
+from bio_datasets.features.atom_array import AtomArrayFeature, ProteinAtomArrayFeature
+from bio_datasets.structure.parsing import load_structure
+
+
+def test_bio_formatter_views(afdb_atom_array):
+    """Structure columns are exposed as read-only views; other columns as python."""
+    feat = ProteinAtomArrayFeature(load_as="biotite", coords_dtype="float32")
+    ds = Dataset.from_dict(
+        {"structure": [afdb_atom_array, None, afdb_atom_array[:50]], "id": [0, 1, 2]},
+        features=Features({"structure": feat, "id": Value("int32")}),
+    ).with_format("bio")
+
+    atoms = afdb_atom_array[afdb_atom_array.atom_name != "OXT"]
+    example = ds[0]
+    assert example["id"] == 0
+    coords = example["structure"]["coords"]
+    assert not coords.flags.writeable
+    assert np.allclose(coords, atoms.coord)
+    assert np.all(example["structure"]["atom_name"] == atoms.atom_name)
+
+    batch = ds[:3]
+    assert batch["structure"][1] is None
+    assert batch["structure"][2]["coords"].shape == (50, 3)
+    assert np.all(batch["structure"][2]["element"] == afdb_atom_array.element[:50])
+
+
+def test_bio_formatter_decode(afdb_atom_array):
+    feat = ProteinAtomArrayFeature(load_as="biotite")
+    ds = Dataset.from_dict(
+        {"structure": [afdb_atom_array[:50], afdb_atom_array]},
+        features=Features({"structure": feat}),
+    )
+    expected = ds[1]["structure"]
+    decoded = ds.with_format("bio", decode=True)[1]["structure"]
+    assert np.allclose(decoded.coord, expected.coord)
+    assert np.all(decoded.res_name == expected.res_name)
+
+
+def test_bio_formatter_quantised_coords(afdb_atom_array):
+    """Quantised coords are dequantised in the view, as when decoding."""
+    feat = ProteinAtomArrayFeature(
+        load_as="biotite", coords_dtype="int16", coords_delta_encoding=True
+    )
+    ds = Dataset.from_dict(
+        {"structure": [afdb_atom_array[:50], None, afdb_atom_array]},
+        features=Features({"structure": feat}),
+    )
+    expected = ds[2]["structure"].coord
+    view = ds.with_format("bio")[:3]["structure"]
+    assert "coords_offset" not in view[2]
+    coords = view[2]["coords"]
+    assert coords.dtype == np.float32
+    assert not coords.flags.writeable
+    assert np.allclose(coords, expected, equal_nan=True)
+    assert np.allclose(view[0]["coords"], ds[0]["structure"].coord, equal_nan=True)
+
+
+def test_bio_formatter_categorical_annotations(cif_file_1aq1):
+    """Categorical annotations are returned as strings, including unknown values."""
+    atoms = load_structure(cif_file_1aq1)
+    atoms.chain_id[atoms.hetero] = "AAA"
+    feat = AtomArrayFeature(load_as="biotite", categorical_annotations=True)
+    ds = Dataset.from_dict(
+        {"structure": [atoms[~atoms.hetero], None, atoms]},
+        features=Features({"structure": feat}),
+    )
+    view = ds.with_format("bio")[:3]["structure"]
+    assert "atom_name_other" not in view[2]
+    assert np.all(view[2]["atom_name"] == atoms.atom_name)
+    assert np.all(view[2]["element"] == atoms.element)
+    assert np.all(view[0]["atom_name"] == atoms.atom_name[~atoms.hetero])
+    chain_ids = atoms.chain_id[get_residue_starts(atoms)]
+    assert np.all(view[2]["chain_id"] == chain_ids)
@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+from datasets import IterableDataset
+
+from bio_datasets import Features, Value
+from bio_datasets.features import StructureFeature
+from bio_datasets.prefetch import prefetch_decode
+
+TESTS_DIR = os.path.dirname(__file__)
+FILENAMES = ["1qys.pdb", "AF-V9HVX0-F1-model_v4.pdb", "AF-Q9R172-F1-model_v4.pdb"]
+FEATURES = Features({"id": Value("int32"), "structure": StructureFeature()})
+
+
+def _examples(num_examples, reads=None):
+    for ix in range(num_examples):
+        if reads is not None:
+            reads.append(ix)
+        path = os.path.join(TESTS_DIR, FILENAMES[ix % len(FILENAMES)])
+        yield {"id": ix, "structure": {"path": path}}
+
+
+def _streaming_dataset(num_examples, reads=None):
+    return IterableDataset.from_generator(
+        _examples,
+        gen_kwargs={"num_examples": num_examples, "reads": reads},
+        features=FEATURES,
+    )
+
+
+@pytest.mark.parametrize(
+    "executor,ordered", [("thread", True), ("thread", False), ("process", True)]
+)
+def test_prefetch_decode(executor, ordered):
+    ds = _streaming_dataset(9)
+    expected = {example["id"]: example["structure"] for example in ds}
+    prefetched = list(
+        prefetch_decode(ds, num_workers=2, executor=executor, ordered=ordered)
+    )
+    ids = [example["id"] for example in prefetched]
+    assert sorted(ids) == list(range(9))
+    if ordered:
+        assert ids == list(range(9))
+    for example in prefetched:
+        assert np.array_equal(example["structure"].coord, expected[example["id"]].coord)
+
+
+def test_prefetch_backpressure_and_shutdown():
+    reads = []
+    num_threads = threading.active_count()
+    ds = prefetch_decode(_streaming_dataset(100, reads), num_workers=2, max_prefetch=4)
+    iterator = iter(ds)
+    next(iterator)
+    time.sleep(0.5)
+    # the example being consumed, up to max_prefetch decoding and one waiting
+    assert len(reads) <= 6
+    iterator.close()
+    assert threading.active_count() == num_threads
+    assert ds.features == FEATURES  # other attributes come from the dataset
+
+
+def test_prefetch_decode_error():
+    ds = IterableDataset.from_generator(
+        lambda: iter([{"structure": {"bytes": b"garbage", "type": "pdb"}}]),
+        features=Features({"structure": StructureFeature()}),
+    )
+    with pytest.raises(Exception):
+        list(prefetch_decode(ds))
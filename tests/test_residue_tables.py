@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from bio_datasets.structure import residue
+
+
+def test_component_table_matches_ccd():
+    table = residue.get_ccd_component_table()
+    ccd_table = residue.build_ccd_component_table()
+    for key, value in ccd_table.items():
+        assert np.array_equal(table[key], value), key
+    atom_names, elements = residue.get_component_atoms("ALA")
+    assert list(atom_names[:5]) == ["N", "CA", "C", "O", "CB"]
+    assert list(elements[:5]) == ["N", "C", "C", "O", "C"]
+    assert residue.CHEM_COMPONENT_CATEGORIES["ALA"] == "protein"
+    assert residue.CHEM_COMPONENT_CATEGORIES["DA"] == "dna"
+
+
+@pytest.mark.skipif(
+    not residue.CCD_COMPONENT_TABLE_PATH.exists(),
+    reason="CCD component table not built (run setup_ccd.py)",
+)
+def test_import_does_not_load_ccd():
+    script = (
+        "import sys; import bio_datasets; "
+        "ccd = sys.modules['biotite.structure.info.ccd']; "
+        "print(getattr(ccd, '_ccd_block', None) is None)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    )
+    assert output.stdout.strip() == "True"
+
+
+def test_from_ccd_artifact(tmp_path):
+    cache_path = tmp_path / "residue_dictionary.json"
+    residue_dictionary = residue.ResidueDictionary.from_ccd(
+        residue_names=["ALA", "GLY", "SER"], cache_path=cache_path
+    )
+    assert residue_dictionary.residue_names == ["ALA", "GLY", "SER"]
+    assert residue_dictionary.residue_atoms["ALA"] == ["N", "CA", "C", "O", "CB"]
+    assert residue_dictionary.residue_elements["SER"] == ["N", "C", "C", "O", "C", "O"]
+    assert cache_path.exists()
+    assert (
+        residue.ResidueDictionary.from_ccd(
+            residue_names=["SER", "GLY", "ALA"], cache_path=cache_path
+        )
+        == residue_dictionary
+    )
+    with_hydrogens = residue.ResidueDictionary.from_ccd(
+        residue_names=["GLY"], keep_hydrogens=True, cache_path=cache_path
+    )
+    assert "HA2" in with_hydrogens.residue_atoms["GLY"]